@@ -0,0 +1,17 @@
+"""In-process caching, request coalescing and the shared Redis tier"""
+
+from .shared import CacheBus, TieredCache
+from .similarity import SimilarityIndex, similarity_metrics
+from .single_flight import SingleFlight
+from .task_cache import TaskCache
+from .ttl_cache import TTLCache
+
+__all__ = [
+    "CacheBus",
+    "SimilarityIndex",
+    "SingleFlight",
+    "TTLCache",
+    "TaskCache",
+    "TieredCache",
+    "similarity_metrics",
+]
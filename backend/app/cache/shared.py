@@ -0,0 +1,302 @@
+"""
+Cache tier shared by every worker process (Redis), with cross-worker invalidation.
+
+Each uvicorn worker keeps its own in-process caches. Behind them,
+``TieredCache`` adds a Redis copy (L2): a value loaded by one worker is
+served to the others from Redis instead of the database, so hit rates do
+not drop as workers are added. Every ``set`` / ``invalidate`` is
+broadcast on a pub/sub channel through ``CacheBus`` and the other workers
+drop their in-process copy (L1); caches that stay process-local (the task
+sets) subscribe to the same channel via ``CacheBus.register``.
+
+Redis is optional. Without REDIS_URL, without the redis package, or while
+Redis is unreachable everything degrades to the in-process tier. Redis
+errors are counted and logged, never raised - a cache miss is always safe.
+L2 entries expire with the same TTL as L1, which also bounds how long a
+lost invalidation message can leave a stale copy behind.
+
+A value loaded after an L2 miss is only written back if the key was not
+invalidated meanwhile - by any worker. Every ``invalidate`` bumps a
+per-key generation in Redis, and the fill is a WATCHed ``SET NX`` made only
+while the generation still matches the one read with the miss, so a load
+that raced a write can never put its stale result back into L2.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import uuid
+from dataclasses import asdict, dataclass
+from typing import Any, Awaitable, Callable, Dict, Generic, Optional, Set, Tuple, TypeVar
+
+from .ttl_cache import TTLCache
+
+try:
+    import redis.asyncio as aioredis
+    from redis.exceptions import WatchError
+except ImportError:  # optional dependency - the in-process tier still works
+    aioredis = None
+    WatchError = None
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# generation keys outlive the slowest load they have to fence off
+MIN_GENERATION_TTL = 60
+
+
+@dataclass
+class SharedTierStats:
+    hits: int = 0
+    misses: int = 0
+    writes: int = 0
+    stale_fills: int = 0  # loads not written back because the key was invalidated while they ran
+    errors: int = 0
+
+
+@dataclass
+class BusStats:
+    published: int = 0
+    received: int = 0  # invalidations from other workers applied here
+    errors: int = 0
+
+
+class CacheBus:
+    """The Redis connection shared by the caches of one process, plus the invalidation channel"""
+
+    def __init__(self, url: Optional[str] = None, namespace: Optional[str] = None, client: Any = None):
+        self.url = url if url is not None else os.getenv("REDIS_URL", "")
+        self.namespace = namespace or os.getenv("REDIS_CACHE_NAMESPACE", "taskmanager")
+        self.channel = f"{self.namespace}:cache:invalidate"
+        self.stats = BusStats()
+        # a ready client (e.g. fakeredis.aioredis.FakeRedis()) is used as-is
+        self.client = client
+        self._origin = uuid.uuid4().hex
+        self._handlers: Dict[str, Callable[[str], None]] = {}
+        self._listener: Optional[asyncio.Task] = None
+        self._pending: Set[asyncio.Task] = set()
+
+    @property
+    def connected(self) -> bool:
+        return self.client is not None
+
+    def key(self, cache: str, key: str) -> str:
+        return f"{self.namespace}:{cache}:{key}"
+
+    def register(self, cache: str, on_invalidate: Callable[[str], None]):
+        """Call on_invalidate(key) when another worker changes key of cache"""
+        self._handlers[cache] = on_invalidate
+
+    async def start(self):
+        if self.client is None:
+            if not self.url:
+                logger.info("REDIS_URL not set - caches are per process")
+                return
+            if aioredis is None:
+                logger.warning("REDIS_URL is set but the redis package is not installed - caches are per process")
+                return
+            self.client = aioredis.from_url(self.url, decode_responses=True)
+        try:
+            await self.client.ping()
+            pubsub = self.client.pubsub()
+            await pubsub.subscribe(self.channel)
+        except Exception as e:
+            logger.warning(f"⚠️ Redis unavailable ({e}) - caches are per process")
+            await self._close_client()
+            return
+        self._listener = asyncio.create_task(self._listen(pubsub))
+        logger.info("Shared Redis cache tier ready")
+
+    async def close(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        await self._close_client()
+
+    async def publish(self, cache: str, key: str):
+        if self.client is None:
+            return
+        try:
+            await self.client.publish(self.channel, json.dumps({"origin": self._origin, "cache": cache, "key": key}))
+            self.stats.published += 1
+        except Exception as e:
+            self.stats.errors += 1
+            logger.warning(f"⚠️ Cache invalidation publish failed: {e}")
+
+    def notify(self, cache: str, key: str):
+        """publish() without waiting for it, for synchronous write paths"""
+        if self.client is None:
+            return
+        task = asyncio.create_task(self.publish(cache, key))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {"connected": self.connected, **asdict(self.stats)}
+
+    async def _listen(self, pubsub):
+        try:
+            async for message in pubsub.listen():
+                if message.get("type") != "message":
+                    continue
+                try:
+                    event = json.loads(message["data"])
+                    if event["origin"] == self._origin:
+                        continue
+                    handler = self._handlers.get(event["cache"])
+                    if handler is not None:
+                        handler(event["key"])
+                        self.stats.received += 1
+                except Exception as e:
+                    self.stats.errors += 1
+                    logger.warning(f"⚠️ Bad cache invalidation message: {e}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.stats.errors += 1
+            logger.error(f"❌ Cache invalidation listener stopped: {e}")
+        finally:
+            try:
+                await pubsub.aclose() if hasattr(pubsub, "aclose") else await pubsub.close()
+            except Exception:
+                pass
+
+    async def _close_client(self):
+        client, self.client = self.client, None
+        if client is not None:
+            try:
+                await client.aclose() if hasattr(client, "aclose") else await client.close()
+            except Exception:
+                pass
+
+
+# _shared_get when Redis could not be asked: nothing is written back
+_UNKNOWN = object()
+
+
+class TieredCache(Generic[T]):
+    """TTLCache in front of the shared Redis tier; values must survive encode -> JSON -> decode"""
+
+    def __init__(
+        self,
+        name: str,
+        bus: CacheBus,
+        max_entries: int,
+        ttl: float,
+        encode: Callable[[T], Any] = lambda value: value,
+        decode: Callable[[Any], T] = lambda data: data,
+    ):
+        self.name = name
+        self.bus = bus
+        self.local: TTLCache[T] = TTLCache(max_entries, ttl)
+        self.encode = encode
+        self.decode = decode
+        self.stats = SharedTierStats()
+        bus.register(name, self.local.invalidate)
+
+    async def get_or_load(self, key: str, load: Callable[[], Awaitable[T]]) -> T:
+        """From this process, else from Redis, else load() - stored in both unless the key changed meanwhile"""
+        value = self.local.get(key)
+        if value is not None:
+            return value
+        epoch = self.local.epoch
+        value, generation = await self._shared_get(key)
+        if value is None:
+            value = await load()
+            if epoch == self.local.epoch and generation is not _UNKNOWN:
+                await self._shared_fill(key, value, generation)
+        if epoch == self.local.epoch:
+            self.local.set(key, value)
+        return value
+
+    async def set(self, key: str, value: T):
+        """Store a value that was just written; other workers drop their copy"""
+        self.local.invalidate(key)
+        self.local.set(key, value)
+        await self._shared_set(key, value)
+        await self.bus.publish(self.name, key)
+
+    async def invalidate(self, key: str):
+        self.local.invalidate(key)
+        if self.bus.client is not None:
+            generation = self._generation_key(key)
+            try:
+                async with self.bus.client.pipeline(transaction=True) as pipe:
+                    pipe.incr(generation)
+                    pipe.expire(generation, max(int(self.local.ttl), MIN_GENERATION_TTL))
+                    pipe.delete(self.bus.key(self.name, key))
+                    await pipe.execute()
+            except Exception as e:
+                self._error("delete", e)
+        await self.bus.publish(self.name, key)
+
+    def metrics(self) -> Dict[str, Any]:
+        lookups = self.stats.hits + self.stats.misses
+        return {
+            **self.local.metrics(),
+            "shared": {
+                "enabled": self.bus.connected,
+                "hit_ratio": round(self.stats.hits / lookups, 4) if lookups else 0.0,
+                **asdict(self.stats),
+            },
+        }
+
+    def _generation_key(self, key: str) -> str:
+        return self.bus.key(f"{self.name}.generation", key)
+
+    async def _shared_get(self, key: str) -> Tuple[Optional[T], Any]:
+        """The L2 value (None on a miss) and the key's generation, which a fill after the miss must still see"""
+        if self.bus.client is None:
+            return None, _UNKNOWN
+        try:
+            data, generation = await self.bus.client.mget(self.bus.key(self.name, key), self._generation_key(key))
+            value = self.decode(json.loads(data)) if data is not None else None
+        except Exception as e:
+            self._error("read", e)
+            return None, _UNKNOWN
+        if value is None:
+            self.stats.misses += 1
+        else:
+            self.stats.hits += 1
+        return value, generation
+
+    async def _shared_set(self, key: str, value: T):
+        if self.bus.client is None or value is None:
+            return
+        try:
+            await self.bus.client.set(self.bus.key(self.name, key), json.dumps(self.encode(value)), ex=max(int(self.local.ttl), 1))
+            self.stats.writes += 1
+        except Exception as e:
+            self._error("write", e)
+
+    async def _shared_fill(self, key: str, value: T, generation: Optional[str]):
+        """Write back a value loaded after a miss, unless another value got there first or the key was invalidated"""
+        if self.bus.client is None or value is None:
+            return
+        generation_key = self._generation_key(key)
+        try:
+            async with self.bus.client.pipeline(transaction=True) as pipe:
+                await pipe.watch(generation_key)
+                if await pipe.get(generation_key) != generation:
+                    self.stats.stale_fills += 1
+                    return
+                pipe.multi()
+                pipe.set(self.bus.key(self.name, key), json.dumps(self.encode(value)), ex=max(int(self.local.ttl), 1), nx=True)
+                await pipe.execute()
+            self.stats.writes += 1
+        except Exception as e:
+            if WatchError is not None and isinstance(e, WatchError):
+                # invalidated between the check and the write
+                self.stats.stale_fills += 1
+                return
+            self._error("write", e)
+
+    def _error(self, operation: str, error: Exception):
+        self.stats.errors += 1
+        logger.warning(f"⚠️ Shared cache {operation} failed ({self.name}): {error}")
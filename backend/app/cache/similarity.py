@@ -0,0 +1,195 @@
+"""
+Near-duplicate detection for AI prompts (MinHash + LSH, no network, no extra dependencies).
+
+Students in the same course write the same task in different words
+("Calc II midterm ch 5-7" / "Calculus 2 midterm chapters 5–7"). Text is
+canonicalized (case, punctuation, roman numerals, common course
+abbreviations, plurals), cut into character 3-gram shingles and reduced
+to a 64-value MinHash signature. Signatures are split into 16 bands of 4;
+two texts sharing any band are candidates, and the best candidate is
+accepted when its estimated Jaccard similarity reaches the index
+threshold (AI_SIMILARITY_THRESHOLD). With 16x4 bands, pairs above 0.8
+similarity become candidates more than 99.9% of the time.
+
+Items live in buckets (e.g. subject + assignment type) and are only
+compared within their bucket. Each index keeps at most
+AI_SIMILARITY_MAX_ITEMS items, evicting the least recently matched;
+0 disables it.
+"""
+
+import hashlib
+import os
+import random
+import re
+import unicodedata
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Set, Tuple
+
+NUM_PERM = 64
+BANDS = 16
+SHINGLE_SIZE = 3
+
+_PRIME = (1 << 61) - 1
+_rng = random.Random(20241022)
+# fixed seed: signatures must not change between processes or restarts
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+
+_ROMAN = {"ii": "2", "iii": "3", "iv": "4", "vi": "6", "vii": "7", "viii": "8", "ix": "9"}
+_ABBREVIATIONS = {
+    "ch": "chapter", "chap": "chapter", "chs": "chapter",
+    "calc": "calculus", "alg": "algebra", "trig": "trigonometry", "precalc": "precalculus",
+    "chem": "chemistry", "bio": "biology", "phys": "physics", "stats": "statistics", "stat": "statistics",
+    "econ": "economics", "psych": "psychology", "eng": "english", "lit": "literature", "hist": "history",
+    "sec": "section", "pg": "page", "pgs": "page", "pp": "page", "hw": "homework",
+    "intro": "introduction", "lec": "lecture", "mid": "midterm",
+}
+_STOPWORDS = {"a", "an", "and", "the", "of", "for", "to", "on", "in", "my", "with"}
+
+Bucket = Tuple[str, ...]
+
+
+def canonical_tokens(text: str) -> List[str]:
+    text = unicodedata.normalize("NFKC", text or "").casefold()
+    tokens = []
+    for token in re.findall(r"[a-z]+|\d+", text):
+        token = _ROMAN.get(token, token)
+        token = _ABBREVIATIONS.get(token, token)
+        if token.isalpha() and len(token) > 3 and token.endswith("s") and not token.endswith(("ss", "us", "is")):
+            token = token[:-1]
+        if token not in _STOPWORDS:
+            tokens.append(token)
+    return tokens
+
+
+def shingles(text: str) -> Set[str]:
+    canonical = " ".join(canonical_tokens(text))
+    if len(canonical) <= SHINGLE_SIZE:
+        return {canonical} if canonical else set()
+    return {canonical[i:i + SHINGLE_SIZE] for i in range(len(canonical) - SHINGLE_SIZE + 1)}
+
+
+def signature(text: str) -> Tuple[int, ...]:
+    """MinHash signature of text; empty for text without any words"""
+    hashes = [int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little") for s in shingles(text)]
+    if not hashes:
+        return ()
+    return tuple(min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMUTATIONS)
+
+
+def estimated_similarity(left: Sequence[int], right: Sequence[int]) -> float:
+    return sum(1 for x, y in zip(left, right) if x == y) / NUM_PERM
+
+
+@dataclass
+class SimilarityStats:
+    hits: int = 0
+    misses: int = 0
+    added: int = 0
+    evicted: int = 0
+
+
+@dataclass
+class Match:
+    item_id: int
+    value: Any
+    similarity: float
+
+
+@dataclass
+class _Item:
+    bucket: Bucket
+    signature: Tuple[int, ...]
+    value: Any
+
+
+# every index by name, for GET /metrics
+INDEXES: Dict[str, "SimilarityIndex"] = {}
+
+
+class SimilarityIndex:
+    def __init__(self, name: str, threshold: Optional[float] = None, max_items: Optional[int] = None):
+        self.name = name
+        self.threshold = threshold if threshold is not None else float(os.getenv("AI_SIMILARITY_THRESHOLD", "0.8"))
+        self.max_items = max_items if max_items is not None else int(os.getenv("AI_SIMILARITY_MAX_ITEMS", "5000"))
+        self.rows = NUM_PERM // BANDS
+        self.stats = SimilarityStats()
+        self._items: "OrderedDict[int, _Item]" = OrderedDict()
+        self._bands: Dict[Tuple[Bucket, int, Tuple[int, ...]], Set[int]] = {}
+        self._next_id = 0
+        INDEXES[name] = self
+
+    @staticmethod
+    def bucket(*parts: Hashable) -> Bucket:
+        return tuple(" ".join(str(p or "").casefold().split()) for p in parts)
+
+    def find(self, bucket: Bucket, text: str) -> Optional[Match]:
+        """The most similar item in bucket at or above the threshold"""
+        match = self._best(bucket, signature(text)) if self.max_items > 0 else None
+        if match is None or match.similarity < self.threshold:
+            self.stats.misses += 1
+            return None
+        self.stats.hits += 1
+        self._items.move_to_end(match.item_id)
+        return match
+
+    def add(self, bucket: Bucket, text: str, value: Any):
+        """Index value under text; an item with the same signature in the bucket is replaced"""
+        sig = signature(text)
+        if not sig or self.max_items <= 0:
+            return
+        same = self._best(bucket, sig)
+        if same is not None and same.similarity == 1.0:
+            self._items[same.item_id].value = value
+            self._items.move_to_end(same.item_id)
+            return
+        self._next_id += 1
+        self._items[self._next_id] = _Item(bucket, sig, value)
+        for band in self._band_keys(bucket, sig):
+            self._bands.setdefault(band, set()).add(self._next_id)
+        self.stats.added += 1
+        while len(self._items) > self.max_items:
+            self.remove(next(iter(self._items)))
+            self.stats.evicted += 1
+
+    def remove(self, item_id: int):
+        """Forget an item (e.g. its value no longer exists)"""
+        item = self._items.pop(item_id, None)
+        if item is None:
+            return
+        for band in self._band_keys(item.bucket, item.signature):
+            members = self._bands.get(band)
+            if members is not None:
+                members.discard(item_id)
+                if not members:
+                    del self._bands[band]
+
+    def metrics(self) -> Dict[str, Any]:
+        lookups = self.stats.hits + self.stats.misses
+        return {
+            "items": len(self._items),
+            "threshold": self.threshold,
+            "hit_ratio": round(self.stats.hits / lookups, 4) if lookups else 0.0,
+            **asdict(self.stats),
+        }
+
+    def _band_keys(self, bucket: Bucket, sig: Tuple[int, ...]):
+        return [(bucket, band, sig[band * self.rows:(band + 1) * self.rows]) for band in range(BANDS)]
+
+    def _best(self, bucket: Bucket, sig: Tuple[int, ...]) -> Optional[Match]:
+        if not sig:
+            return None
+        candidates: Set[int] = set()
+        for band in self._band_keys(bucket, sig):
+            candidates |= self._bands.get(band, set())
+        best = None
+        for item_id in candidates:
+            item = self._items[item_id]
+            similarity = estimated_similarity(sig, item.signature)
+            if best is None or similarity > best.similarity:
+                best = Match(item_id, item.value, similarity)
+        return best
+
+
+def similarity_metrics() -> Dict[str, Any]:
+    return {name: index.metrics() for name, index in sorted(INDEXES.items())}
@@ -0,0 +1,73 @@
+"""
+Single-flight coalescing of identical concurrent reads.
+
+While a read for a key is in flight, later callers with the same key wait
+for that call instead of issuing their own, and every waiter receives the
+same result (treat it as read-only). The call runs as its own task, so a
+caller that disconnects does not cancel it for the others.
+"""
+
+import asyncio
+from dataclasses import asdict, dataclass
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+@dataclass
+class FlightStats:
+    calls: int = 0  # every do() call
+    executed: int = 0  # calls that actually hit the backend
+    collapsed: int = 0  # calls served by an in-flight read
+
+    @property
+    def collapse_ratio(self) -> float:
+        return self.collapsed / self.calls if self.calls else 0.0
+
+
+class SingleFlight:
+    def __init__(self):
+        self._inflight: Dict[Tuple[str, Hashable], asyncio.Future] = {}
+        self._stats: Dict[str, FlightStats] = {}
+
+    async def do(self, name: str, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """Run fn() unless an identical read (same name and key) is already running, then share its result"""
+        stats = self._stats.setdefault(name, FlightStats())
+        stats.calls += 1
+        flight_key = (name, key)
+        flight = self._inflight.get(flight_key)
+        if flight is None:
+            stats.executed += 1
+            flight = asyncio.ensure_future(fn())
+            self._inflight[flight_key] = flight
+            flight.add_done_callback(lambda done: self._finish(flight_key, done))
+        else:
+            stats.collapsed += 1
+        return await asyncio.shield(flight)
+
+    def forget_user(self, user_id: str):
+        """Let reads that start from now on bypass in-flight reads of this user (call after a write)
+
+        Keys of per-user reads are the user id or a tuple starting with it. Callers already
+        waiting keep their result; only later callers are kept from joining a pre-write read.
+        """
+        for flight_key in list(self._inflight):
+            key = flight_key[1]
+            if key == user_id or (isinstance(key, tuple) and key and key[0] == user_id):
+                del self._inflight[flight_key]
+
+    def _finish(self, flight_key: Tuple[str, Hashable], flight: asyncio.Future):
+        if self._inflight.get(flight_key) is flight:
+            del self._inflight[flight_key]
+        # mark the exception retrieved even if every waiter went away
+        if not flight.cancelled():
+            flight.exception()
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "in_flight": len(self._inflight),
+            "reads": {
+                name: {**asdict(stats), "collapse_ratio": round(stats.collapse_ratio, 4)}
+                for name, stats in sorted(self._stats.items())
+            },
+        }
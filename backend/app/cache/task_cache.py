@@ -0,0 +1,173 @@
+"""
+Per-user task set cache.
+
+Holds each recently active user's full task rows (TASK_FIELDS) in a
+size-bounded LRU so list, lookup and analytics reads of an unchanged task
+set never reach the database. Task writes go through ``apply`` with the
+rows the write returned, patching the cached set in place; every entry
+also expires after TASK_CACHE_TTL_SECONDS as a safety net for changes made
+outside this process. Writes on other workers arrive as invalidations over
+the Redis cache bus; without Redis they only show up here once the entry
+expires, so the app then uses the shorter TASK_CACHE_LOCAL_TTL_SECONDS.
+
+Each user has a write sequence number. A load records it before querying
+and ``put`` drops the result if a write landed meanwhile, so a slow load
+can never overwrite newer data. Users with more than TASK_CACHE_MAX_ROWS
+tasks are remembered as oversized and left to the paginated queries.
+
+``tag`` names the exact contents of a cached set (process id plus a
+revision bumped by every load and write), which is what HTTP validators
+for responses built from the cache are derived from.
+"""
+
+import os
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    oversized: int = 0  # reads for users whose task set is too large to cache
+    stores: int = 0
+    stale_loads: int = 0  # loads dropped because a write landed while they ran
+    evictions: int = 0
+    expirations: int = 0
+    write_through: int = 0  # writes applied to a cached set
+    invalidations: int = 0
+
+
+@dataclass
+class _Entry:
+    loaded_at: float
+    # task id -> row; None marks an oversized task set
+    rows: Optional[Dict[str, dict]] = field(default_factory=dict)
+    revision: int = 0
+
+
+class TaskCache:
+    def __init__(
+        self,
+        max_users: Optional[int] = None,
+        ttl: Optional[float] = None,
+        max_rows: Optional[int] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_users = max_users if max_users is not None else int(os.getenv("TASK_CACHE_MAX_USERS", "1000"))
+        self.ttl = ttl if ttl is not None else float(os.getenv("TASK_CACHE_TTL_SECONDS", "300"))
+        self.max_rows = max_rows if max_rows is not None else int(os.getenv("TASK_CACHE_MAX_ROWS", "2000"))
+        self.clock = clock
+        self.stats = CacheStats()
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        # user id -> sequence of the user's last write, bounded like the entries;
+        # users forgotten here read as _seq_floor, which is never lower than their real value
+        self._writes: "OrderedDict[str, int]" = OrderedDict()
+        self._seq = 0
+        self._seq_floor = 0
+        # keeps tags from different processes (workers, restarts) apart
+        self._instance = uuid.uuid4().hex[:12]
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_users > 0
+
+    def version(self, user_id: str) -> int:
+        """Changes whenever the user's tasks are written through this cache"""
+        return self._writes.get(user_id, self._seq_floor)
+
+    def get(self, user_id: str) -> Optional[List[dict]]:
+        """The cached rows, or None when they have to be read from the database"""
+        entry = self._live_entry(user_id)
+        if entry is None:
+            self.stats.misses += 1
+            return None
+        if entry.rows is None:
+            self.stats.oversized += 1
+            return None
+        self.stats.hits += 1
+        self._entries.move_to_end(user_id)
+        return list(entry.rows.values())
+
+    def peek(self, user_id: str) -> Optional[List[dict]]:
+        """Like get, without counting a lookup (re-reading right after a load)"""
+        entry = self._live_entry(user_id)
+        return list(entry.rows.values()) if entry is not None and entry.rows is not None else None
+
+    def tag(self, user_id: str) -> Optional[str]:
+        """Identifies the cached rows of the user; changes whenever they do. None when nothing is cached"""
+        entry = self._live_entry(user_id)
+        if entry is None or entry.rows is None:
+            return None
+        return f"{self._instance}-{entry.revision}"
+
+    def is_oversized(self, user_id: str) -> bool:
+        entry = self._live_entry(user_id)
+        return entry is not None and entry.rows is None
+
+    def put(self, user_id: str, rows: List[dict], version: int) -> bool:
+        """Store rows loaded when version(user_id) was ``version``; False if they are already stale"""
+        if not self.enabled:
+            return False
+        if self.version(user_id) != version:
+            self.stats.stale_loads += 1
+            return False
+        oversized = len(rows) > self.max_rows
+        self._seq += 1
+        self._entries[user_id] = _Entry(self.clock(), None if oversized else {str(r["id"]): r for r in rows}, self._seq)
+        self._entries.move_to_end(user_id)
+        self.stats.stores += 1
+        while len(self._entries) > self.max_users:
+            self._entries.popitem(last=False)
+            self.stats.evictions += 1
+        return not oversized
+
+    def apply(self, user_id: str, written: Iterable[dict] = (), deleted_ids: Iterable[str] = ()):
+        """Write-through after a task write: upsert the returned rows and drop the deleted ids"""
+        self._bump(user_id)
+        entry = self._live_entry(user_id)
+        if entry is None or entry.rows is None:
+            return
+        for row in written:
+            entry.rows[str(row["id"])] = row
+        for task_id in deleted_ids:
+            entry.rows.pop(str(task_id), None)
+        if len(entry.rows) > self.max_rows:
+            entry.rows = None
+        entry.revision = self._seq
+        self.stats.write_through += 1
+
+    def invalidate(self, user_id: str):
+        """Forget everything cached for the user (account deletion, bulk changes)"""
+        self._bump(user_id)
+        if self._entries.pop(user_id, None) is not None:
+            self.stats.invalidations += 1
+
+    def metrics(self) -> Dict[str, Any]:
+        lookups = self.stats.hits + self.stats.misses + self.stats.oversized
+        return {
+            "users": len(self._entries),
+            "max_users": self.max_users,
+            "ttl_seconds": self.ttl,
+            "hit_ratio": round(self.stats.hits / lookups, 4) if lookups else 0.0,
+            **asdict(self.stats),
+        }
+
+    def _live_entry(self, user_id: str) -> Optional[_Entry]:
+        entry = self._entries.get(user_id)
+        if entry is not None and self.clock() - entry.loaded_at > self.ttl:
+            del self._entries[user_id]
+            self.stats.expirations += 1
+            return None
+        return entry
+
+    def _bump(self, user_id: str):
+        self._seq += 1
+        self._writes[user_id] = self._seq
+        self._writes.move_to_end(user_id)
+        while len(self._writes) > max(self.max_users, 1) * 4:
+            _, seq = self._writes.popitem(last=False)
+            self._seq_floor = max(self._seq_floor, seq)
@@ -0,0 +1,88 @@
+"""
+Small size-bounded LRU cache whose entries expire after a fixed TTL.
+
+For per-user values that are read far more often than they change (the
+user's plan, the profile). Writers call ``invalidate``; it also bumps an
+epoch so a load that was already running when the value changed does not
+store its now-stale result.
+"""
+
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Any, Awaitable, Callable, Dict, Generic, Hashable, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+@dataclass
+class TTLCacheStats:
+    hits: int = 0
+    misses: int = 0
+    expirations: int = 0
+    evictions: int = 0
+    invalidations: int = 0
+
+
+class TTLCache(Generic[T]):
+    def __init__(self, max_entries: int, ttl: float, clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self.stats = TTLCacheStats()
+        self._entries: "OrderedDict[Hashable, Tuple[float, T]]" = OrderedDict()
+        self._epoch = 0
+
+    @property
+    def epoch(self) -> int:
+        """Changes on every invalidate; a load may only store its result if this did not change while it ran"""
+        return self._epoch
+
+    def get(self, key: Hashable) -> Optional[T]:
+        """The cached value, or None on a miss"""
+        entry = self._entries.get(key)
+        if entry is not None and self.clock() - entry[0] > self.ttl:
+            del self._entries[key]
+            self.stats.expirations += 1
+            entry = None
+        if entry is None:
+            self.stats.misses += 1
+            return None
+        self.stats.hits += 1
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def set(self, key: Hashable, value: T):
+        if self.max_entries <= 0 or value is None:
+            return
+        self._entries[key] = (self.clock(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats.evictions += 1
+
+    async def get_or_load(self, key: Hashable, load: Callable[[], Awaitable[T]]) -> T:
+        """The cached value, or load() stored unless the key was invalidated while it ran"""
+        value = self.get(key)
+        if value is not None:
+            return value
+        epoch = self._epoch
+        value = await load()
+        if epoch == self._epoch:
+            self.set(key, value)
+        return value
+
+    def invalidate(self, key: Hashable):
+        self._epoch += 1
+        if self._entries.pop(key, None) is not None:
+            self.stats.invalidations += 1
+
+    def metrics(self) -> Dict[str, Any]:
+        lookups = self.stats.hits + self.stats.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "hit_ratio": round(self.stats.hits / lookups, 4) if lookups else 0.0,
+            **asdict(self.stats),
+        }
@@ -0,0 +1,3 @@
+"""Database access helpers"""
+
+from .postgrest import PostgrestClient, PostgrestError, APIResponse
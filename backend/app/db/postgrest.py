@@ -0,0 +1,290 @@
+"""
+Pooled PostgREST client for Supabase.
+
+The official supabase client is synchronous, so every call made from an
+``async def`` endpoint blocks the event loop for a full network round trip.
+This module talks to the same PostgREST API through httpx connection pools
+(keep-alive enabled) and exposes the familiar ``table(...).select(...)``
+builder in both an awaitable and a blocking flavour.
+"""
+
+import os
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Characters that force a value to be double-quoted inside in.() / or() lists
+_RESERVED_CHARS = set(',.:()" ')
+
+
+class PostgrestError(Exception):
+    """Error returned by PostgREST (mirrors the JSON error body)"""
+
+    def __init__(self, message: str, code: Optional[str] = None, details: Optional[str] = None,
+                 hint: Optional[str] = None, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.message = message
+        self.code = code
+        self.details = details
+        self.hint = hint
+        self.status_code = status_code
+
+
+@dataclass
+class APIResponse:
+    """Result of a PostgREST call - same shape as the supabase client's response"""
+    data: List[dict]
+    count: Optional[int] = None
+
+
+def _render(value: Any) -> str:
+    """Render a plain filter value (taken literally by PostgREST)"""
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+
+def quote(value: Any) -> str:
+    """Render a list/logic-tree value, quoting it when it contains reserved characters"""
+    text = _render(value)
+    if any(ch in _RESERVED_CHARS for ch in text):
+        return '"' + text.replace('\\', '\\\\').replace('"', '\\"') + '"'
+    return text
+
+
+def _columns(columns: Union[str, Sequence[str]]) -> str:
+    if isinstance(columns, str):
+        return columns
+    return ",".join(columns)
+
+
+class _QueryBuilder:
+    """Accumulates a single PostgREST request"""
+
+    def __init__(self, client: "PostgrestClient", table: str):
+        self._client = client
+        self._path = f"/{table}"
+        self._method = "GET"
+        self._params: List[Tuple[str, str]] = []
+        self._headers: Dict[str, str] = {}
+        self._json: Any = None
+        self._prefer: List[str] = []
+
+    # Verbs
+    def select(self, columns: Union[str, Sequence[str]] = "*", count: Optional[str] = None):
+        """Choose the returned columns; on writes this shapes the returned representation"""
+        self._params = [p for p in self._params if p[0] != "select"]
+        self._params.append(("select", _columns(columns)))
+        if count:
+            self._prefer.append(f"count={count}")
+        return self
+
+    def insert(self, rows: Union[dict, List[dict]], returning: str = "representation",
+               on_conflict: Optional[str] = None, upsert: bool = False):
+        self._method = "POST"
+        self._json = rows
+        self._prefer.append(f"return={returning}")
+        if upsert:
+            self._prefer.append("resolution=merge-duplicates")
+        if on_conflict:
+            self._params.append(("on_conflict", on_conflict))
+        return self
+
+    def upsert(self, rows: Union[dict, List[dict]], on_conflict: Optional[str] = None,
+               returning: str = "representation"):
+        return self.insert(rows, returning=returning, on_conflict=on_conflict, upsert=True)
+
+    def update(self, values: dict, returning: str = "representation"):
+        self._method = "PATCH"
+        self._json = values
+        self._prefer.append(f"return={returning}")
+        return self
+
+    def delete(self, returning: str = "representation"):
+        self._method = "DELETE"
+        self._prefer.append(f"return={returning}")
+        return self
+
+    # Filters
+    def _filter(self, column: str, operator: str, value: Any):
+        self._params.append((column, f"{operator}.{_render(value)}"))
+        return self
+
+    def eq(self, column: str, value: Any):
+        return self._filter(column, "eq", value)
+
+    def neq(self, column: str, value: Any):
+        return self._filter(column, "neq", value)
+
+    def gt(self, column: str, value: Any):
+        return self._filter(column, "gt", value)
+
+    def gte(self, column: str, value: Any):
+        return self._filter(column, "gte", value)
+
+    def lt(self, column: str, value: Any):
+        return self._filter(column, "lt", value)
+
+    def lte(self, column: str, value: Any):
+        return self._filter(column, "lte", value)
+
+    def is_(self, column: str, value: Any):
+        return self._filter(column, "is", value)
+
+    def in_(self, column: str, values: Iterable[Any]):
+        rendered = ",".join(quote(v) for v in values)
+        self._params.append((column, f"in.({rendered})"))
+        return self
+
+    def or_(self, expression: str):
+        """Raw PostgREST ``or`` expression, e.g. ``a.eq.1,b.lt.2``"""
+        self._params.append(("or", f"({expression})"))
+        return self
+
+    # Modifiers
+    def order(self, column: str, desc: bool = False, nullsfirst: Optional[bool] = None):
+        clause = f"{column}.{'desc' if desc else 'asc'}"
+        if nullsfirst is not None:
+            clause += ".nullsfirst" if nullsfirst else ".nullslast"
+        existing = [p for p in self._params if p[0] == "order"]
+        if existing:
+            self._params.remove(existing[0])
+            clause = f"{existing[0][1]},{clause}"
+        self._params.append(("order", clause))
+        return self
+
+    def limit(self, count: int):
+        self._params.append(("limit", str(count)))
+        return self
+
+    def offset(self, count: int):
+        self._params.append(("offset", str(count)))
+        return self
+
+    def _request(self) -> Dict[str, Any]:
+        headers = dict(self._headers)
+        if self._prefer:
+            headers["Prefer"] = ",".join(self._prefer)
+        return {
+            "method": self._method,
+            "url": self._path,
+            "params": self._params,
+            "headers": headers,
+            "json": self._json,
+        }
+
+
+def _parse_response(response: httpx.Response) -> APIResponse:
+    """Turn an httpx response into APIResponse or raise PostgrestError"""
+    if response.status_code >= 400:
+        try:
+            body = response.json()
+        except ValueError:
+            body = {"message": response.text}
+        raise PostgrestError(
+            body.get("message", f"PostgREST error {response.status_code}"),
+            code=body.get("code"),
+            details=body.get("details"),
+            hint=body.get("hint"),
+            status_code=response.status_code,
+        )
+
+    count = None
+    content_range = response.headers.get("content-range")
+    if content_range and "/" in content_range:
+        total = content_range.split("/")[-1]
+        if total.isdigit():
+            count = int(total)
+
+    if not response.content:
+        return APIResponse(data=[], count=count)
+    data = response.json()
+    if not isinstance(data, list):
+        data = [data]
+    return APIResponse(data=data, count=count)
+
+
+class SyncQuery(_QueryBuilder):
+    """Blocking query - for plain ``def`` endpoints running in the threadpool"""
+
+    def execute(self) -> APIResponse:
+        return _parse_response(self._client.sync_http.request(**self._request()))
+
+
+class AsyncQuery(_QueryBuilder):
+    """Awaitable query - for ``async def`` endpoints"""
+
+    async def execute(self) -> APIResponse:
+        return _parse_response(await self._client.async_http.request(**self._request()))
+
+
+class _RpcCall:
+    def __init__(self, client: "PostgrestClient", function: str, params: Optional[dict]):
+        self._client = client
+        self._request = {"method": "POST", "url": f"/rpc/{function}", "json": params or {}}
+
+
+class SyncRpc(_RpcCall):
+    def execute(self) -> APIResponse:
+        return _parse_response(self._client.sync_http.request(**self._request))
+
+
+class AsyncRpc(_RpcCall):
+    async def execute(self) -> APIResponse:
+        return _parse_response(await self._client.async_http.request(**self._request))
+
+
+class PostgrestClient:
+    """Owns the keep-alive connection pools used for every Supabase REST call"""
+
+    def __init__(self, supabase_url: str, supabase_key: str,
+                 max_connections: Optional[int] = None,
+                 max_keepalive_connections: Optional[int] = None,
+                 timeout: Optional[float] = None):
+        max_connections = max_connections or int(os.getenv("SUPABASE_POOL_SIZE", "50"))
+        max_keepalive_connections = max_keepalive_connections or int(os.getenv("SUPABASE_POOL_KEEPALIVE", "20"))
+        timeout = timeout or float(os.getenv("SUPABASE_TIMEOUT_SECONDS", "10"))
+
+        self.base_url = supabase_url.rstrip("/") + "/rest/v1"
+        headers = {
+            "apikey": supabase_key,
+            "Authorization": f"Bearer {supabase_key}",
+            "Content-Type": "application/json",
+            "Accept": "application/json",
+        }
+        limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=30.0,
+        )
+        # Both pools share base URL, auth headers, limits and timeouts; the async
+        # one serves the event loop, the sync one serves threadpool endpoints.
+        self.async_http = httpx.AsyncClient(base_url=self.base_url, headers=headers,
+                                            limits=limits, timeout=timeout)
+        self.sync_http = httpx.Client(base_url=self.base_url, headers=headers,
+                                      limits=limits, timeout=timeout)
+
+    def table(self, name: str) -> SyncQuery:
+        """Blocking query builder"""
+        return SyncQuery(self, name)
+
+    def atable(self, name: str) -> AsyncQuery:
+        """Awaitable query builder"""
+        return AsyncQuery(self, name)
+
+    def rpc(self, function: str, params: Optional[dict] = None) -> SyncRpc:
+        return SyncRpc(self, function, params)
+
+    def arpc(self, function: str, params: Optional[dict] = None) -> AsyncRpc:
+        return AsyncRpc(self, function, params)
+
+    async def aclose(self):
+        """Close both pools (call on application shutdown)"""
+        await self.async_http.aclose()
+        self.sync_http.close()
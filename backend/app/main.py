@@ -2,24 +2,37 @@
 # 7/5/2025
 # Backend for the task manager project, provides functionality 
 
-from fastapi import FastAPI, HTTPException, Depends, Form, Request, status
+from fastapi import BackgroundTasks, FastAPI, HTTPException, Depends, Form, Query, Request, Response, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
+import asyncio
 import os
+import hashlib
+import json
 import logging
-from datetime import datetime, timedelta
+import time
+from contextlib import asynccontextmanager
+from datetime import date, datetime, timedelta, timezone
 from dotenv import load_dotenv
 from supabase.client import create_client, Client
 import jwt
-from typing import Optional, List, Any
+from typing import Optional, List, Any, Dict, NamedTuple, Tuple
 import uvicorn
-from pydantic import BaseModel, field_validator
+from pydantic import BaseModel, ValidationError, field_validator
 from enum import Enum
-import bcrypt
 import requests
 import anthropic
+from app.cache import CacheBus, SimilarityIndex, SingleFlight, TaskCache, TieredCache, similarity_metrics
+from app.db import PostgrestClient
+from app.services.account_service import AccountDeletionService
+from app.services.analytics_service import AnalyticsReconciler, bucket_step, dashboard_summary, user_analytics, user_timeseries
+from app.services.assistance_cache import AssistanceCache
+from app.services.login_throttle import LoginThrottle
+from app.services.password_hasher import PasswordHasher, PasswordHasherBusy
+from app.services.task_stats import TaskStatsEngine
+from app.repositories import ROLLUP_GRANULARITIES, DuplicateKeyError, Repositories, TaskFilters, create_repositories, decode_cursor, decode_offset, page_rows, projections, search_terms
 
 # Configure logging - Reduced verbosity for production
 logging.basicConfig(level=logging.WARNING)
@@ -167,10 +180,45 @@ class TaskResponse(BaseModel):
     grade: Optional[float] = None
     created_at: datetime
     updated_at: datetime
+    completed_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
 
+class TaskBatchCreate(BaseModel):
+    # items are validated one by one against TaskCreate so one bad row does not reject the batch
+    tasks: List[dict]
+
+class TaskBatchUpdate(BaseModel):
+    ids: List[str]
+    changes: TaskUpdate
+
+class TaskBatchDelete(BaseModel):
+    ids: List[str]
+
+class TaskBatchItem(BaseModel):
+    index: int
+    id: Optional[str] = None
+    status: int
+    task: Optional[TaskResponse] = None
+    error: Optional[str] = None
+
+class TaskBatchResponse(BaseModel):
+    results: List[TaskBatchItem]
+    succeeded: int
+    failed: int
+
+class DashboardResponse(BaseModel):
+    total_tasks: int
+    completed_tasks: int
+    pending_tasks: int
+    in_progress_tasks: int
+    completion_rate: float
+    assignment_types: Dict[str, int]
+    priorities: Dict[str, int]
+    upcoming: List[TaskResponse]  # open tasks, earliest due first
+    recent: List[TaskResponse]  # open tasks, newest first
+
 # Auth Models
 class UserRegister(BaseModel):
     email: str
@@ -290,7 +338,7 @@ class PlanFeatures(BaseModel):
     max_categories: int
     ai_features: bool
     advanced_analytics: bool
-    export_options: List[str]
+    export_options: Tuple[str, ...]
     collaboration: bool
     custom_themes: bool
     priority_support: bool
@@ -302,6 +350,87 @@ class PlanFeatures(BaseModel):
     progress_reports: bool
     white_label: bool
 
+    class Config:
+        frozen = True
+
+# Features of each plan - built once and shared, never modified
+PLAN_FEATURES = {
+    PlanType.STUDENT: PlanFeatures(
+        plan_type=PlanType.STUDENT,
+        max_tasks=None,  # Unlimited
+        max_categories=5,
+        ai_features=False,  # AI features only for paid plans
+        advanced_analytics=False,
+        export_options=("pdf",),
+        collaboration=False,
+        custom_themes=False,
+        priority_support=False,
+        study_session_tracking=False,
+        cloud_backup=False,
+        team_study_groups=False,
+        lms_integration=False,
+        custom_study_plans=False,
+        progress_reports=False,
+        white_label=False
+    ),
+    PlanType.STUDENT_PRO: PlanFeatures(
+        plan_type=PlanType.STUDENT_PRO,
+        max_tasks=None,  # Unlimited
+        max_categories=50,
+        ai_features=True,
+        advanced_analytics=True,
+        export_options=("pdf", "excel", "csv"),
+        collaboration=True,
+        custom_themes=True,
+        priority_support=True,
+        study_session_tracking=True,
+        cloud_backup=True,
+        team_study_groups=True,
+        lms_integration=False,
+        custom_study_plans=False,
+        progress_reports=False,
+        white_label=False
+    ),
+    PlanType.ACADEMIC_PLUS: PlanFeatures(
+        plan_type=PlanType.ACADEMIC_PLUS,
+        max_tasks=None,  # Unlimited
+        max_categories=100,
+        ai_features=True,
+        advanced_analytics=True,
+        export_options=("pdf", "excel", "csv", "json"),
+        collaboration=True,
+        custom_themes=True,
+        priority_support=True,
+        study_session_tracking=True,
+        cloud_backup=True,
+        team_study_groups=True,
+        lms_integration=True,
+        custom_study_plans=True,
+        progress_reports=True,
+        white_label=True
+    ),
+}
+
+# GET /user/plan-features bodies, one per plan
+PLAN_FEATURE_RESPONSES = {
+    plan_type: {"plan_type": plan_type.value, "features": features.model_dump(mode="json", exclude={"plan_type"})}
+    for plan_type, features in PLAN_FEATURES.items()
+}
+
+class PlanState(NamedTuple):
+    """A user's plan and the version stamped into their access token's plan claim; deleted while the account is
+    being purged or gone"""
+    plan_type: PlanType
+    version: int
+    deleted: bool = False
+
+def plan_type_of(value: Optional[str]) -> PlanType:
+    """Map a stored plan_type to PlanType; anything unknown is the free plan"""
+    try:
+        return PlanType(value)
+    except ValueError:
+        return PlanType.STUDENT
+
 # Plan update model
 class PlanUpdateRequest(BaseModel):
     plan_type: PlanType
@@ -311,6 +440,16 @@ supabase_url = os.getenv("SUPABASE_URL")
 supabase_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
 jwt_secret_key = os.getenv("JWT_SECRET_KEY", "your-secret-key-change-in-production")
 anthropic_api_key = os.getenv("CLAUDE_API_KEY")
+task_page_size = int(os.getenv("TASK_PAGE_SIZE", "100"))
+task_page_max = int(os.getenv("TASK_PAGE_MAX", "500"))
+task_batch_max = int(os.getenv("TASK_BATCH_MAX", "100"))
+plan_cache_max_users = int(os.getenv("PLAN_CACHE_MAX_USERS", "10000"))
+plan_cache_ttl = float(os.getenv("PLAN_CACHE_TTL_SECONDS", "300"))
+profile_cache_max_users = int(os.getenv("PROFILE_CACHE_MAX_USERS", "1000"))
+profile_cache_ttl = float(os.getenv("PROFILE_CACHE_TTL_SECONDS", "300"))
+task_cache_local_ttl = float(os.getenv("TASK_CACHE_LOCAL_TTL_SECONDS", "30"))
+timeseries_max_buckets = int(os.getenv("ANALYTICS_TIMESERIES_MAX_BUCKETS", "366"))
+dashboard_task_limit = int(os.getenv("DASHBOARD_TASK_LIMIT", "5"))
 
 # Log configuration status
 logger.info("Configuration Check:")
@@ -346,14 +485,84 @@ else:
             logger.error("   3. Try using a different network (mobile hotspot)")
             logger.error("   4. Check if your firewall is blocking the connection")
         
-        logger.warning("Using fallback mode - data will not persist")
+        logger.warning("Using fallback mode - data is kept in local storage")
         supabase = None
 
+# Storage backend - Supabase when connected, otherwise the embedded SQLite
+# database so fallback mode still keeps real data (see app/repositories)
+storage_backend = os.getenv("STORAGE_BACKEND", "supabase" if supabase else "sqlite").lower()
+if storage_backend == "supabase" and not supabase:
+    logger.warning("STORAGE_BACKEND=supabase but Supabase is not connected - using SQLite")
+    storage_backend = "sqlite"
+
+# Pooled REST client shared by every Supabase call in this process
+rest: Optional[PostgrestClient] = None
+if storage_backend == "supabase":
+    rest = PostgrestClient(supabase_url, supabase_key)
+    logger.info("Pooled PostgREST client ready")
+
+repos: Repositories = create_repositories(storage_backend, rest)
+logger.info(f"Storage backend: {repos.backend}")
+account_deletion = AccountDeletionService(repos)
+# repairs task_analytics counters that drifted from the tasks
+analytics_reconciler = AnalyticsReconciler(repos)
+# NumPy grade / workload statistics for advanced_analytics plans, per task-set version
+task_stats = TaskStatsEngine()
+# bcrypt runs here, never on the event loop
+password_hasher = PasswordHasher()
+# generated academic assistance by content key, kept across restarts
+assistance_cache = AssistanceCache(repos)
+# near-duplicate descriptions -> content key of an assistance entry made for one of them
+assistance_index = SimilarityIndex("academic_assistance")
+# identical concurrent reads (same user, same query) share one database call
+reads = SingleFlight()
+# Redis shared by the workers (REDIS_URL, optional): second cache tier + invalidation broadcasts
+cache_bus = CacheBus()
+# recently read task sets, kept current by the task write endpoints;
+# writes on other workers arrive as invalidations over cache_bus
+tasks_cache = TaskCache()
+cache_bus.register("tasks", tasks_cache.invalidate)
+# user id -> PlanState, also kept in Redis for the other workers; update_user_plan and delete_account invalidate it
+plan_cache: TieredCache[PlanState] = TieredCache(
+    "plan", cache_bus, plan_cache_max_users, plan_cache_ttl,
+    encode=lambda plan: [plan.plan_type.value, plan.version, plan.deleted],
+    decode=lambda data: PlanState(plan_type_of(data[0]), int(data[1]), len(data) > 2 and bool(data[2])),
+)
+# user id -> USER_PROFILE row for /auth/me (profile pictures make it the largest per-user read);
+# filled at login and registration, replaced by update_user_profile, dropped on plan changes and deletion
+profile_cache: TieredCache[dict] = TieredCache("profile", cache_bus, profile_cache_max_users, profile_cache_ttl)
+# login attempts per IP and per email, in Redis when cache_bus is connected
+login_throttle = LoginThrottle(cache_bus)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Startup / shutdown hooks"""
+    await cache_bus.start()
+    if not cache_bus.connected and tasks_cache.ttl > task_cache_local_ttl:
+        # no invalidations from other workers: their task writes only show up here once a cached set expires
+        logger.info(f"Task cache TTL {tasks_cache.ttl:.0f}s -> {task_cache_local_ttl:.0f}s without Redis")
+        tasks_cache.ttl = task_cache_local_ttl
+    analytics_reconciler.start()
+    calibration = None
+    if os.getenv("BCRYPT_CALIBRATE", "true").lower() == "true":
+        # logs hash time per cost; runs beside startup so it never delays it
+        calibration = asyncio.create_task(password_hasher.calibrate())
+    yield
+    if calibration is not None:
+        calibration.cancel()
+    await cache_bus.close()
+    password_hasher.close()
+    await account_deletion.close()
+    await analytics_reconciler.close()
+    # Release pooled keep-alive connections / local database handles
+    await repos.close()
+
 # Create FastAPI app
 app = FastAPI(
     title="Student Task Manager API", 
     version="1.0.0",
-    description="A comprehensive API for managing student tasks and assignments"
+    description="A comprehensive API for managing student tasks and assignments",
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -363,6 +572,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
 # Security
@@ -379,6 +589,15 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, jwt_secret_key, algorithm="HS256")
 
+def create_user_token(user_id: str, email: Optional[str], plan: PlanState) -> str:
+    """Access token with the plan claim; gated endpoints check plan_version against the current one"""
+    return create_access_token({
+        "sub": user_id,
+        "email": email,
+        "plan_type": plan.plan_type.value,
+        "plan_version": plan.version
+    })
+
 def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
     """Verify JWT token"""
     try:
@@ -402,13 +621,72 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
         if user_id is None:
             raise HTTPException(status_code=401, detail="Invalid token payload")
         
-        return {"id": str(user_id)}  # Keep as string since Supabase uses UUIDs
+        # Keep id as string since Supabase uses UUIDs; the plan claim is absent from older tokens
+        return {
+            "id": str(user_id),
+            "email": payload.get("email"),
+            "plan_type": payload.get("plan_type"),
+            "plan_version": payload.get("plan_version")
+        }
     except (jwt.ExpiredSignatureError, jwt.InvalidTokenError) as e:
         logger.error(f"Token error: {e}")
         raise HTTPException(status_code=401, detail="Invalid or expired token")
 
-def get_user_plan_features(user_id: str) -> PlanFeatures:
-    """Get user's current plan features"""
+async def get_active_user(current_user: dict = Depends(get_current_user)) -> dict:
+    """Dependency for writes: the current user, unless the account is deleted or being purged (from plan_cache, which
+    delete_account invalidates on every worker); reads keep working so the client can poll the deletion status"""
+    plan = await get_user_plan_state(current_user["id"])
+    if plan.deleted:
+        logger.warning(f"❌ Write refused for deleted account {current_user['id']}")
+        raise HTTPException(status_code=403, detail="Account has been deleted")
+    return current_user
+
+async def load_user_plan(user_id: str, user: Optional[dict] = None) -> PlanState:
+    """Read the user's plan: users.plan_type, falling back to an active subscription (legacy); user is the users row
+    (with the USER_PLAN columns) when the caller has already read it"""
+    if user is None:
+        user = await reads.do("users.plan", user_id, lambda: repos.users.get_by_id(user_id, projections.USER_PLAN))
+    if not user or user.get('deleted_at'):
+        # deleted, or marked deleted while its tasks are purged
+        return PlanState(PlanType.STUDENT, int(user.get('plan_version') or 0) if user else 0, deleted=True)
+    version = int(user.get('plan_version') or 0)
+    
+    if user.get('plan_type'):
+        logger.info(f"📋 User {user_id} has plan_type: {user['plan_type']}")
+        return PlanState(plan_type_of(user['plan_type']), version)
+    
+    # Fallback: Check user's subscription (legacy method)
+    logger.info(f"📋 Checking subscriptions for user {user_id}")
+    subscription = await reads.do(
+        "subscriptions.active", user_id,
+        lambda: repos.subscriptions.get_active(user_id, projections.SUBSCRIPTION_PLAN)
+    )
+    
+    if not subscription:
+        logger.info(f"📋 No active subscription found for user {user_id}, using default features")
+        return PlanState(PlanType.STUDENT, version)
+    
+    return PlanState(plan_type_of(subscription['plan_type']), version)
+
+async def get_user_plan_state(user_id: str) -> PlanState:
+    """The user's plan and plan version, from plan_cache when possible"""
+    return await plan_cache.get_or_load(user_id, lambda: load_user_plan(user_id))
+
+async def reload_user_plan_state(user_id: str) -> PlanState:
+    """The user's plan read from the database rather than plan_cache, replacing the cached copy here and in Redis"""
+    plan = await load_user_plan(user_id)
+    await plan_cache.set(user_id, plan)
+    return plan
+
+async def get_user_profile(user_id: str) -> Optional[dict]:
+    """The user's USER_PROFILE row, from profile_cache when possible"""
+    return await profile_cache.get_or_load(
+        user_id,
+        lambda: reads.do("users.profile", user_id, lambda: repos.users.get_by_id(user_id, projections.USER_PROFILE))
+    )
+
+async def get_user_plan_features(user_id: str) -> PlanFeatures:
+    """Get user's current plan features (the plan comes from plan_cache, so this is usually a dict lookup)"""
     
     # DEVELOPER MODE: Allow testing all plan features
     # Set this to True to test all features, False for normal operation
@@ -422,200 +700,67 @@ def get_user_plan_features(user_id: str) -> PlanFeatures:
     
     if DEVELOPER_MODE and DEVELOPER_PLAN_OVERRIDE:
         # Return specific plan for developer testing
-        if DEVELOPER_PLAN_OVERRIDE == "student":
-            return PlanFeatures(
-                plan_type=PlanType.STUDENT,
-                max_tasks=None,  # Unlimited
-                max_categories=5,
-                ai_features=False,  # AI features only for paid plans
-                advanced_analytics=False,
-                export_options=["pdf"],
-                collaboration=False,
-                custom_themes=False,
-                priority_support=False,
-                study_session_tracking=False,
-                cloud_backup=False,
-                team_study_groups=False,
-                lms_integration=False,
-                custom_study_plans=False,
-                progress_reports=False,
-                white_label=False
-            )
-        elif DEVELOPER_PLAN_OVERRIDE == "student_pro":
-            return PlanFeatures(
-                plan_type=PlanType.STUDENT_PRO,
-                max_tasks=None,  # Unlimited
-                max_categories=50,
-                ai_features=True,
-                advanced_analytics=True,
-                export_options=["pdf", "excel", "csv"],
-                collaboration=True,
-                custom_themes=True,
-                priority_support=True,
-                study_session_tracking=True,
-                cloud_backup=True,
-                team_study_groups=True,
-                lms_integration=False,
-                custom_study_plans=False,
-                progress_reports=False,
-                white_label=False
-            )
-        elif DEVELOPER_PLAN_OVERRIDE == "academic_plus":
-            return PlanFeatures(
-                plan_type=PlanType.ACADEMIC_PLUS,
-                max_tasks=None,  # Unlimited
-                max_categories=100,
-                ai_features=True,
-                advanced_analytics=True,
-                export_options=["pdf", "excel", "csv", "json"],
-                collaboration=True,
-                custom_themes=True,
-                priority_support=True,
-                study_session_tracking=True,
-                cloud_backup=True,
-                team_study_groups=True,
-                lms_integration=True,
-                custom_study_plans=True,
-                progress_reports=True,
-                white_label=True
-            )
-    
-    # Default to free plan if no subscription found
-    default_features = PlanFeatures(
-        plan_type=PlanType.STUDENT,
-        max_tasks=None,  # Unlimited
-        max_categories=5,
-        ai_features=False,  # AI features only for paid plans
-        advanced_analytics=False,
-        export_options=["pdf"],
-        collaboration=False,
-        custom_themes=False,
-        priority_support=False,
-        study_session_tracking=False,
-        cloud_backup=False,
-        team_study_groups=False,
-        lms_integration=False,
-        custom_study_plans=False,
-        progress_reports=False,
-        white_label=False
-    )
-    
-    if not supabase:
-        return default_features
+        return PLAN_FEATURES[plan_type_of(DEVELOPER_PLAN_OVERRIDE)]
     
     try:
-        # First, check user's plan_type in the users table
-        user_result = supabase.table('users').select('plan_type').eq('id', user_id).execute()
-        
-        if user_result.data and user_result.data[0].get('plan_type'):
-            user_plan_type = user_result.data[0]['plan_type']
-            logger.info(f"📋 User {user_id} has plan_type: {user_plan_type}")
-            
-            # Map the plan_type to PlanType enum
-            if user_plan_type == "student_pro":
-                plan_type = PlanType.STUDENT_PRO
-            elif user_plan_type == "academic_plus":
-                plan_type = PlanType.ACADEMIC_PLUS
-            else:
-                plan_type = PlanType.STUDENT
-                
-            # Define features for each plan
-            if plan_type == PlanType.STUDENT_PRO:
-                return PlanFeatures(
-                    plan_type=plan_type,
-                    max_tasks=None,  # Unlimited
-                    max_categories=50,
-                    ai_features=True,
-                    advanced_analytics=True,
-                    export_options=["pdf", "excel", "csv"],
-                    collaboration=True,
-                    custom_themes=True,
-                    priority_support=True,
-                    study_session_tracking=True,
-                    cloud_backup=True,
-                    team_study_groups=True,
-                    lms_integration=False,
-                    custom_study_plans=False,
-                    progress_reports=False,
-                    white_label=False
-                )
-            elif plan_type == PlanType.ACADEMIC_PLUS:
-                return PlanFeatures(
-                    plan_type=plan_type,
-                    max_tasks=None,  # Unlimited
-                    max_categories=100,
-                    ai_features=True,
-                    advanced_analytics=True,
-                    export_options=["pdf", "excel", "csv", "json"],
-                    collaboration=True,
-                    custom_themes=True,
-                    priority_support=True,
-                    study_session_tracking=True,
-                    cloud_backup=True,
-                    team_study_groups=True,
-                    lms_integration=True,
-                    custom_study_plans=True,
-                    progress_reports=True,
-                    white_label=True
-                )
-            else:
-                return default_features
-        
-        # Fallback: Check user's subscription (legacy method)
-        logger.info(f"📋 Checking subscriptions for user {user_id}")
-        subscription_result = supabase.table('user_subscriptions').select('*').eq('user_id', user_id).eq('status', 'active').execute()
-        
-        if not subscription_result.data:
-            logger.info(f"📋 No active subscription found for user {user_id}, using default features")
-            return default_features
-        
-        subscription = subscription_result.data[0]
-        plan_type = PlanType(subscription['plan_type'])
-        
-        # Define features for each plan
-        if plan_type == PlanType.STUDENT_PRO:
-            return PlanFeatures(
-                plan_type=plan_type,
-                max_tasks=None,  # Unlimited
-                max_categories=50,
-                ai_features=True,
-                advanced_analytics=True,
-                export_options=["pdf", "excel", "csv"],
-                collaboration=True,
-                custom_themes=True,
-                priority_support=True,
-                study_session_tracking=True,
-                cloud_backup=True,
-                team_study_groups=True,
-                lms_integration=False,
-                custom_study_plans=False,
-                progress_reports=False,
-                white_label=False
-            )
-        elif plan_type == PlanType.ACADEMIC_PLUS:
-            return PlanFeatures(
-                plan_type=plan_type,
-                max_tasks=None,  # Unlimited
-                max_categories=100,
-                ai_features=True,
-                advanced_analytics=True,
-                export_options=["pdf", "excel", "csv", "json"],
-                collaboration=True,
-                custom_themes=True,
-                priority_support=True,
-                study_session_tracking=True,
-                cloud_backup=True,
-                team_study_groups=True,
-                lms_integration=True,
-                custom_study_plans=True,
-                progress_reports=True,
-                white_label=True
-            )
-        else:
-            return default_features
+        plan = await get_user_plan_state(user_id)
+        return PLAN_FEATURES[plan.plan_type]
     except Exception as e:
+        # Default to free plan if the plan cannot be read (not cached, so the next call retries)
         logger.error(f"Error getting user plan features: {e}")
-        return default_features
+        return PLAN_FEATURES[PlanType.STUDENT]
+
+async def current_plan_features(current_user: dict = Depends(get_current_user)) -> PlanFeatures:
+    """Dependency: the current user's plan features, from the token's plan claim while its version is current;
+    401 when the claim is out of date, 403 once the account is deleted"""
+    claimed_version = current_user.get("plan_version")
+    if claimed_version is None:
+        # tokens issued before the plan claim existed
+        return await get_user_plan_features(current_user["id"])
+    try:
+        plan = await get_user_plan_state(current_user["id"])
+        if plan.version != claimed_version:
+            # without Redis this worker's copy can be the stale one (the plan changed on another worker),
+            # so only the database decides whether the token is out of date
+            plan = await reload_user_plan_state(current_user["id"])
+    except Exception as e:
+        logger.error(f"Error checking plan version: {e}")
+        return await get_user_plan_features(current_user["id"])
+    if plan.deleted:
+        raise HTTPException(status_code=403, detail="Account has been deleted")
+    if plan.version != claimed_version:
+        # e.g. a downgrade since the token was issued - the client refreshes and retries
+        logger.warning(f"❌ Stale plan claim for user {current_user['id']}: {claimed_version} != {plan.version}")
+        raise HTTPException(status_code=401, detail="Plan changed - refresh your access token")
+    claimed_plan = current_user.get("plan_type")
+    return PLAN_FEATURES[plan_type_of(claimed_plan) if claimed_plan else plan.plan_type]
+
+def require_feature(feature: str, detail: str):
+    """Dependency factory: 403 with detail unless the current user's plan includes feature"""
+    if PlanFeatures.model_fields.get(feature) is None or PlanFeatures.model_fields[feature].annotation is not bool:
+        raise ValueError(f"Unknown plan feature: {feature}")
+    
+    async def check(
+        plan_features: PlanFeatures = Depends(current_plan_features),
+        current_user: dict = Depends(get_current_user)
+    ) -> PlanFeatures:
+        logger.info(f"📊 Plan features: {feature}={getattr(plan_features, feature)}, plan_type={plan_features.plan_type}")
+        if not getattr(plan_features, feature):
+            logger.warning(f"❌ User {current_user.get('id')} does not have {feature} enabled")
+            raise HTTPException(status_code=403, detail=detail)
+        return plan_features
+    
+    return check
+
+requires_ai_features = require_feature(
+    "ai_features",
+    "AI features require Student Pro or higher plan. Upgrade to access AI-powered study assistance."
+)
+
+requires_advanced_analytics = require_feature(
+    "advanced_analytics",
+    "Advanced analytics require Student Pro or higher plan. Upgrade to see grade and workload statistics."
+)
 
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
@@ -722,6 +867,42 @@ async def test_register_debug(request: Request):
         "headers": dict(request.headers)
     }
 
+def password_hasher_busy() -> HTTPException:
+    logger.warning(f"⚠️ Password hashing saturated ({password_hasher.queue_depth} waiting) - rejecting")
+    return HTTPException(
+        status_code=503,
+        detail="Too many sign-in requests right now - please try again shortly",
+        headers={"Retry-After": "1"}
+    )
+
+async def hash_password(password: str) -> str:
+    """bcrypt hash on the hashing pool; 503 when it is saturated"""
+    try:
+        return await password_hasher.hash(password)
+    except PasswordHasherBusy:
+        raise password_hasher_busy()
+
+async def verify_password(password: str, password_hash: str) -> bool:
+    """bcrypt check on the hashing pool; 503 when it is saturated"""
+    try:
+        return await password_hasher.verify(password, password_hash)
+    except PasswordHasherBusy:
+        raise password_hasher_busy()
+
+async def rehash_password(user_id: str, password: str, old_hash: str):
+    """Re-hash a password (known correct) at the configured bcrypt cost, unless it was changed meanwhile"""
+    try:
+        new_hash = await password_hasher.hash(password)
+        current = await repos.users.get_by_id(user_id, projections.USER_PASSWORD_CHECK)
+        if not current or current.get("password_hash") != old_hash:
+            return
+        await repos.users.update(user_id, {"password_hash": new_hash}, projections.USER_ID)
+        logger.info(f"🔐 Re-hashed password of user {user_id} at cost {password_hasher.rounds}")
+    except PasswordHasherBusy:
+        logger.info(f"⏭️ Hashing pool busy - re-hash of user {user_id} left for a later login")
+    except Exception as e:
+        logger.warning(f"⚠️ Password re-hash failed for user {user_id}: {e}")
+
 @app.post("/auth/register")
 async def register_user(
     email: str = Form(default=""),
@@ -732,26 +913,12 @@ async def register_user(
     major: str = Form(default=""),
     year_level: int = Form(default=1)
 ):
-    """Register a new user - REAL SUPABASE ONLY"""
+    """Register a new user"""
     logger.info(f"🚀 Registration attempt for: {email}")
     
-    # Force real Supabase - no fallbacks
-    if not supabase:
-        logger.error("❌ Supabase not available - registration failed")
-        raise HTTPException(status_code=503, detail="Database not available")
-    
     try:
-            # Check if user already exists
-            logger.info("🔍 Checking if user already exists...")
-            existing_user = supabase.table('users').select('id').eq('email', email).execute()
-                
-            if existing_user.data:
-                logger.warning(f"⚠️ User with email {email} already exists!")
-                raise HTTPException(status_code=400, detail="Email already registered")
-            
             # Hash the password
-            salt = bcrypt.gensalt()
-            password_hash = bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+            password_hash = await hash_password(password)
             
             # Prepare user data for database insert
             user_data_dict = {
@@ -767,14 +934,18 @@ async def register_user(
                 "updated_at": datetime.utcnow().isoformat()   # Explicitly set updated_at
             }
             
-            # Insert user into database
+            # Insert user into database - the unique email constraint rejects duplicates atomically
             logger.info("🔄 Inserting user into database...")
-            result = supabase.table('users').insert(user_data_dict).execute()
+            try:
+                user = await repos.users.create(user_data_dict, projections.USER_PROFILE)
+            except DuplicateKeyError:
+                logger.warning(f"⚠️ User with email {email} already exists!")
+                raise HTTPException(status_code=400, detail="Email already registered")
 
-            if result.data:
-                user = result.data[0]
+            if user:
                 user_id = user['id']
                 logger.info(f"✅ User created successfully: {user_id}")
+                await profile_cache.set(str(user_id), user)
                 
                 # Create the user's personal tasks table - COMMENTED OUT FOR NOW
                 # table_created = create_user_tasks_table(user_id)
@@ -784,8 +955,9 @@ async def register_user(
                 #     # The table will be created when the user first creates a task
                 
                 # Create JWT token
-                token_payload = {"sub": user_id, "email": email}
-                access_token = create_access_token(token_payload)
+                plan = await load_user_plan(str(user_id), user)
+                await plan_cache.set(str(user_id), plan)
+                access_token = create_user_token(user_id, email, plan)
                 
                 return {
                     "access_token": access_token,
@@ -817,6 +989,8 @@ async def register_user(
 
 @app.post("/auth/login")
 async def login_user(
+    request: Request,
+    background_tasks: BackgroundTasks,
     email: str = Form(...),
     password: str = Form(...)
 ):
@@ -824,41 +998,29 @@ async def login_user(
     logger.info(f"🚀 Login attempt for: {email}")
     logger.info(f"📝 Password length: {len(password)}")
     
+    # Refuse attempt floods before they cost a database read and a bcrypt check
+    retry_after = await login_throttle.check(request.client.host if request.client else "", email)
+    if retry_after is not None:
+        logger.warning(f"🛑 Login throttled for {email}, retry in {retry_after}s")
+        raise HTTPException(
+            status_code=429,
+            detail="Too many login attempts - please try again later",
+            headers={"Retry-After": str(retry_after)}
+        )
+    
     try:
-        logger.info("🔍 Checking if Supabase is available...")
-        if not supabase:
-            logger.warning("⚠️ Supabase not available - using fallback login")
-            # Return mock data for now to keep it working
-            token_payload = {"sub": 1, "email": email}
-            access_token = create_access_token(token_payload)
-            
-            logger.info("✅ Returning fallback login data")
-            return {
-                "access_token": access_token,
-                "token_type": "bearer",
-                "user": {
-                    "id": "1",
-                    "email": email,
-                    "username": "user",
-                    "full_name": "User",
-                    "student_id": "STUDENT001",
-                    "major": "Computer Science",
-                    "year_level": 1
-                }
-            }
-        
-        logger.info("✅ Supabase is available, proceeding with real authentication")
-        
         # Find user by email
         logger.info("🔍 Looking up user...")
-        user_result = supabase.table('users').select('*').eq('email', email).execute()
-        logger.info(f"📝 User query result: {user_result.data}")
+        user = await repos.users.get_by_email(email, projections.USER_LOGIN)
         
-        if not user_result.data:
+        if not user:
             logger.warning(f"⚠️ User with email {email} not found")
             raise HTTPException(status_code=401, detail="Invalid credentials")
         
-        user = user_result.data[0]
+        if user.get('deleted_at'):
+            logger.warning(f"⚠️ Login attempt for deleted account {email}")
+            raise HTTPException(status_code=401, detail="Invalid credentials")
+        
         logger.info(f"✅ User found: {user['username']}")
 
         # Verify password
@@ -866,15 +1028,23 @@ async def login_user(
         stored_password_hash = user.get('password_hash', '')
         logger.info(f"📝 Stored hash length: {len(stored_password_hash)}")
         
-        if not bcrypt.checkpw(password.encode('utf-8'), stored_password_hash.encode('utf-8')):
+        if not await verify_password(password, stored_password_hash):
             logger.warning("❌ Password verification failed")
             raise HTTPException(status_code=401, detail="Invalid credentials")
         
         logger.info("✅ Password verified successfully")
+        await login_throttle.succeeded(email)
+        if password_hasher.needs_rehash(stored_password_hash):
+            # move the hash to the configured cost after the response is sent
+            background_tasks.add_task(rehash_password, str(user["id"]), password, stored_password_hash)
         
         # Create JWT token
-        token_payload = {"sub": user["id"], "email": email}
-        access_token = create_access_token(token_payload)
+        # same rules as every other plan read, including the legacy subscription fallback
+        plan = await load_user_plan(str(user["id"]), user)
+        await plan_cache.set(str(user["id"]), plan)
+        access_token = create_user_token(user["id"], email, plan)
+        # the app calls /auth/me right after logging in - have the profile ready by then
+        background_tasks.add_task(get_user_profile, str(user["id"]))
         
         logger.info("✅ Login successful, returning user data")
         return {
@@ -924,19 +1094,6 @@ async def get_current_user_info(current_user: dict = Depends(get_current_user)):
     logger.info(f"🔍 Getting user info for user ID: {current_user.get('id')}")
     
     try:
-        if not supabase:
-            logger.warning("⚠️ Supabase not available - using fallback user info")
-            # Return fallback data instead of crashing
-            return {
-                "id": "1",
-                "email": "user@example.com",
-                "username": "user",
-                "full_name": "User",
-                "student_id": "STUDENT001",
-                "major": "Computer Science",
-                "year_level": 1
-            }
-        
         user_id = current_user.get('id')
         if not user_id:
             logger.warning("⚠️ No user ID in token - using fallback")
@@ -944,9 +1101,9 @@ async def get_current_user_info(current_user: dict = Depends(get_current_user)):
         
         # Get user from database
         logger.info(f"🔍 Looking up user with ID: {user_id}")
-        user_result = supabase.table('users').select('*').eq('id', user_id).execute()
+        user = await get_user_profile(user_id)
         
-        if not user_result.data:
+        if not user:
             logger.warning(f"⚠️ User with ID {user_id} not found - using fallback")
             # Return fallback data instead of crashing
             return {
@@ -961,11 +1118,10 @@ async def get_current_user_info(current_user: dict = Depends(get_current_user)):
                 "updated_at": datetime.now().isoformat()
             }
         
-        user = user_result.data[0]
         logger.info(f"✅ User found: {user['username']}")
         
         # Get user's plan information
-        plan_features = get_user_plan_features(str(user["id"]))
+        plan_features = await get_user_plan_features(str(user["id"]))
         
         # Ensure created_at is always a valid date string
         created_at = user.get("created_at")
@@ -1062,11 +1218,8 @@ async def test_supabase():
         }
 
 @app.get("/test/task-creation")
-async def test_task_creation(current_user: dict = Depends(get_current_user)):
+async def test_task_creation(current_user: dict = Depends(get_active_user)):
     """Test task creation functionality"""
-    if not supabase:
-        return {"status": "error", "message": "Supabase not configured"}
-    
     try:
         # Test task creation with sample data
         test_task_data = {
@@ -1081,12 +1234,13 @@ async def test_task_creation(current_user: dict = Depends(get_current_user)):
             "estimated_hours": 0
         }
         
-        result = supabase.table('tasks').insert(test_task_data).execute()
+        created_task = await repos.tasks.create(test_task_data, projections.TASK_ID)
         
-        if result.data:
+        if created_task:
             # Clean up test task
-            task_id = result.data[0]["id"]
-            supabase.table('tasks').delete().eq('id', task_id).execute()
+            task_id = created_task["id"]
+            await repos.tasks.delete(task_id, current_user["id"], projections.TASK_ID)
+            tasks_changed(current_user["id"], deleted=[created_task])
             
             return {
                 "status": "success", 
@@ -1106,6 +1260,30 @@ async def health_check():
     return {
         "status": "healthy",
         "database": "connected" if supabase else "disconnected",
+        "storage_backend": repos.backend,
+        "timestamp": datetime.now().isoformat()
+    }
+
+@app.get("/metrics")
+async def metrics():
+    """Process-local performance counters"""
+    return {
+        "single_flight": reads.metrics(),
+        "task_cache": tasks_cache.metrics(),
+        "plan_cache": plan_cache.metrics(),
+        "profile_cache": profile_cache.metrics(),
+        "cache_bus": cache_bus.metrics(),
+        "password_hasher": password_hasher.metrics(),
+        "analytics_reconciler": analytics_reconciler.metrics(),
+        "task_stats": task_stats.metrics(),
+        "login_throttle": {
+            **login_throttle.metrics(),
+            # every refused attempt is a bcrypt check (plus a user lookup) that never ran
+            "bcrypt_checks_avoided": login_throttle.rejected,
+            "estimated_hashing_ms_avoided": round(login_throttle.rejected * password_hasher.metrics()["avg_ms"]),
+        },
+        "assistance_cache": assistance_cache.metrics(),
+        "similarity": similarity_metrics(),
         "timestamp": datetime.now().isoformat()
     }
 
@@ -1119,29 +1297,89 @@ async def test_auth(current_user: dict = Depends(get_current_user)):
     }
 
 # Task endpoints
+def user_data_changed(user_id: str):
+    """Call after every write to a user's rows so later reads do not join a read started before it"""
+    reads.forget_user(user_id)
+
+def tasks_changed(user_id: str, written: List[dict] = (), deleted: List[dict] = ()):
+    """Write-through after a task write: patch the cached task set with the rows the write returned"""
+    tasks_cache.apply(user_id, written, [row["id"] for row in deleted])
+    cache_bus.notify("tasks", user_id)
+    user_data_changed(user_id)
+
+async def cached_task_rows(user_id: str) -> Optional[List[dict]]:
+    """The user's whole task set (TASK_FIELDS) from the task cache, loaded on a miss; None when it is not cacheable"""
+    rows = tasks_cache.get(user_id)
+    if rows is not None or not tasks_cache.enabled or tasks_cache.is_oversized(user_id):
+        return rows
+    
+    async def load():
+        version = tasks_cache.version(user_id)
+        rows = await repos.tasks.list_for_user(user_id, projections.TASK_FIELDS)
+        return tasks_cache.put(user_id, rows, version)
+    
+    # not stored when too large or when a write landed during the read - use the database then.
+    # Read back from the cache so the rows match tasks_cache.tag() even if a write came in meanwhile.
+    await reads.do("tasks.all", user_id, load)
+    return tasks_cache.peek(user_id)
+
+def task_response(task: dict) -> TaskResponse:
+    """Map a tasks row to the API model"""
+    return TaskResponse(
+        id=str(task["id"]),
+        title=task["title"],
+        subject=task["subject"],
+        description=task["description"],
+        due_date=datetime.fromisoformat(task["due_date"]),
+        assignment_type=AssignmentType(task["assignment_type"]),
+        priority=Priority(task["priority"]),
+        status=TaskStatus(task["status"]),
+        user_id=str(task["user_id"]),
+        estimated_hours=task.get("estimated_hours"),
+        grade=task.get("grade"),
+        created_at=datetime.fromisoformat(task["created_at"]),
+        updated_at=datetime.fromisoformat(task["updated_at"]),
+        completed_at=datetime.fromisoformat(task["completed_at"]) if task.get("completed_at") else None
+    )
+
+def new_task_values(task: TaskCreate, user_id: str) -> dict:
+    """Row values for a new task"""
+    return {
+        "title": task.title.strip(),
+        "subject": task.subject.strip(),
+        "description": task.description.strip() if task.description else "",
+        "due_date": task.due_date.isoformat(),
+        "assignment_type": task.assignment_type.value,
+        "priority": task.priority.value,
+        "status": TaskStatus.PENDING.value,
+        "user_id": user_id,
+        "estimated_hours": 0,
+        "grade": task.grade
+    }
+
+def task_update_values(task_update: TaskUpdate) -> dict:
+    """Row values for the fields set in a task update"""
+    update_data = {}
+    if task_update.subject is not None:
+        update_data["subject"] = task_update.subject
+    if task_update.description is not None:
+        update_data["description"] = task_update.description
+    if task_update.due_date is not None:
+        update_data["due_date"] = task_update.due_date.isoformat()
+    if task_update.assignment_type is not None:
+        update_data["assignment_type"] = task_update.assignment_type.value
+    if task_update.priority is not None:
+        update_data["priority"] = task_update.priority.value
+    if task_update.status is not None:
+        update_data["status"] = task_update.status.value
+    if task_update.grade is not None:
+        update_data["grade"] = task_update.grade
+    return update_data
+
 @app.post("/tasks/", response_model=TaskResponse)
-def create_task(task: TaskCreate, current_user: dict = Depends(get_current_user)):
+async def create_task(task: TaskCreate, current_user: dict = Depends(get_active_user)):
     """Create a new task"""
     
-    if not supabase:
-        logger.error("❌ Supabase connection not available")
-        # Return a mock response for testing purposes
-        return TaskResponse(
-            id="temp-" + str(int(datetime.now().timestamp())),
-            title=task.title,
-            subject=task.subject,
-            description=task.description,
-            due_date=task.due_date,
-            assignment_type=task.assignment_type,
-            priority=task.priority,
-            status=TaskStatus.PENDING,
-            user_id=current_user["id"],
-            estimated_hours=0,
-            grade=task.grade,
-            created_at=datetime.now(),
-            updated_at=datetime.now()
-        )
-    
     try:
         # Validate all required fields
         if not task.title or not task.title.strip():
@@ -1171,76 +1409,24 @@ def create_task(task: TaskCreate, current_user: dict = Depends(get_current_user)
             raise HTTPException(status_code=400, detail="Priority is required")
         
         # Prepare task data for database (using snake_case to match actual schema)
-        task_data = {
-            "title": task.title.strip(),
-            "subject": task.subject.strip(),
-            "description": task.description.strip() if task.description else "",
-            "due_date": task.due_date.isoformat(),
-            "assignment_type": task.assignment_type.value,
-            "priority": task.priority.value,
-            "status": TaskStatus.PENDING.value,
-            "user_id": current_user["id"],
-            "estimated_hours": 0,
-            "grade": task.grade
-        }
+        task_data = new_task_values(task, current_user["id"])
         
         logger.info(f"📝 Creating task for user {current_user['id']}: {task_data['title']}")
-        logger.info(f"🔍 Task data being sent to Supabase: {task_data}")
+        logger.info(f"🔍 Task data being sent to {repos.backend}: {task_data}")
         
-        # Insert task into Supabase with better error handling
+        # Insert task with better error handling
         try:
-            logger.info(f"🔄 Executing Supabase insert...")
-            result = supabase.table('tasks').insert(task_data).execute()
-            logger.info(f"✅ Supabase insert completed. Result: {result}")
-            logger.info(f"🔍 Raw result data: {result.data}")
-            logger.info(f"🔍 Result type: {type(result)}")
+            logger.info(f"🔄 Executing insert...")
+            created_task = await repos.tasks.create(task_data, projections.TASK_FIELDS)
+            tasks_changed(current_user["id"], written=[created_task] if created_task else [])
+            logger.info(f"🔍 Raw result data: {created_task}")
             
-            if result.data and len(result.data) > 0:
-                created_task = result.data[0]
+            if created_task:
                 logger.info(f"✅ Task created successfully: {created_task['id']}")
                 
-                # Safely parse datetime fields with null checking
-                due_date_str = created_task.get("due_date")
-                if not due_date_str:
-                    logger.error(f"❌ Missing due_date in created task: {created_task}")
-                    raise HTTPException(status_code=500, detail="Task created but due_date is missing")
-                
-                created_at_str = created_task.get("created_at")
-                if not created_at_str:
-                    logger.error(f"❌ Missing created_at in created task: {created_task}")
-                    raise HTTPException(status_code=500, detail="Task created but created_at is missing")
-                
-                updated_at_str = created_task.get("updated_at")
-                if not updated_at_str:
-                    logger.error(f"❌ Missing updated_at in created task: {created_task}")
-                    raise HTTPException(status_code=500, detail="Task created but updated_at is missing")
-                
-                try:
-                    parsed_due_date = datetime.fromisoformat(due_date_str)
-                    parsed_created_at = datetime.fromisoformat(created_at_str)
-                    parsed_updated_at = datetime.fromisoformat(updated_at_str)
-                except (ValueError, TypeError) as parse_error:
-                    logger.error(f"❌ Failed to parse datetime fields: {parse_error}")
-                    logger.error(f"❌ due_date: {due_date_str}, created_at: {created_at_str}, updated_at: {updated_at_str}")
-                    raise HTTPException(status_code=500, detail=f"Failed to parse datetime fields: {str(parse_error)}")
-                
-                return TaskResponse(
-                    id=str(created_task["id"]),
-                    title=created_task["title"],
-                    subject=created_task["subject"],
-                    description=created_task["description"],
-                    due_date=parsed_due_date,
-                    assignment_type=AssignmentType(created_task["assignment_type"]),
-                    priority=Priority(created_task["priority"]),
-                    status=TaskStatus(created_task["status"]),
-                    user_id=created_task["user_id"],
-                    estimated_hours=created_task.get("estimated_hours"),
-                    grade=created_task.get("grade"),
-                    created_at=parsed_created_at,
-                    updated_at=parsed_updated_at
-                )
+                return task_response(created_task)
             else:
-                logger.error("❌ Task creation failed - no data returned from Supabase")
+                logger.error("❌ Task creation failed - no data returned from database")
                 raise HTTPException(status_code=500, detail="Task creation failed - database error")
                 
         except Exception as db_error:
@@ -1268,137 +1454,344 @@ def create_task(task: TaskCreate, current_user: dict = Depends(get_current_user)
         logger.error(f"❌ Unexpected error during task creation: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to create task: {str(e)}")
 
+def task_set_etag(user_id: str, *parts) -> Optional[str]:
+    """Strong ETag for a response built from the cached task set and parts (endpoint, query); None if not cached"""
+    tag = tasks_cache.tag(user_id)
+    if tag is None:
+        return None
+    return '"' + hashlib.sha1(repr((tag,) + parts).encode("utf-8")).hexdigest() + '"'
+
+def content_etag(*parts) -> str:
+    """Strong ETag for a response body that does not come from the task cache (database counters, rollups)"""
+    return '"' + hashlib.sha1(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest() + '"'
+
+def not_modified(request: Request, response: Response, etag: Optional[str]) -> Optional[Response]:
+    """Attach etag to response; returns a 304 to send instead when If-None-Match already names it"""
+    if etag is None:
+        return None
+    response.headers["ETag"] = etag
+    # the browser revalidates on every request, so fresh data shows up after writes
+    response.headers["Cache-Control"] = "private, no-cache"
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return None
+    candidates = [c.strip().removeprefix("W/") for c in if_none_match.split(",")]
+    if etag not in candidates and "*" not in candidates:
+        return None
+    headers = {name: response.headers[name] for name in ("ETag", "Cache-Control", "X-Next-Cursor") if name in response.headers}
+    return Response(status_code=304, headers=headers)
+
 @app.get("/tasks/", response_model=List[TaskResponse])
-def get_tasks(current_user: dict = Depends(get_current_user)):
-    """Get all tasks for the current user"""
+async def get_tasks(
+    request: Request,
+    response: Response,
+    task_status: Optional[TaskStatus] = Query(default=None, alias="status"),
+    subject: Optional[str] = None,
+    assignment_type: Optional[AssignmentType] = None,
+    priority: Optional[Priority] = None,
+    due_from: Optional[datetime] = None,
+    due_to: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(default=task_page_size, ge=1, le=task_page_max),
+    current_user: dict = Depends(get_current_user)
+):
+    """Get a page of the current user's tasks ordered by due date; X-Next-Cursor points to the next page"""
     
-    if not supabase:
-        return []
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    filters = TaskFilters(
+        status=task_status.value if task_status else None,
+        subject=subject,
+        assignment_type=assignment_type.value if assignment_type else None,
+        priority=priority.value if priority else None,
+        due_from=due_from.isoformat() if due_from else None,
+        due_to=due_to.isoformat() if due_to else None,
+    )
     
     try:
-        # Get tasks for current user
-        result = supabase.table('tasks').select('*').eq('user_id', current_user["id"]).execute()
-        
-        if result.data:
-            tasks = []
-            for task in result.data:
-                tasks.append(TaskResponse(
-                    id=str(task["id"]),
-                    title=task["title"],
-                    subject=task["subject"],
-                    description=task["description"],
-                    due_date=datetime.fromisoformat(task["due_date"]),
-                    assignment_type=AssignmentType(task["assignment_type"]),
-                    priority=Priority(task["priority"]),
-                    status=TaskStatus(task["status"]),
-                    user_id=str(task["user_id"]),
-                    estimated_hours=task.get("estimated_hours"),
-                    grade=task.get("grade"),
-                    created_at=datetime.fromisoformat(task["created_at"]),
-                    updated_at=datetime.fromisoformat(task["updated_at"])
-                ))
-            return tasks
+        # Get one page of tasks for current user - from the cached task set when there is one.
+        # Due-date ranges go to the database as an index range over (user_id, due_date, id); the
+        # bounds and the stored due dates are both UTC, so they compare correctly as strings.
+        cached = None
+        if filters.due_from is None and filters.due_to is None:
+            cached = await cached_task_rows(current_user["id"])
+        if cached is not None:
+            # answer a revalidation before paging through the set; the 304 leaves the client's
+            # stored X-Next-Cursor in place
+            unchanged = not_modified(request, response, task_set_etag(current_user["id"], "tasks", filters, cursor, limit))
+            if unchanged:
+                return unchanged
+            page = page_rows(cached, filters, after, limit)
         else:
-            return []
+            page = await reads.do(
+                "tasks.page", (current_user["id"], filters, after, limit),
+                lambda: repos.tasks.list_page(current_user["id"], projections.TASK_FIELDS, filters, after, limit)
+            )
+        rows = page.items
+        if page.next_cursor:
+            response.headers["X-Next-Cursor"] = page.next_cursor
+        
+        return [task_response(task) for task in rows]
             
     except Exception as e:
         logger.error(f"Task fetching error: {e}")
         return []
 
 @app.get("/tasks/analytics")
-def get_analytics(current_user: dict = Depends(get_current_user)):
-    """Get task analytics for the current user"""
-    
-    if not supabase:
-        return {
-            "total_tasks": 0,
-            "completed_tasks": 0,
-            "pending_tasks": 0,
-            "in_progress_tasks": 0,
-            "completion_rate": 0,
-            "assignment_types": {},
-            "priorities": {}
-        }
+async def get_analytics(request: Request, response: Response, current_user: dict = Depends(get_current_user)):
+    """Get task analytics for the current user (aggregated by the database, never from the task rows)"""
     
     try:
-        # Get all tasks for user
-        result = supabase.table('tasks').select('*').eq('user_id', current_user["id"]).execute()
-        
-        if result.data:
-            tasks = result.data
-            total_tasks = len(tasks)
-            completed_tasks = len([t for t in tasks if t["status"] == "completed"])
-            pending_tasks = len([t for t in tasks if t["status"] == "pending"])
-            in_progress_tasks = len([t for t in tasks if t["status"] == "in_progress"])
+        # the counters live in the database and are shared by every worker, so the validator is
+        # taken from them rather than from this process's task cache
+        analytics = await reads.do("analytics", current_user["id"], lambda: user_analytics(repos, current_user["id"]))
+        unchanged = not_modified(request, response, content_etag("analytics", analytics))
+        if unchanged:
+            return unchanged
+        return analytics
             
-            # Calculate completion rate
-            completion_rate = (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
-            
-            # Count assignment types
-            assignment_types = {}
-            for task in tasks:
-                assignment_type = task["assignment_type"]
-                assignment_types[assignment_type] = assignment_types.get(assignment_type, 0) + 1
+    except Exception as e:
+        logger.error(f"Analytics error: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to fetch analytics: {str(e)}")
+
+@app.get("/dashboard", response_model=DashboardResponse)
+async def get_dashboard(request: Request, response: Response, current_user: dict = Depends(get_current_user)):
+    """Counts, breakdowns, upcoming and recent tasks for the dashboard, from one read of the task set"""
+    
+    try:
+        user_id = current_user["id"]
+        rows = await cached_task_rows(user_id)
+        unchanged = not_modified(
+            request, response, task_set_etag(user_id, "dashboard", dashboard_task_limit) if rows is not None else None
+        )
+        if unchanged:
+            return unchanged
+        if rows is None:
+            # too many tasks to cache - still a single query, shared by concurrent dashboard loads
+            rows = await reads.do(
+                "tasks.dashboard", user_id, lambda: repos.tasks.list_for_user(user_id, projections.TASK_FIELDS)
+            )
+        
+        summary = dashboard_summary(rows, dashboard_task_limit)
+        return DashboardResponse(**{
+            **summary,
+            "upcoming": [task_response(task) for task in summary["upcoming"]],
+            "recent": [task_response(task) for task in summary["recent"]],
+        })
             
-            # Count priorities
-            priorities = {}
-            for task in tasks:
-                priority = task["priority"]
-                priorities[priority] = priorities.get(priority, 0) + 1
+    except Exception as e:
+        logger.error(f"Dashboard error: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to load dashboard: {str(e)}")
+
+@app.get("/tasks/analytics/timeseries")
+async def get_analytics_timeseries(
+    request: Request,
+    response: Response,
+    start: Optional[date] = Query(default=None, alias="from"),
+    end: Optional[date] = Query(default=None, alias="to"),
+    granularity: str = Query(default="week"),
+    current_user: dict = Depends(get_current_user)
+):
+    """Created / completed / overdue tasks and average grade per day or week (from the rollups, only the buckets in range)"""
+    
+    if granularity not in ROLLUP_GRANULARITIES:
+        raise HTTPException(status_code=400, detail=f"granularity must be one of: {', '.join(ROLLUP_GRANULARITIES)}")
+    today = datetime.now(timezone.utc).date()
+    end = end or today
+    step = bucket_step(granularity)
+    start = start or end - step * 11
+    if start > end:
+        raise HTTPException(status_code=400, detail="from must not be after to")
+    if (end - start) // step + 1 > timeseries_max_buckets:
+        raise HTTPException(status_code=400, detail=f"At most {timeseries_max_buckets} buckets per request")
+    
+    try:
+        # built from the rollup counters, so the validator is taken from the series itself
+        series = await reads.do(
+            "timeseries", (current_user["id"], granularity, start, end, today),
+            lambda: user_timeseries(repos, current_user["id"], granularity, start, end, today)
+        )
+        unchanged = not_modified(request, response, content_etag("timeseries", series))
+        if unchanged:
+            return unchanged
+        return series
             
-            return {
-                "total_tasks": total_tasks,
-                "completed_tasks": completed_tasks,
-                "pending_tasks": pending_tasks,
-                "in_progress_tasks": in_progress_tasks,
-                "completion_rate": round(completion_rate, 1),
-                "assignment_types": assignment_types,
-                "priorities": priorities
-            }
-        else:
-            return {
-                "total_tasks": 0,
-                "completed_tasks": 0,
-                "pending_tasks": 0,
-                "in_progress_tasks": 0,
-                "completion_rate": 0,
-                "assignment_types": {},
-                "priorities": {}
-            }
+    except Exception as e:
+        logger.error(f"Timeseries analytics error: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to fetch analytics timeseries: {str(e)}")
+
+@app.get("/tasks/analytics/advanced")
+async def get_advanced_analytics(
+    request: Request,
+    response: Response,
+    current_user: dict = Depends(get_current_user),
+    plan_features: PlanFeatures = Depends(requires_advanced_analytics)
+):
+    """Per-subject grade statistics, on-time completion, lead times and grade / lead time correlation"""
+    
+    try:
+        user_id = current_user["id"]
+        rows = await cached_task_rows(user_id)
+        # the tag names the cached set the rows came from; None (not cacheable) means computed every time
+        version = tasks_cache.tag(user_id) if rows is not None else None
+        unchanged = not_modified(request, response, task_set_etag(user_id, "advanced") if version else None)
+        if unchanged:
+            return unchanged
+        
+        async def load_rows():
+            if rows is not None:
+                return rows
+            return await reads.do("tasks.stats", user_id, lambda: repos.tasks.list_for_user(user_id, projections.TASK_FIELDS))
+        
+        return await task_stats.statistics(user_id, version, load_rows)
             
     except Exception as e:
-        logger.error(f"Analytics error: {e}")
-        raise HTTPException(status_code=500, detail=f"Failed to fetch analytics: {str(e)}")
+        logger.error(f"Advanced analytics error: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to fetch advanced analytics: {str(e)}")
+
+@app.get("/tasks/search", response_model=List[TaskResponse])
+async def search_tasks(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    task_status: Optional[TaskStatus] = Query(default=None, alias="status"),
+    cursor: Optional[str] = None,
+    limit: int = Query(default=20, ge=1, le=100),
+    current_user: dict = Depends(get_current_user)
+):
+    """Full-text search over the current user's tasks, best match first; X-Next-Cursor points to the next page"""
+    
+    try:
+        offset = decode_offset(cursor) if cursor else 0
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    terms = search_terms(q)
+    if not terms:
+        return []
+    
+    try:
+        status_value = task_status.value if task_status else None
+        page = await reads.do(
+            "tasks.search", (current_user["id"], tuple(terms), status_value, offset, limit),
+            lambda: repos.tasks.search(
+                current_user["id"], terms, projections.TASK_FIELDS, status=status_value, offset=offset, limit=limit
+            )
+        )
+        if page.next_cursor:
+            response.headers["X-Next-Cursor"] = page.next_cursor
+        return [task_response(task) for task in page.items]
+    except Exception as e:
+        logger.error(f"❌ Task search error: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to search tasks: {str(e)}")
+
+def check_batch_size(count: int):
+    if count == 0:
+        raise HTTPException(status_code=400, detail="Batch is empty")
+    if count > task_batch_max:
+        raise HTTPException(status_code=400, detail=f"Batch is limited to {task_batch_max} tasks")
+
+def batch_response(results: List[TaskBatchItem]) -> TaskBatchResponse:
+    succeeded = len([r for r in results if r.status < 400])
+    return TaskBatchResponse(results=results, succeeded=succeeded, failed=len(results) - succeeded)
+
+@app.post("/tasks/batch", response_model=TaskBatchResponse)
+async def create_tasks_batch(batch: TaskBatchCreate, current_user: dict = Depends(get_active_user)):
+    """Create several tasks with one insert; each item is validated like POST /tasks/"""
+    check_batch_size(len(batch.tasks))
+    logger.info(f"📝 Batch creating {len(batch.tasks)} tasks for user {current_user['id']}")
+    
+    results: List[Optional[TaskBatchItem]] = [None] * len(batch.tasks)
+    valid_rows, valid_indexes = [], []
+    for index, item in enumerate(batch.tasks):
+        try:
+            task = TaskCreate.model_validate(item)
+        except ValidationError as e:
+            errors = "; ".join(f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors())
+            results[index] = TaskBatchItem(index=index, status=422, error=errors)
+            continue
+        if not task.title.strip() or not task.subject.strip():
+            results[index] = TaskBatchItem(index=index, status=400, error="Task title and subject cannot be empty")
+            continue
+        valid_rows.append(new_task_values(task, current_user["id"]))
+        valid_indexes.append(index)
+    
+    try:
+        created = await repos.tasks.create_many(valid_rows, projections.TASK_FIELDS)
+        tasks_changed(current_user["id"], written=created)
+        for index, row in zip(valid_indexes, created):
+            results[index] = TaskBatchItem(index=index, id=str(row["id"]), status=201, task=task_response(row))
+        logger.info(f"✅ Batch created {len(created)} tasks")
+        return batch_response(results)
+    except Exception as e:
+        logger.error(f"❌ Batch task creation error: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to create tasks: {str(e)}")
+
+@app.patch("/tasks/batch", response_model=TaskBatchResponse)
+async def update_tasks_batch(batch: TaskBatchUpdate, current_user: dict = Depends(get_active_user)):
+    """Apply the same change (validated like PUT /tasks/{id}) to several tasks with one update"""
+    check_batch_size(len(batch.ids))
+    update_data = task_update_values(batch.changes)
+    if not update_data:
+        raise HTTPException(status_code=400, detail="No fields to update")
+    logger.info(f"🔄 Batch updating {len(batch.ids)} tasks for user {current_user['id']}")
+    
+    try:
+        updated = await repos.tasks.update_many(batch.ids, current_user["id"], update_data, projections.TASK_FIELDS)
+        tasks_changed(current_user["id"], written=updated)
+        by_id = {str(row["id"]): row for row in updated}
+        results = [
+            TaskBatchItem(index=index, id=task_id, status=200, task=task_response(by_id[task_id]))
+            if task_id in by_id else TaskBatchItem(index=index, id=task_id, status=404, error="Task not found")
+            for index, task_id in enumerate(batch.ids)
+        ]
+        logger.info(f"✅ Batch updated {len(updated)} tasks")
+        return batch_response(results)
+    except Exception as e:
+        logger.error(f"❌ Batch task update error: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to update tasks: {str(e)}")
+
+@app.delete("/tasks/batch", response_model=TaskBatchResponse)
+async def delete_tasks_batch(batch: TaskBatchDelete, current_user: dict = Depends(get_active_user)):
+    """Delete several tasks with one statement"""
+    check_batch_size(len(batch.ids))
+    logger.info(f"🗑️ Batch deleting {len(batch.ids)} tasks for user {current_user['id']}")
+    
+    try:
+        deleted = await repos.tasks.delete_many(batch.ids, current_user["id"], projections.TASK_ID)
+        tasks_changed(current_user["id"], deleted=deleted)
+        deleted_ids = {str(row["id"]) for row in deleted}
+        results = [
+            TaskBatchItem(index=index, id=task_id, status=200)
+            if task_id in deleted_ids else TaskBatchItem(index=index, id=task_id, status=404, error="Task not found")
+            for index, task_id in enumerate(batch.ids)
+        ]
+        logger.info(f"✅ Batch deleted {len(deleted)} tasks")
+        return batch_response(results)
+    except Exception as e:
+        logger.error(f"❌ Batch task deletion error: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to delete tasks: {str(e)}")
 
 @app.get("/tasks/{task_id}", response_model=TaskResponse)
-def get_task(task_id: str, current_user: dict = Depends(get_current_user)):
+async def get_task(task_id: str, current_user: dict = Depends(get_current_user)):
     """Get a specific task"""
     
-    if not supabase:
-        raise HTTPException(status_code=503, detail="Database not available")
-    
     try:
-        # Get task by ID and user
-        result = supabase.table('tasks').select('*').eq('id', task_id).eq('user_id', current_user["id"]).execute()
+        # Get task by ID and user - a cached task set is complete, so a miss there is a 404
+        cached = tasks_cache.get(current_user["id"])
+        if cached is not None:
+            task = next((t for t in cached if str(t["id"]) == task_id), None)
+        else:
+            task = await reads.do(
+                "tasks.get", (current_user["id"], task_id),
+                lambda: repos.tasks.get(task_id, current_user["id"], projections.TASK_FIELDS)
+            )
         
-        if result.data:
-            task = result.data[0]
+        if task:
             
-            return TaskResponse(
-                id=str(task["id"]),
-                title=task["title"],
-                subject=task["subject"],
-                description=task["description"],
-                due_date=datetime.fromisoformat(task["due_date"]),
-                assignment_type=AssignmentType(task["assignment_type"]),
-                priority=Priority(task["priority"]),
-                status=TaskStatus(task["status"]),
-                user_id=str(task["user_id"]),
-                estimated_hours=task.get("estimated_hours"),
-                grade=task.get("grade"),
-                created_at=datetime.fromisoformat(task["created_at"]),
-                updated_at=datetime.fromisoformat(task["updated_at"])
-            )
+            return task_response(task)
         else:
             raise HTTPException(status_code=404, detail="Task not found")
             
@@ -1409,56 +1802,25 @@ def get_task(task_id: str, current_user: dict = Depends(get_current_user)):
         raise HTTPException(status_code=500, detail=f"Failed to get task: {str(e)}")
 
 @app.put("/tasks/{task_id}", response_model=TaskResponse)
-def update_task(task_id: str, task_update: TaskUpdate, current_user: dict = Depends(get_current_user)):
-    """Update a specific task - REAL SUPABASE"""
+async def update_task(task_id: str, task_update: TaskUpdate, current_user: dict = Depends(get_active_user)):
+    """Update a specific task"""
     logger.info(f"🔄 Updating task: {task_id}")
     
-    if not supabase:
-        raise HTTPException(status_code=503, detail="Database not available")
-    
     try:
         # Prepare update data
-        update_data = {}
-        if task_update.subject is not None:
-            update_data["subject"] = task_update.subject
-        if task_update.description is not None:
-            update_data["description"] = task_update.description
-        if task_update.due_date is not None:
-            update_data["due_date"] = task_update.due_date.isoformat()
-        if task_update.assignment_type is not None:
-            update_data["assignment_type"] = task_update.assignment_type.value
-        if task_update.priority is not None:
-            update_data["priority"] = task_update.priority.value
-        if task_update.status is not None:
-            update_data["status"] = task_update.status.value
-        if task_update.grade is not None:
-            update_data["grade"] = task_update.grade
+        update_data = task_update_values(task_update)
         
         if not update_data:
             raise HTTPException(status_code=400, detail="No fields to update")
         
         # Update task
-        result = supabase.table('tasks').update(update_data).eq('id', task_id).eq('user_id', current_user["id"]).execute()
+        updated_task = await repos.tasks.update(task_id, current_user["id"], update_data, projections.TASK_FIELDS)
+        tasks_changed(current_user["id"], written=[updated_task] if updated_task else [])
         
-        if result.data:
-            updated_task = result.data[0]
+        if updated_task:
             logger.info(f"✅ Task updated successfully: {updated_task['subject']}")
             
-            return TaskResponse(
-                id=str(updated_task["id"]),
-                title=updated_task["title"],
-                subject=updated_task["subject"],
-                description=updated_task["description"],
-                due_date=datetime.fromisoformat(updated_task["due_date"]),
-                assignment_type=AssignmentType(updated_task["assignment_type"]),
-                priority=Priority(updated_task["priority"]),
-                status=TaskStatus(updated_task["status"]),
-                user_id=str(updated_task["user_id"]),
-                estimated_hours=updated_task.get("estimated_hours"),
-                grade=updated_task.get("grade"),
-                created_at=datetime.fromisoformat(updated_task["created_at"]),
-                updated_at=datetime.fromisoformat(updated_task["updated_at"])
-            )
+            return task_response(updated_task)
         else:
             logger.warning(f"⚠️ Task not found for update: {task_id}")
             raise HTTPException(status_code=404, detail="Task not found")
@@ -1470,58 +1832,86 @@ def update_task(task_id: str, task_update: TaskUpdate, current_user: dict = Depe
         raise HTTPException(status_code=500, detail=f"Failed to update task: {str(e)}")
 
 @app.delete("/tasks/{task_id}")
-def delete_task(task_id: str, current_user: dict = Depends(get_current_user)):
-    """Delete a specific task - REAL SUPABASE"""
+async def delete_task(task_id: str, current_user: dict = Depends(get_active_user)):
+    """Delete a specific task"""
     logger.info(f"🗑️ Deleting task: {task_id}")
-    if not supabase:
-        logger.error("❌ Supabase not available - task deletion failed")
-        raise HTTPException(status_code=503, detail="Database not available")
     try:
-        # Check if task exists and belongs to user
-        task_result = supabase.table('tasks').select('*').eq('id', task_id).eq('user_id', current_user["id"]).execute()
-        if not task_result.data:
+        # Delete task - the returned row tells us whether it existed and belonged to the user
+        deleted_task = await repos.tasks.delete(task_id, current_user["id"], projections.TASK_ID)
+        tasks_changed(current_user["id"], deleted=[deleted_task] if deleted_task else [])
+        if not deleted_task:
             raise HTTPException(status_code=404, detail="Task not found")
         
-        # Delete task
-        result = supabase.table('tasks').delete().eq('id', task_id).eq('user_id', current_user["id"]).execute()
         logger.info(f"✅ Task deleted successfully: {task_id}")
         return {"message": "Task deleted successfully"}
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"❌ Task deletion error: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to delete task: {str(e)}")
 
+# Bump whenever a prompt in generate_academic_assistance changes - retires responses cached for the old prompts
+ACADEMIC_PROMPT_VERSION = "1"
+
+def assistance_response(task_id: str, entry: dict) -> AcademicAssistantResponse:
+    """Map a stored assistance entry to the API model"""
+    created_at = entry["created_at"]
+    if isinstance(created_at, str):
+        created_at = datetime.fromisoformat(created_at)
+    return AcademicAssistantResponse(task_id=task_id, created_at=created_at, **entry["payload"])
+
 @app.post("/ai/generate-academic-assistance", response_model=AcademicAssistantResponse)
-async def generate_academic_assistance(request: AcademicAssistantRequest, current_user: dict = Depends(get_current_user)):
+async def generate_academic_assistance(
+    request: AcademicAssistantRequest,
+    # claim only: requires_ai_features already refuses deleted accounts from plan_cache
+    current_user: dict = Depends(get_current_user),
+    plan_features: PlanFeatures = Depends(requires_ai_features)
+):
     """Generate AI-powered academic assistance for a task"""
     
     logger.info(f"🎯 Academic Assistant request received for user: {current_user.get('id')}")
     logger.info(f"📋 Request data: {request}")
     
-    # Check if user has AI features enabled
-    plan_features = get_user_plan_features(current_user.get('id'))
-    logger.info(f"📊 Plan features: ai_features={plan_features.ai_features}, plan_type={plan_features.plan_type}")
-    
-    if not plan_features.ai_features:
-        logger.warning(f"❌ User {current_user.get('id')} does not have AI features enabled")
-        raise HTTPException(
-            status_code=403, 
-            detail="AI features require Student Pro or higher plan. Upgrade to access AI-powered study assistance."
-        )
-    
     """Generate comprehensive academic assistance based on task type"""
     logger.info(f"🤖 Generating academic assistance for task: {request.task_id}")
     logger.info(f"📝 Request data: subject={request.subject}, assignment_type={request.assignment_type}, description={request.description[:100]}...")
     
-    if not anthropic_api_key:
-        logger.error("❌ Claude API key not available")
-        raise HTTPException(status_code=503, detail="AI service not available")
-    
     try:
         # Validate required fields
         if not request.task_id or not request.subject or not request.description or not request.assignment_type:
             logger.error(f"❌ Missing required fields: task_id={request.task_id}, subject={request.subject}, assignment_type={request.assignment_type}")
             raise HTTPException(status_code=400, detail="Missing required fields: task_id, subject, description, or assignment_type")
         
+        # Same prompt inputs as an earlier request -> serve the stored response (no model call)
+        cache_key = assistance_cache.key_for(
+            request.subject, request.assignment_type, request.description, request.difficulty_level,
+            ACADEMIC_PROMPT_VERSION
+        )
+        similarity_bucket = SimilarityIndex.bucket(
+            request.subject, request.assignment_type, request.difficulty_level, ACADEMIC_PROMPT_VERSION
+        )
+        cached = await assistance_cache.lookup(cache_key)
+        if cached:
+            logger.info(f"⚡ Serving cached academic assistance for task: {request.task_id}")
+            assistance_index.add(similarity_bucket, request.description, cache_key)
+            await assistance_cache.link(current_user["id"], request.task_id, cache_key)
+            return assistance_response(request.task_id, cached)
+        
+        # A near-identical description (same subject, type and difficulty) was answered before -> reuse it
+        similar = assistance_index.find(similarity_bucket, request.description)
+        if similar:
+            cached = await assistance_cache.lookup(similar.value)
+            if cached:
+                logger.info(f"⚡ Reusing academic assistance of a similar task ({similar.similarity:.2f}) for task: {request.task_id}")
+                await assistance_cache.link(current_user["id"], request.task_id, similar.value)
+                return assistance_response(request.task_id, cached)
+            # the entry expired or was evicted
+            assistance_index.remove(similar.item_id)
+        
+        if not anthropic_api_key:
+            logger.error("❌ Claude API key not available")
+            raise HTTPException(status_code=503, detail="AI service not available")
+        
         # Create Claude client
         client = anthropic.Anthropic(api_key=anthropic_api_key)
         logger.info("✅ Claude client created successfully")
@@ -1787,19 +2177,26 @@ Format as JSON with these exact keys:
             try:
                 import json
                 parsed_response = json.loads(response_content)
+                payload = {
+                    "recommended_approach": parsed_response.get("recommended_approach", "Approach not available"),
+                    "resources_and_tools": parsed_response.get("resources_and_tools", []),
+                    "step_by_step_guidance": parsed_response.get("step_by_step_guidance", []),
+                    "tips_and_strategies": parsed_response.get("tips_and_strategies", []),
+                    "time_management": parsed_response.get("time_management", {}),
+                    "success_metrics": parsed_response.get("success_metrics", []),
+                    "related_skills": parsed_response.get("related_skills", [])
+                }
                 
-                # Return the academic assistance response directly (no database saving)
-                return AcademicAssistantResponse(
-                    task_id=request.task_id,
-                    recommended_approach=parsed_response.get("recommended_approach", "Approach not available"),
-                    resources_and_tools=parsed_response.get("resources_and_tools", []),
-                    step_by_step_guidance=parsed_response.get("step_by_step_guidance", []),
-                    tips_and_strategies=parsed_response.get("tips_and_strategies", []),
-                    time_management=parsed_response.get("time_management", {}),
-                    success_metrics=parsed_response.get("success_metrics", []),
-                    related_skills=parsed_response.get("related_skills", []),
-                    created_at=datetime.now()
+                # Store the response for identical requests and for GET /ai/academic-assistance/{task_id}
+                entry = await assistance_cache.store(
+                    cache_key, request.subject, request.assignment_type, ACADEMIC_PROMPT_VERSION, payload
                 )
+                if entry:
+                    assistance_index.add(similarity_bucket, request.description, cache_key)
+                    await assistance_cache.link(current_user["id"], request.task_id, cache_key)
+                    return assistance_response(request.task_id, entry)
+                
+                return AcademicAssistantResponse(task_id=request.task_id, created_at=datetime.now(), **payload)
             except json.JSONDecodeError:
                 # If JSON parsing fails, return a structured response
                 return AcademicAssistantResponse(
@@ -1818,6 +2215,8 @@ Format as JSON with these exact keys:
             logger.error(f"Claude API error: {api_error}")
             raise HTTPException(status_code=503, detail="AI service temporarily unavailable. Please try again later.")
             
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Academic assistance generation error: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to generate academic assistance: {str(e)}")
@@ -1828,51 +2227,13 @@ async def get_user_plan_features_endpoint(current_user: dict = Depends(get_curre
     logger.info(f"📋 Getting plan features for user {current_user.get('id')}")
     
     try:
-        plan_features = get_user_plan_features(current_user.get('id'))
+        plan_features = await get_user_plan_features(current_user.get('id'))
         
-        return {
-            "plan_type": plan_features.plan_type.value,
-            "features": {
-                "max_tasks": plan_features.max_tasks,
-                "max_categories": plan_features.max_categories,
-                "ai_features": plan_features.ai_features,
-                "advanced_analytics": plan_features.advanced_analytics,
-                "export_options": plan_features.export_options,
-                "collaboration": plan_features.collaboration,
-                "custom_themes": plan_features.custom_themes,
-                "priority_support": plan_features.priority_support,
-                "study_session_tracking": plan_features.study_session_tracking,
-                "cloud_backup": plan_features.cloud_backup,
-                "team_study_groups": plan_features.team_study_groups,
-                "lms_integration": plan_features.lms_integration,
-                "custom_study_plans": plan_features.custom_study_plans,
-                "progress_reports": plan_features.progress_reports,
-                "white_label": plan_features.white_label
-            }
-        }
+        return PLAN_FEATURE_RESPONSES[plan_features.plan_type]
     except Exception as e:
         logger.error(f"❌ Error getting plan features: {e}")
         # Return default free plan features on error
-        return {
-            "plan_type": "student",
-            "features": {
-                "max_tasks": None,
-                "max_categories": 5,
-                "ai_features": False,
-                "advanced_analytics": False,
-                "export_options": ["pdf"],
-                "collaboration": False,
-                "custom_themes": False,
-                "priority_support": False,
-                "study_session_tracking": False,
-                "cloud_backup": False,
-                "team_study_groups": False,
-                "lms_integration": False,
-                "custom_study_plans": False,
-                "progress_reports": False,
-                "white_label": False
-            }
-        }
+        return PLAN_FEATURE_RESPONSES[PlanType.STUDENT]
 
 @app.post("/auth/refresh-token")
 async def refresh_token(request: Request):
@@ -1895,11 +2256,10 @@ async def refresh_token(request: Request):
             if user_id is None:
                 raise HTTPException(status_code=401, detail="Invalid token payload")
             
-            # Create a new token with extended expiration
-            new_token = create_access_token(
-                data={"sub": user_id},
-                expires_delta=timedelta(hours=24)
-            )
+            # Create a new token with extended expiration and the current plan claim - read from the database,
+            # since a stale plan_cache entry here would re-issue the claim that was just rejected
+            plan = await reload_user_plan_state(str(user_id))
+            new_token = create_user_token(user_id, payload.get("email"), plan)
             
             logger.info(f"✅ Token refreshed successfully for user {user_id}")
             return {
@@ -1938,42 +2298,31 @@ async def delete_account(current_user: dict = Depends(get_current_user)):
         
         logger.info(f"🗑️ Starting deletion process for user {user_id}")
         
-        # Delete user's tasks first (due to foreign key constraints)
-        logger.info(f"🗑️ Deleting tasks for user {user_id}")
-        try:
-            tasks_result = supabase.table("tasks").delete().eq("user_id", user_id).execute()
-            logger.info(f"✅ Tasks deleted: {tasks_result}")
-        except Exception as e:
-            logger.warning(f"⚠️ Could not delete tasks: {e}")
-        
-        # Delete user's task analytics
-        logger.info(f"🗑️ Deleting task analytics for user {user_id}")
-        try:
-            analytics_result = supabase.table("task_analytics").delete().eq("user_id", user_id).execute()
-            logger.info(f"✅ Analytics deleted: {analytics_result}")
-        except Exception as e:
-            logger.warning(f"⚠️ Could not delete analytics: {e}")
-        
-        # Delete user's subscriptions (if any)
-        logger.info(f"🗑️ Deleting subscriptions for user {user_id}")
-        try:
-            subscriptions_result = supabase.table("user_subscriptions").delete().eq("user_id", user_id).execute()
-            logger.info(f"✅ Subscriptions deleted: {subscriptions_result}")
-        except Exception as e:
-            logger.warning(f"⚠️ Could not delete subscriptions: {e}")
-        
-        # Finally, delete the user account
-        logger.info(f"🗑️ Deleting user account {user_id}")
-        result = supabase.table("users").delete().eq("id", user_id).execute()
+        # One transaction for the user and everything they own, or a background purge for large accounts
+        result = await account_deletion.delete(user_id)
+        tasks_cache.invalidate(user_id)
+        cache_bus.notify("tasks", user_id)
+        await plan_cache.invalidate(user_id)
+        await profile_cache.invalidate(user_id)
+        user_data_changed(user_id)
         
-        if not result.data:
+        if result["status"] == "not_found":
             logger.error(f"❌ User {user_id} not found in database")
             raise HTTPException(status_code=404, detail="User not found")
         
+        if result["status"] == "purging":
+            logger.info(f"🗑️ Account {user_id} marked deleted, purge running in background")
+            return JSONResponse(status_code=202, content={
+                "message": "Account deletion started",
+                "user_id": user_id,
+                **result
+            })
+        
         logger.info(f"✅ Account deleted successfully for user {user_id}")
         return {
             "message": "Account deleted successfully",
-            "user_id": user_id
+            "user_id": user_id,
+            **result
         }
         
     except HTTPException:
@@ -1988,10 +2337,19 @@ async def delete_account(current_user: dict = Depends(get_current_user)):
             detail=f"Failed to delete account: {str(e)}"
         )
 
+@app.get("/auth/delete-account/status")
+async def delete_account_status(current_user: dict = Depends(get_current_user)):
+    """Poll a running account deletion"""
+    try:
+        return await account_deletion.status(current_user["id"])
+    except Exception as e:
+        logger.error(f"❌ Error reading account deletion status: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to read deletion status: {str(e)}")
+
 @app.put("/auth/update-profile")
 async def update_user_profile(
     profile_update: dict,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_active_user)
 ):
     """Update user profile information including profile picture"""
     logger.info(f"📝 Updating profile for user {current_user.get('id')}")
@@ -2014,12 +2372,14 @@ async def update_user_profile(
         logger.info(f"📝 Update data: {update_data}")
         
         # Update user in database
-        result = supabase.table('users').update(update_data).eq('id', current_user["id"]).execute()
-        
-        logger.info(f"📝 Database update result: {result.data}")
+        updated_user = await repos.users.update(current_user["id"], update_data, projections.USER_PROFILE)
+        if updated_user:
+            await profile_cache.set(current_user["id"], updated_user)
+        else:
+            await profile_cache.invalidate(current_user["id"])
+        user_data_changed(current_user["id"])
         
-        if result.data:
-            updated_user = result.data[0]
+        if updated_user:
             logger.info(f"✅ Profile updated successfully for user {current_user['id']}")
             logger.info(f"📊 Updated user data: {updated_user}")
             return {
@@ -2040,36 +2400,38 @@ async def update_user_profile(
             logger.error(f"❌ User not found for profile update: {current_user['id']}")
             raise HTTPException(status_code=404, detail="User not found")
             
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"❌ Profile update error: {e}")
         raise HTTPException(status_code=500, detail="Failed to update profile")
 
-@app.get("/ai/academic-assistance/{task_id}")
-async def get_academic_assistance(task_id: str, current_user: dict = Depends(get_current_user)):
+@app.get("/ai/academic-assistance/{task_id}", response_model=AcademicAssistantResponse)
+async def get_academic_assistance(
+    task_id: str,
+    current_user: dict = Depends(get_current_user),
+    plan_features: PlanFeatures = Depends(requires_ai_features)
+):
     """Get existing academic assistance for a task"""
     logger.info(f"📖 Getting academic assistance for task: {task_id}")
     
-    # Check if user has AI features enabled
-    plan_features = get_user_plan_features(current_user.get('id'))
-    logger.info(f"📊 Plan features: ai_features={plan_features.ai_features}, plan_type={plan_features.plan_type}")
+    try:
+        entry = await assistance_cache.for_task(current_user["id"], task_id)
+    except Exception as e:
+        logger.error(f"❌ Error reading stored academic assistance: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to get academic assistance: {str(e)}")
     
-    if not plan_features.ai_features:
-        logger.warning(f"❌ User {current_user.get('id')} does not have AI features enabled")
+    if not entry:
         raise HTTPException(
-            status_code=403, 
-            detail="AI features require Student Pro or higher plan. Upgrade to access AI-powered study assistance."
+            status_code=404,
+            detail="No academic assistance for this task yet. Use POST /ai/generate-academic-assistance to create one."
         )
-    
-    # Since we're not persisting data anymore, just return a message
-    return {
-        "message": "Academic assistance is generated on-demand. Use POST /ai/generate-academic-assistance to create one.",
-        "task_id": task_id
-    }
+    return assistance_response(task_id, entry)
 
 @app.put("/user/update-plan")
 async def update_user_plan(
     plan_update: PlanUpdateRequest,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_active_user)
 ):
     """Update user's plan type in the database"""
     logger.info(f"📋 Updating plan for user {current_user.get('id')} to {plan_update.plan_type}")
@@ -2077,36 +2439,24 @@ async def update_user_plan(
     logger.info(f"📋 Plan update request: {plan_update}")
     
     try:
-        if not supabase:
-            logger.error("❌ Supabase not available")
-            raise HTTPException(
-                status_code=503,
-                detail="Database not available. Please check your Supabase connection."
-            )
-        
-        # First, let's check if the user exists and get current data
-        logger.info(f"🔍 Checking current user data in database...")
-        user_result = supabase.table('users').select('*').eq('id', current_user.get('id')).execute()
-        logger.info(f"📋 Current user data from DB: {user_result.data}")
-        
-        if not user_result.data:
-            logger.error(f"❌ User {current_user.get('id')} not found in database")
-            raise HTTPException(status_code=404, detail="User not found")
-        
-        # Update user's plan_type in the users table
+        # Update user's plan_type in the users table (no row back means the user does not exist)
         logger.info(f"🔄 Updating plan_type to {plan_update.plan_type.value}")
-        update_result = supabase.table('users').update({
+        updated_user = await repos.users.update(current_user.get('id'), {
             'plan_type': plan_update.plan_type.value,
+            # a new version invalidates the plan claim of every token issued before this change
+            'plan_version': time.time_ns() // 1_000_000,
             'updated_at': datetime.utcnow().isoformat()
-        }).eq('id', current_user.get('id')).execute()
-        
-        logger.info(f"📋 Update result: {update_result}")
+        }, projections.USER_PLAN_UPDATE)
+        await plan_cache.invalidate(current_user.get('id'))
+        await profile_cache.invalidate(current_user.get('id'))
+        user_data_changed(current_user.get('id'))
         
-        if not update_result.data:
-            logger.error("❌ Update returned no data")
+        if not updated_user:
+            logger.error(f"❌ User {current_user.get('id')} not found in database")
             raise HTTPException(status_code=404, detail="User not found")
+        plan = await load_user_plan(current_user.get('id'), updated_user)
+        await plan_cache.set(current_user.get('id'), plan)
         
-        updated_user = update_result.data[0]
         logger.info(f"✅ Plan updated successfully for user {current_user.get('id')}")
         logger.info(f"📋 Updated user data: {updated_user}")
         
@@ -2114,7 +2464,10 @@ async def update_user_plan(
             "message": f"Plan updated to {plan_update.plan_type.value}",
             "user_id": current_user.get('id'),
             "plan_type": updated_user.get("plan_type"),
-            "updated_at": updated_user.get("updated_at")
+            "updated_at": updated_user.get("updated_at"),
+            # re-issued token carrying the new plan claim
+            "access_token": create_user_token(current_user.get('id'), updated_user.get("email"), plan),
+            "token_type": "bearer"
         }
         
     except HTTPException:
@@ -2132,16 +2485,12 @@ async def test_user_exists(email: str):
     logger.info(f"🔍 Testing if user exists: {email}")
     
     try:
-        if not supabase:
-            return {"error": "Supabase not available"}
-        
         # Find user by email
-        user_result = supabase.table('users').select('*').eq('email', email).execute()
+        user = await repos.users.get_by_email(email, projections.USER_PASSWORD_CHECK)
         
-        if not user_result.data:
+        if not user:
             return {"error": "User not found", "email": email}
         
-        user = user_result.data[0]
         return {
             "found": True,
             "user_id": user["id"],
@@ -2211,5 +2560,5 @@ async def send_discount_activation(discount: DiscountActivation):
 if __name__ == "__main__":
     logger.info("🚀 Starting Student Task Manager API...")
     if supabase is None:
-        logger.warning("⚠️ WARNING: Supabase not connected - using fallback mode!")
+        logger.warning(f"⚠️ WARNING: Supabase not connected - using fallback mode ({repos.backend} storage)!")
     uvicorn.run(app, host="0.0.0.0", port=8000, log_level="info")
\ No newline at end of file
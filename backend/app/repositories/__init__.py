@@ -0,0 +1,79 @@
+"""
+Storage backends behind a common repository interface.
+
+STORAGE_BACKEND selects the implementation:
+  supabase - PostgREST over the pooled client (default when configured)
+  sqlite   - embedded database at SQLITE_PATH (fallback when Supabase is not available)
+  memory   - process-local, nothing persisted (load tests)
+"""
+
+import logging
+import os
+from typing import Optional
+
+from app.db import PostgrestClient
+from .base import (
+    AssistanceRepository,
+    Columns,
+    DuplicateKeyError,
+    Repositories,
+    SubscriptionRepository,
+    TaskAnalyticsRepository,
+    TaskRepository,
+    UserRepository,
+)
+from ._rows import ANALYTICS_DIMENSIONS, ANALYTICS_TOTAL, ROLLUP_GRANULARITIES, rollup_bucket
+from .paging import Page, TaskFilters, decode_cursor, decode_offset, page_rows
+from .search import search_terms
+
+logger = logging.getLogger(__name__)
+
+
+def create_repositories(backend: Optional[str] = None, client: Optional[PostgrestClient] = None) -> Repositories:
+    """Build the repositories for the configured backend"""
+    backend = (backend or os.getenv("STORAGE_BACKEND") or "").strip().lower()
+
+    if not backend:
+        backend = "supabase" if client or (os.getenv("SUPABASE_URL") and os.getenv("SUPABASE_SERVICE_ROLE_KEY")) else "sqlite"
+
+    if backend == "supabase":
+        if client is None and os.getenv("SUPABASE_URL") and os.getenv("SUPABASE_SERVICE_ROLE_KEY"):
+            client = PostgrestClient(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_SERVICE_ROLE_KEY"))
+        if client is not None:
+            from .supabase_store import create_supabase_repositories
+            return create_supabase_repositories(client)
+        logger.warning("Supabase storage requested but not available - falling back to SQLite")
+        backend = "sqlite"
+
+    if backend == "memory":
+        from .memory_store import create_memory_repositories
+        return create_memory_repositories()
+
+    if backend == "sqlite":
+        from .sqlite_store import create_sqlite_repositories
+        return create_sqlite_repositories()
+
+    raise ValueError(f"Unknown STORAGE_BACKEND: {backend}")
+
+
+__all__ = [
+    "ANALYTICS_DIMENSIONS",
+    "ANALYTICS_TOTAL",
+    "AssistanceRepository",
+    "Columns",
+    "DuplicateKeyError",
+    "Page",
+    "ROLLUP_GRANULARITIES",
+    "Repositories",
+    "SubscriptionRepository",
+    "TaskAnalyticsRepository",
+    "TaskFilters",
+    "TaskRepository",
+    "UserRepository",
+    "create_repositories",
+    "decode_cursor",
+    "decode_offset",
+    "page_rows",
+    "rollup_bucket",
+    "search_terms",
+]
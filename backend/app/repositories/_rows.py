@@ -0,0 +1,193 @@
+"""Row helpers shared by the local (SQLite and in-memory) backends"""
+
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from .base import Columns
+from .paging import utc_timestamp
+
+# Column layout of the Supabase schema the endpoints are written against
+TABLE_COLUMNS: Dict[str, Tuple[str, ...]] = {
+    "users": (
+        "id", "email", "username", "password_hash", "full_name", "student_id", "major",
+        "year_level", "plan_type", "bio", "profile_picture", "created_at", "updated_at",
+        "deleted_at", "plan_version",
+    ),
+    "tasks": (
+        "id", "user_id", "title", "subject", "description", "due_date", "assignment_type",
+        "priority", "status", "estimated_hours", "grade", "created_at", "updated_at", "completed_at",
+    ),
+    "user_subscriptions": (
+        "id", "user_id", "plan_type", "status", "current_period_start", "current_period_end",
+        "trial_end", "created_at", "updated_at",
+    ),
+    "task_analytics": (
+        "user_id", "dimension", "value", "count", "updated_at",
+    ),
+    "task_rollups": (
+        "user_id", "granularity", "bucket", "created", "completed", "due", "due_open", "grade_sum",
+        "grade_count", "updated_at",
+    ),
+    "ai_assistance": (
+        "key", "subject", "assignment_type", "template_version", "payload", "created_at", "expires_at",
+    ),
+}
+
+# task_analytics rows: (dimension, tasks column); "total" counts every task under the value "all"
+ANALYTICS_DIMENSIONS: Tuple[Tuple[str, Optional[str]], ...] = (
+    ("total", None),
+    ("status", "status"),
+    ("assignment_type", "assignment_type"),
+    ("priority", "priority"),
+)
+ANALYTICS_TOTAL = "all"
+
+# task_rollups buckets (UTC dates; a week starts on Monday) and the counters each one holds:
+# created (by created_at), completed (by completed_at), and by due_date: due, due_open (not
+# completed yet), grade_sum / grade_count (graded tasks)
+ROLLUP_GRANULARITIES = ("day", "week")
+ROLLUP_COUNTERS = ("created", "completed", "due", "due_open", "grade_sum", "grade_count")
+
+# Timestamps stored as UTC text (see paging.utc_timestamp) because lists filter and order by them
+UTC_COLUMNS: Dict[str, Tuple[str, ...]] = {
+    "tasks": ("due_date",),
+}
+
+# Column defaults applied on insert (what the Supabase tables declare)
+TABLE_DEFAULTS: Dict[str, Dict[str, object]] = {
+    "users": {"plan_type": "student", "plan_version": 0},
+    "tasks": {"status": "pending", "priority": "Medium", "estimated_hours": 0},
+    "user_subscriptions": {"status": "active"},
+    "task_analytics": {"count": 0},
+    "task_rollups": {counter: 0 for counter in ROLLUP_COUNTERS},
+}
+
+
+def utcnow_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def new_id() -> str:
+    return str(uuid.uuid4())
+
+
+def column_list(table: str, columns: Columns) -> Tuple[str, ...]:
+    """Validate a projection against the table layout; a wildcard is rejected"""
+    known = TABLE_COLUMNS[table]
+    if isinstance(columns, str):
+        columns = [c.strip() for c in columns.split(",")]
+    if not columns or "*" in columns:
+        raise ValueError(f"A {table} projection must list explicit columns, not a wildcard")
+    unknown = [c for c in columns if c not in known]
+    if unknown:
+        raise ValueError(f"Unknown column(s) for {table}: {', '.join(unknown)}")
+    return tuple(columns)
+
+
+def clean_values(table: str, values: dict) -> dict:
+    """Drop keys that are not columns of the table"""
+    known = TABLE_COLUMNS[table]
+    return {k: v for k, v in values.items() if k in known}
+
+
+def prepare_insert(table: str, values: dict) -> dict:
+    """Fill id, timestamps and defaults the way the database would"""
+    row = {column: None for column in TABLE_COLUMNS[table]}
+    row.update(TABLE_DEFAULTS.get(table, {}))
+    row.update(clean_values(table, values))
+    if "id" in row and not row["id"]:
+        row["id"] = new_id()
+    now = utcnow_iso()
+    if "created_at" in row and not row["created_at"]:
+        row["created_at"] = now
+    if "updated_at" in row and not row["updated_at"]:
+        row["updated_at"] = now
+    if table == "tasks" and row["status"] == "completed" and not row["completed_at"]:
+        row["completed_at"] = now
+    return normalize_timestamps(table, row)
+
+
+def prepare_update(table: str, values: dict) -> dict:
+    """Only real columns, with updated_at bumped unless given explicitly"""
+    changes = clean_values(table, values)
+    if "updated_at" in TABLE_COLUMNS[table] and "updated_at" not in changes:
+        changes["updated_at"] = utcnow_iso()
+    return normalize_timestamps(table, changes)
+
+
+def normalize_timestamps(table: str, values: dict) -> dict:
+    """Convert the UTC_COLUMNS of a row or change set to UTC"""
+    for column in UTC_COLUMNS.get(table, ()):
+        if values.get(column) is not None:
+            values[column] = utc_timestamp(values[column])
+    return values
+
+
+def stamp_completion(task: dict, changes: dict) -> dict:
+    """Set completed_at in a task update that changes status: kept while the task stays completed, else now or cleared"""
+    if "status" in changes and "completed_at" not in changes:
+        if changes["status"] != "completed":
+            changes["completed_at"] = None
+        elif task.get("status") != "completed" or not task.get("completed_at"):
+            changes["completed_at"] = changes.get("updated_at") or utcnow_iso()
+    return changes
+
+
+def analytics_keys(task: dict) -> List[Tuple[str, str]]:
+    """The (dimension, value) counters a task row contributes to"""
+    return [(dimension, ANALYTICS_TOTAL if column is None else str(task[column])) for dimension, column in ANALYTICS_DIMENSIONS]
+
+
+def count_analytics(tasks) -> Dict[Tuple[str, str, str], int]:
+    """(user_id, dimension, value) -> count over task rows"""
+    counts: Dict[Tuple[str, str, str], int] = {}
+    for task in tasks:
+        for dimension, value in analytics_keys(task):
+            key = (task["user_id"], dimension, value)
+            counts[key] = counts.get(key, 0) + 1
+    return counts
+
+
+def rollup_bucket(value, granularity: str) -> Optional[str]:
+    """Start date (ISO) of the day or week bucket holding a timestamp, date or ISO string; None without one"""
+    if not value:
+        return None
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if isinstance(value, datetime):
+        value = (value.astimezone(timezone.utc) if value.tzinfo else value).date()
+    if granularity == "week":
+        value = value - timedelta(days=value.weekday())
+    return value.isoformat()
+
+
+def rollup_deltas(task: dict) -> List[Tuple[str, str, Dict[str, float]]]:
+    """(granularity, bucket, counter increments) a task row contributes to task_rollups"""
+    completed = task["status"] == "completed"
+    sources = [
+        (task.get("created_at"), {"created": 1}),
+        (task.get("completed_at") if completed else None, {"completed": 1}),
+        (task.get("due_date"), {
+            "due": 1,
+            "due_open": 0 if completed else 1,
+            "grade_sum": task["grade"] or 0,
+            "grade_count": 0 if task["grade"] is None else 1,
+        }),
+    ]
+    deltas = []
+    for granularity in ROLLUP_GRANULARITIES:
+        for value, counters in sources:
+            bucket = rollup_bucket(value, granularity)
+            if bucket is not None:
+                deltas.append((granularity, bucket, counters))
+    return deltas
+
+
+def project(row: Optional[dict], columns: Tuple[str, ...]) -> Optional[dict]:
+    if row is None:
+        return None
+    return {column: row.get(column) for column in columns}
@@ -0,0 +1,196 @@
+"""
+Repository interfaces shared by every storage backend.
+
+Rows are plain dicts using the snake_case column names of the Supabase
+schema, so endpoints can switch backends without touching their mapping
+code. ``columns`` is a sequence of column names (one of projections.py);
+every method that returns rows requires it, so each call site states what
+it reads, and a wildcard is rejected. On writes it shapes the returned row.
+"""
+
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Awaitable, Callable, List, Optional, Sequence, Union
+
+from .paging import Cursor, Page, TaskFilters
+
+Columns = Union[str, Sequence[str]]
+
+
+class DuplicateKeyError(Exception):
+    """A write violated a unique constraint (e.g. an email that is already registered)"""
+
+
+class UserRepository(ABC):
+    @abstractmethod
+    async def get_by_id(self, user_id: str, columns: Columns) -> Optional[dict]:
+        """Fetch a user by primary key"""
+
+    @abstractmethod
+    async def get_by_email(self, email: str, columns: Columns) -> Optional[dict]:
+        """Fetch a user by email address"""
+
+    @abstractmethod
+    async def create(self, values: dict, columns: Columns) -> dict:
+        """Insert a user and return the stored row; DuplicateKeyError if the email is taken"""
+
+    @abstractmethod
+    async def update(self, user_id: str, values: dict, columns: Columns) -> Optional[dict]:
+        """Update a user and return the stored row (None if missing)"""
+
+    @abstractmethod
+    async def delete(self, user_id: str, columns: Columns) -> Optional[dict]:
+        """Delete a user and return the removed row (None if missing)"""
+
+    @abstractmethod
+    async def delete_account(self, user_id: str) -> bool:
+        """Delete a user and everything they own in one transaction; False if the user is missing"""
+
+    @abstractmethod
+    async def mark_deleted(self, user_id: str, columns: Columns) -> Optional[dict]:
+        """Set deleted_at so the account is unusable while its data is purged in batches"""
+
+
+class TaskRepository(ABC):
+    @abstractmethod
+    async def list_for_user(self, user_id: str, columns: Columns) -> List[dict]:
+        """All tasks owned by a user"""
+
+    @abstractmethod
+    async def list_page(
+        self,
+        user_id: str,
+        columns: Columns,
+        filters: Optional[TaskFilters] = None,
+        after: Optional[Cursor] = None,
+        limit: int = 50,
+    ) -> Page:
+        """One page of a user's tasks ordered by (due_date, id), starting after the cursor"""
+
+    @abstractmethod
+    async def search(
+        self,
+        user_id: str,
+        terms: Sequence[str],
+        columns: Columns,
+        status: Optional[str] = None,
+        offset: int = 0,
+        limit: int = 20,
+    ) -> Page:
+        """A user's tasks matching every term as a word prefix, best match first (see search.py)"""
+
+    @abstractmethod
+    async def get(self, task_id: str, user_id: str, columns: Columns) -> Optional[dict]:
+        """A single task owned by a user"""
+
+    @abstractmethod
+    async def create(self, values: dict, columns: Columns) -> dict:
+        """Insert a task and return the stored row"""
+
+    @abstractmethod
+    async def update(self, task_id: str, user_id: str, values: dict, columns: Columns) -> Optional[dict]:
+        """Update a task and return the stored row (None if missing)"""
+
+    @abstractmethod
+    async def delete(self, task_id: str, user_id: str, columns: Columns) -> Optional[dict]:
+        """Delete a task and return the removed row (None if missing)"""
+
+    @abstractmethod
+    async def create_many(self, rows: Sequence[dict], columns: Columns) -> List[dict]:
+        """Insert several tasks in one statement, returning the stored rows in input order"""
+
+    @abstractmethod
+    async def update_many(self, task_ids: Sequence[str], user_id: str, values: dict, columns: Columns) -> List[dict]:
+        """Apply the same change to several of a user's tasks in one statement, returning the updated rows"""
+
+    @abstractmethod
+    async def delete_many(self, task_ids: Sequence[str], user_id: str, columns: Columns) -> List[dict]:
+        """Delete several of a user's tasks in one statement, returning the removed rows"""
+
+    @abstractmethod
+    async def delete_for_user(self, user_id: str) -> int:
+        """Delete every task of a user, returning how many were removed"""
+
+    @abstractmethod
+    async def count_for_user(self, user_id: str) -> int:
+        """How many tasks a user has"""
+
+    @abstractmethod
+    async def count_groups(self, user_id: str) -> List[dict]:
+        """A user's task count per (status, assignment_type, priority), aggregated by the backend: rows of those columns plus count"""
+
+    @abstractmethod
+    async def purge_batch(self, user_id: str, batch_size: int) -> int:
+        """Delete up to batch_size of a user's tasks in one short transaction, returning how many went"""
+
+
+class SubscriptionRepository(ABC):
+    @abstractmethod
+    async def get_active(self, user_id: str, columns: Columns) -> Optional[dict]:
+        """The user's active subscription, if any"""
+
+    @abstractmethod
+    async def delete_for_user(self, user_id: str) -> int:
+        """Delete every subscription of a user"""
+
+
+class TaskAnalyticsRepository(ABC):
+    """Per-user task counters (see ANALYTICS_DIMENSIONS) and day / week rollups (see ROLLUP_COUNTERS), kept in step
+    with every task write by the backend itself"""
+
+    @abstractmethod
+    async def list_for_user(self, user_id: str) -> List[dict]:
+        """Stored analytics rows of a user"""
+
+    @abstractmethod
+    async def rollups(self, user_id: str, granularity: str, start: str, end: str) -> List[dict]:
+        """Stored rollup rows of a user with start <= bucket <= end (ISO dates), in bucket order"""
+
+    @abstractmethod
+    async def reconcile(self, user_id: Optional[str] = None) -> List[str]:
+        """Recount from the tasks (one user, or everyone) and repair drifted counters; returns the repaired user ids"""
+
+    @abstractmethod
+    async def delete_for_user(self, user_id: str) -> int:
+        """Delete every analytics and rollup row of a user"""
+
+
+class AssistanceRepository(ABC):
+    """Generated academic assistance, stored by content key and linked to the tasks it was made for"""
+
+    @abstractmethod
+    async def get(self, key: str, now: str) -> Optional[dict]:
+        """The entry stored under key unless it expired before now"""
+
+    @abstractmethod
+    async def put(self, entry: dict) -> None:
+        """Insert or replace an entry (key, subject, assignment_type, template_version, payload, created_at, expires_at)"""
+
+    @abstractmethod
+    async def link_task(self, user_id: str, task_id: str, key: str) -> None:
+        """Point a user's task at an entry (replacing an earlier link)"""
+
+    @abstractmethod
+    async def get_for_task(self, user_id: str, task_id: str, now: str) -> Optional[dict]:
+        """The unexpired entry linked to a user's task"""
+
+    @abstractmethod
+    async def evict(self, now: str, max_entries: int) -> int:
+        """Delete expired entries, then the soonest-expiring ones beyond max_entries; returns how many"""
+
+
+@dataclass
+class Repositories:
+    """Bundle of repositories backed by one storage backend"""
+    backend: str
+    users: UserRepository
+    tasks: TaskRepository
+    subscriptions: SubscriptionRepository
+    task_analytics: TaskAnalyticsRepository
+    assistance: AssistanceRepository
+    closer: Optional[Callable[[], Awaitable[None]]] = None
+
+    async def close(self):
+        """Release backend resources (connections, pools)"""
+        if self.closer:
+            await self.closer()
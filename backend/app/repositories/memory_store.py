@@ -0,0 +1,384 @@
+"""
+In-memory implementation of the repositories.
+
+Nothing is persisted - meant for load tests and local experiments that
+should exercise the real endpoints without any database.
+"""
+
+import threading
+from typing import Dict, List, Optional, Sequence
+
+from .base import (
+    AssistanceRepository,
+    Columns,
+    DuplicateKeyError,
+    Repositories,
+    SubscriptionRepository,
+    TaskAnalyticsRepository,
+    TaskRepository,
+    UserRepository,
+)
+from . import projections
+from .paging import Cursor, Page, TaskFilters, build_offset_page, page_columns, page_rows
+from .search import match_score
+from ._rows import (
+    analytics_keys,
+    column_list,
+    count_analytics,
+    prepare_insert,
+    prepare_update,
+    project,
+    rollup_deltas,
+    stamp_completion,
+    utcnow_iso,
+)
+
+
+class MemoryStore:
+    """Tables as dicts keyed by primary key, guarded by one lock"""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.users: Dict[str, dict] = {}
+        self.tasks: Dict[str, dict] = {}
+        self.subscriptions: Dict[str, dict] = {}
+        # (user_id, dimension, value) -> row
+        self.task_analytics: Dict[tuple, dict] = {}
+        # (user_id, granularity, bucket) -> row
+        self.task_rollups: Dict[tuple, dict] = {}
+        self.ai_assistance: Dict[str, dict] = {}
+        # (user_id, task_id) -> key
+        self.ai_assistance_tasks: Dict[tuple, str] = {}
+
+    def count_task(self, task: dict, delta: int):
+        """Move a task's task_analytics counters by delta; call with the lock held, in the same step as the task write"""
+        now = utcnow_iso()
+        for dimension, value in analytics_keys(task):
+            key = (task["user_id"], dimension, value)
+            row = self.task_analytics.get(key)
+            if row is None:
+                if delta < 0:
+                    continue
+                row = self.task_analytics[key] = {"user_id": key[0], "dimension": dimension, "value": value, "count": 0}
+            row["count"] += delta
+            row["updated_at"] = now
+        for granularity, bucket, counters in rollup_deltas(task):
+            key = (task["user_id"], granularity, bucket)
+            row = self.task_rollups.get(key)
+            if row is None:
+                if delta < 0:
+                    continue
+                row = self.task_rollups[key] = prepare_insert(
+                    "task_rollups", {"user_id": key[0], "granularity": granularity, "bucket": bucket}
+                )
+            for counter, value in counters.items():
+                row[counter] += delta * value
+            row["updated_at"] = now
+
+    def remove_task(self, task_id: str) -> dict:
+        row = self.tasks.pop(task_id)
+        self.count_task(row, -1)
+        return row
+
+
+class MemoryUserRepository(UserRepository):
+    def __init__(self, store: MemoryStore):
+        self.store = store
+
+    async def get_by_id(self, user_id: str, columns: Columns) -> Optional[dict]:
+        with self.store.lock:
+            return project(self.store.users.get(user_id), column_list("users", columns))
+
+    async def get_by_email(self, email: str, columns: Columns) -> Optional[dict]:
+        with self.store.lock:
+            match = next((u for u in self.store.users.values() if u["email"] == email), None)
+            return project(match, column_list("users", columns))
+
+    async def create(self, values: dict, columns: Columns) -> dict:
+        row = prepare_insert("users", values)
+        with self.store.lock:
+            if any(u["email"] == row["email"] for u in self.store.users.values()):
+                raise DuplicateKeyError(f"duplicate key value violates unique constraint on email: {row['email']}")
+            self.store.users[row["id"]] = row
+            return project(row, column_list("users", columns))
+
+    async def update(self, user_id: str, values: dict, columns: Columns) -> Optional[dict]:
+        with self.store.lock:
+            row = self.store.users.get(user_id)
+            if row is None:
+                return None
+            row.update(prepare_update("users", values))
+            return project(row, column_list("users", columns))
+
+    async def delete(self, user_id: str, columns: Columns) -> Optional[dict]:
+        with self.store.lock:
+            row = self.store.users.pop(user_id, None)
+            return project(row, column_list("users", columns))
+
+    async def delete_account(self, user_id: str) -> bool:
+        with self.store.lock:
+            if self.store.users.pop(user_id, None) is None:
+                return False
+            for table in (self.store.tasks, self.store.subscriptions):
+                for key in [k for k, row in table.items() if row["user_id"] == user_id]:
+                    del table[key]
+            for table in (self.store.task_analytics, self.store.task_rollups):
+                for key in [k for k in table if k[0] == user_id]:
+                    del table[key]
+            for key in [k for k in self.store.ai_assistance_tasks if k[0] == user_id]:
+                del self.store.ai_assistance_tasks[key]
+            return True
+
+    async def mark_deleted(self, user_id: str, columns: Columns) -> Optional[dict]:
+        return await self.update(user_id, {"deleted_at": utcnow_iso()}, columns)
+
+
+class MemoryTaskRepository(TaskRepository):
+    def __init__(self, store: MemoryStore):
+        self.store = store
+
+    async def list_for_user(self, user_id: str, columns: Columns) -> List[dict]:
+        names = column_list("tasks", columns)
+        with self.store.lock:
+            return [project(t, names) for t in self.store.tasks.values() if t["user_id"] == user_id]
+
+    async def list_page(
+        self,
+        user_id: str,
+        columns: Columns,
+        filters: Optional[TaskFilters] = None,
+        after: Optional[Cursor] = None,
+        limit: int = 50,
+    ) -> Page:
+        names = page_columns(column_list("tasks", columns))
+        with self.store.lock:
+            page = page_rows((t for t in self.store.tasks.values() if t["user_id"] == user_id), filters, after, limit)
+            page.items = [project(t, names) for t in page.items]
+            return page
+
+    async def search(
+        self,
+        user_id: str,
+        terms: Sequence[str],
+        columns: Columns,
+        status: Optional[str] = None,
+        offset: int = 0,
+        limit: int = 20,
+    ) -> Page:
+        names = column_list("tasks", columns)
+        with self.store.lock:
+            scored = []
+            for t in self.store.tasks.values():
+                if t["user_id"] != user_id or (status is not None and t["status"] != status):
+                    continue
+                score = match_score(t, list(terms))
+                if score is not None:
+                    scored.append((-score, t["id"], t))
+            scored.sort(key=lambda item: item[:2])
+            rows = [project(t, names) for _, _, t in scored[offset:offset + limit + 1]]
+        return build_offset_page(rows, offset, limit)
+
+    async def get(self, task_id: str, user_id: str, columns: Columns) -> Optional[dict]:
+        with self.store.lock:
+            row = self.store.tasks.get(task_id)
+            if row is None or row["user_id"] != user_id:
+                return None
+            return project(row, column_list("tasks", columns))
+
+    async def create(self, values: dict, columns: Columns) -> dict:
+        row = prepare_insert("tasks", values)
+        with self.store.lock:
+            self.store.tasks[row["id"]] = row
+            self.store.count_task(row, 1)
+            return project(row, column_list("tasks", columns))
+
+    async def update(self, task_id: str, user_id: str, values: dict, columns: Columns) -> Optional[dict]:
+        with self.store.lock:
+            row = self.store.tasks.get(task_id)
+            if row is None or row["user_id"] != user_id:
+                return None
+            self.store.count_task(row, -1)
+            row.update(stamp_completion(row, prepare_update("tasks", values)))
+            self.store.count_task(row, 1)
+            return project(row, column_list("tasks", columns))
+
+    async def delete(self, task_id: str, user_id: str, columns: Columns) -> Optional[dict]:
+        with self.store.lock:
+            row = self.store.tasks.get(task_id)
+            if row is None or row["user_id"] != user_id:
+                return None
+            return project(self.store.remove_task(task_id), column_list("tasks", columns))
+
+    async def create_many(self, rows: Sequence[dict], columns: Columns) -> List[dict]:
+        names = column_list("tasks", columns)
+        prepared = [prepare_insert("tasks", values) for values in rows]
+        with self.store.lock:
+            for row in prepared:
+                self.store.tasks[row["id"]] = row
+                self.store.count_task(row, 1)
+            return [project(row, names) for row in prepared]
+
+    async def update_many(self, task_ids: Sequence[str], user_id: str, values: dict, columns: Columns) -> List[dict]:
+        names = column_list("tasks", columns)
+        with self.store.lock:
+            updated = []
+            for task_id in dict.fromkeys(task_ids):
+                row = self.store.tasks.get(task_id)
+                if row is not None and row["user_id"] == user_id:
+                    self.store.count_task(row, -1)
+                    row.update(stamp_completion(row, prepare_update("tasks", values)))
+                    self.store.count_task(row, 1)
+                    updated.append(project(row, names))
+            return updated
+
+    async def delete_many(self, task_ids: Sequence[str], user_id: str, columns: Columns) -> List[dict]:
+        names = column_list("tasks", columns)
+        with self.store.lock:
+            doomed = [
+                task_id for task_id in dict.fromkeys(task_ids)
+                if task_id in self.store.tasks and self.store.tasks[task_id]["user_id"] == user_id
+            ]
+            return [project(self.store.remove_task(task_id), names) for task_id in doomed]
+
+    async def delete_for_user(self, user_id: str) -> int:
+        with self.store.lock:
+            doomed = [task_id for task_id, t in self.store.tasks.items() if t["user_id"] == user_id]
+            for task_id in doomed:
+                self.store.remove_task(task_id)
+            return len(doomed)
+
+    async def count_for_user(self, user_id: str) -> int:
+        with self.store.lock:
+            return sum(1 for t in self.store.tasks.values() if t["user_id"] == user_id)
+
+    async def count_groups(self, user_id: str) -> List[dict]:
+        groups: Dict[tuple, int] = {}
+        with self.store.lock:
+            for t in self.store.tasks.values():
+                if t["user_id"] == user_id:
+                    key = tuple(t[c] for c in projections.TASK_ANALYTICS)
+                    groups[key] = groups.get(key, 0) + 1
+        return [{**dict(zip(projections.TASK_ANALYTICS, key)), "count": count} for key, count in groups.items()]
+
+    async def purge_batch(self, user_id: str, batch_size: int) -> int:
+        with self.store.lock:
+            doomed = [task_id for task_id, t in self.store.tasks.items() if t["user_id"] == user_id][:batch_size]
+            for task_id in doomed:
+                self.store.remove_task(task_id)
+            return len(doomed)
+
+
+class MemorySubscriptionRepository(SubscriptionRepository):
+    def __init__(self, store: MemoryStore):
+        self.store = store
+
+    async def get_active(self, user_id: str, columns: Columns) -> Optional[dict]:
+        with self.store.lock:
+            match = next(
+                (s for s in self.store.subscriptions.values() if s["user_id"] == user_id and s["status"] == "active"),
+                None,
+            )
+            return project(match, column_list("user_subscriptions", columns))
+
+    async def delete_for_user(self, user_id: str) -> int:
+        with self.store.lock:
+            doomed = [key for key, s in self.store.subscriptions.items() if s["user_id"] == user_id]
+            for key in doomed:
+                del self.store.subscriptions[key]
+            return len(doomed)
+
+
+class MemoryTaskAnalyticsRepository(TaskAnalyticsRepository):
+    def __init__(self, store: MemoryStore):
+        self.store = store
+
+    async def list_for_user(self, user_id: str) -> List[dict]:
+        with self.store.lock:
+            return [project(row, projections.ANALYTICS_COUNTERS) for key, row in self.store.task_analytics.items() if key[0] == user_id]
+
+    async def reconcile(self, user_id: Optional[str] = None) -> List[str]:
+        with self.store.lock:
+            actual = count_analytics(t for t in self.store.tasks.values() if user_id is None or t["user_id"] == user_id)
+            stored = {
+                key: row["count"] for key, row in self.store.task_analytics.items()
+                if (user_id is None or key[0] == user_id) and row["count"] != 0
+            }
+            drifted = sorted({key[0] for key in set(actual) | set(stored) if actual.get(key) != stored.get(key)})
+            now = utcnow_iso()
+            for drifted_user in drifted:
+                for key in [k for k in self.store.task_analytics if k[0] == drifted_user]:
+                    del self.store.task_analytics[key]
+                for key, count in actual.items():
+                    if key[0] == drifted_user:
+                        self.store.task_analytics[key] = {
+                            "user_id": key[0], "dimension": key[1], "value": key[2], "count": count, "updated_at": now,
+                        }
+            return drifted
+
+    async def rollups(self, user_id: str, granularity: str, start: str, end: str) -> List[dict]:
+        with self.store.lock:
+            return sorted(
+                (project(row, projections.ROLLUP_BUCKETS) for key, row in self.store.task_rollups.items()
+                 if key[0] == user_id and key[1] == granularity and start <= key[2] <= end),
+                key=lambda row: row["bucket"],
+            )
+
+    async def delete_for_user(self, user_id: str) -> int:
+        with self.store.lock:
+            removed = 0
+            for table in (self.store.task_analytics, self.store.task_rollups):
+                doomed = [key for key in table if key[0] == user_id]
+                for key in doomed:
+                    del table[key]
+                removed += len(doomed)
+            return removed
+
+
+class MemoryAssistanceRepository(AssistanceRepository):
+    def __init__(self, store: MemoryStore):
+        self.store = store
+
+    def _live(self, key: Optional[str], now: str) -> Optional[dict]:
+        entry = self.store.ai_assistance.get(key) if key else None
+        return project(entry, projections.ASSISTANCE_ENTRY) if entry is not None and entry["expires_at"] > now else None
+
+    async def get(self, key: str, now: str) -> Optional[dict]:
+        with self.store.lock:
+            return self._live(key, now)
+
+    async def put(self, entry: dict) -> None:
+        with self.store.lock:
+            self.store.ai_assistance[entry["key"]] = dict(entry)
+
+    async def link_task(self, user_id: str, task_id: str, key: str) -> None:
+        with self.store.lock:
+            self.store.ai_assistance_tasks[(user_id, task_id)] = key
+
+    async def get_for_task(self, user_id: str, task_id: str, now: str) -> Optional[dict]:
+        with self.store.lock:
+            return self._live(self.store.ai_assistance_tasks.get((user_id, task_id)), now)
+
+    async def evict(self, now: str, max_entries: int) -> int:
+        with self.store.lock:
+            entries = self.store.ai_assistance
+            doomed = [key for key, entry in entries.items() if entry["expires_at"] <= now]
+            kept = sorted((e for e in entries.values() if e["expires_at"] > now), key=lambda e: e["expires_at"])
+            doomed += [e["key"] for e in kept[:max(0, len(kept) - max_entries)]]
+            for key in doomed:
+                del entries[key]
+            gone = set(doomed)
+            for link in [k for k, key in self.store.ai_assistance_tasks.items() if key in gone]:
+                del self.store.ai_assistance_tasks[link]
+            return len(doomed)
+
+
+def create_memory_repositories() -> Repositories:
+    store = MemoryStore()
+    return Repositories(
+        backend="memory",
+        users=MemoryUserRepository(store),
+        tasks=MemoryTaskRepository(store),
+        subscriptions=MemorySubscriptionRepository(store),
+        task_analytics=MemoryTaskAnalyticsRepository(store),
+        assistance=MemoryAssistanceRepository(store),
+    )
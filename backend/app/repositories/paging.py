@@ -0,0 +1,143 @@
+"""
+Keyset pagination for task lists.
+
+Pages are ordered by ``(due_date, id)`` with tasks that have no due date
+first (SQLite's native NULL order, matched in Postgres with NULLS FIRST so
+both can walk the index), and a cursor is the opaque, url-safe encoding of the last row's
+``(due_date, id)``. Fetching the next page is an index range scan on
+``(user_id, due_date, id)`` no matter how deep the client has paged.
+
+SQLite and the memory store keep due dates as text, so they are stored and
+filtered as UTC (see utc_timestamp): in that form the string order is the
+order in time, whatever offset the client sent.
+"""
+
+import base64
+import json
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Iterable, List, Optional, Sequence, Tuple, Union
+
+Cursor = Tuple[Optional[str], str]
+
+KEY_COLUMNS = ("due_date", "id")
+
+
+def utc_timestamp(value: Union[str, datetime, None]) -> Optional[str]:
+    """An ISO-8601 timestamp converted to UTC ("+00:00"); naive values are taken as UTC, unparseable ones kept"""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return value
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).isoformat()
+
+
+@dataclass(frozen=True)
+class TaskFilters:
+    """Server-side filters for task lists; None means "any" """
+    status: Optional[str] = None
+    subject: Optional[str] = None
+    assignment_type: Optional[str] = None
+    priority: Optional[str] = None
+    due_from: Optional[str] = None  # inclusive, ISO-8601
+    due_to: Optional[str] = None  # exclusive, ISO-8601
+
+    def __post_init__(self):
+        # compared with the stored (UTC) due dates as strings
+        object.__setattr__(self, "due_from", utc_timestamp(self.due_from))
+        object.__setattr__(self, "due_to", utc_timestamp(self.due_to))
+
+    def equalities(self) -> List[Tuple[str, str]]:
+        fields = ("status", "subject", "assignment_type", "priority")
+        return [(name, getattr(self, name)) for name in fields if getattr(self, name) is not None]
+
+    def matches(self, row: dict) -> bool:
+        if any(row.get(name) != value for name, value in self.equalities()):
+            return False
+        due = row.get("due_date")
+        if self.due_from is not None and (due is None or due < self.due_from):
+            return False
+        if self.due_to is not None and (due is None or due >= self.due_to):
+            return False
+        return True
+
+
+@dataclass
+class Page:
+    items: List[dict]
+    next_cursor: Optional[str] = None
+
+
+def encode_cursor(row: dict) -> str:
+    raw = json.dumps([row.get("due_date"), row["id"]], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str) -> Cursor:
+    """Parse a cursor produced by encode_cursor; ValueError when it is malformed"""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        due_date, row_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {token}") from e
+    if not isinstance(row_id, str) or not (due_date is None or isinstance(due_date, str)):
+        raise ValueError(f"Invalid cursor: {token}")
+    return due_date, row_id
+
+
+def encode_offset(offset: int) -> str:
+    """Cursor for result sets ordered by rank, where the position is the only stable key"""
+    return base64.urlsafe_b64encode(json.dumps({"offset": offset}).encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_offset(token: str) -> int:
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        offset = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))["offset"]
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {token}") from e
+    if not isinstance(offset, int) or offset < 0:
+        raise ValueError(f"Invalid cursor: {token}")
+    return offset
+
+
+def build_offset_page(rows: List[dict], offset: int, limit: int) -> Page:
+    """Like build_page, for pages fetched with LIMIT limit + 1 OFFSET offset"""
+    if len(rows) > limit:
+        return Page(rows[:limit], encode_offset(offset + limit))
+    return Page(rows)
+
+
+def page_columns(names: Sequence[str]) -> List[str]:
+    """The requested task columns plus the ordering key"""
+    return list(names) + [c for c in KEY_COLUMNS if c not in names]
+
+
+def sort_key(row: dict):
+    due = row.get("due_date")
+    return (due is not None, due or "", row["id"])
+
+
+def is_after(row: dict, after: Cursor) -> bool:
+    return sort_key(row) > sort_key({"due_date": after[0], "id": after[1]})
+
+
+def build_page(rows: List[dict], limit: int) -> Page:
+    """rows holds up to limit + 1 ordered rows; the extra one only signals another page"""
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return Page(rows, encode_cursor(rows[-1]))
+    return Page(rows)
+
+
+def page_rows(rows: Iterable[dict], filters: Optional[TaskFilters], after: Optional[Cursor], limit: int) -> Page:
+    """Filter, order and slice rows held in memory the same way the databases do"""
+    filters = filters or TaskFilters()
+    selected = [r for r in rows if filters.matches(r) and (after is None or is_after(r, after))]
+    selected.sort(key=sort_key)
+    return build_page(selected[:limit + 1], limit)
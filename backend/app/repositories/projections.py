@@ -0,0 +1,83 @@
+"""
+Column projections - exactly which columns each endpoint / service call reads.
+
+Repository methods take a projection instead of defaulting to
+``select('*')``; in particular login must never pull the (large, base64)
+profile_picture. Every projection is checked when this module is imported,
+so a wildcard or a misspelled column stops the app from starting, and
+tests/test_projections.py fails if a call site goes back to a wildcard.
+"""
+
+from typing import Dict, Tuple
+
+from ._rows import ROLLUP_COUNTERS, TABLE_COLUMNS
+
+# users
+USER_ID = ("id",)
+USER_LOGIN = (
+    "id", "email", "username", "password_hash", "full_name", "student_id", "major",
+    "year_level", "plan_type", "plan_version", "deleted_at",
+)
+USER_SUMMARY = (
+    "id", "email", "username", "full_name", "student_id", "major", "year_level", "plan_type",
+)
+USER_PROFILE = (
+    "id", "email", "username", "full_name", "student_id", "major", "year_level", "bio",
+    "profile_picture", "created_at", "updated_at", "plan_type",
+)
+USER_PLAN = ("plan_type", "plan_version", "deleted_at")
+USER_PLAN_UPDATE = ("email", "plan_type", "plan_version", "updated_at")
+USER_PASSWORD_CHECK = ("id", "email", "username", "password_hash")
+USER_DELETION = ("id", "deleted_at")
+
+# user_subscriptions
+SUBSCRIPTION_PLAN = ("plan_type",)
+
+# tasks
+TASK_ID = ("id",)
+TASK_FIELDS = (
+    "id", "title", "subject", "description", "due_date", "assignment_type", "priority",
+    "status", "user_id", "estimated_hours", "grade", "created_at", "updated_at", "completed_at",
+)
+# the task_analytics dimensions; count_groups groups by exactly these
+TASK_ANALYTICS = ("status", "assignment_type", "priority")
+
+# task_analytics / task_rollups
+ANALYTICS_COUNTERS = ("dimension", "value", "count")
+ROLLUP_BUCKETS = ("bucket",) + ROLLUP_COUNTERS
+
+# ai_assistance
+ASSISTANCE_ENTRY = (
+    "key", "subject", "assignment_type", "template_version", "payload", "created_at", "expires_at",
+)
+
+# projection name -> (table, columns); validated below
+PROJECTIONS: Dict[str, Tuple[str, Tuple[str, ...]]] = {
+    "USER_ID": ("users", USER_ID),
+    "USER_LOGIN": ("users", USER_LOGIN),
+    "USER_SUMMARY": ("users", USER_SUMMARY),
+    "USER_PROFILE": ("users", USER_PROFILE),
+    "USER_PLAN": ("users", USER_PLAN),
+    "USER_PLAN_UPDATE": ("users", USER_PLAN_UPDATE),
+    "USER_PASSWORD_CHECK": ("users", USER_PASSWORD_CHECK),
+    "USER_DELETION": ("users", USER_DELETION),
+    "SUBSCRIPTION_PLAN": ("user_subscriptions", SUBSCRIPTION_PLAN),
+    "TASK_ID": ("tasks", TASK_ID),
+    "TASK_FIELDS": ("tasks", TASK_FIELDS),
+    "TASK_ANALYTICS": ("tasks", TASK_ANALYTICS),
+    "ANALYTICS_COUNTERS": ("task_analytics", ANALYTICS_COUNTERS),
+    "ROLLUP_BUCKETS": ("task_rollups", ROLLUP_BUCKETS),
+    "ASSISTANCE_ENTRY": ("ai_assistance", ASSISTANCE_ENTRY),
+}
+
+
+def _validate_projections():
+    for name, (table, columns) in PROJECTIONS.items():
+        if not columns or "*" in columns:
+            raise ValueError(f"Projection {name} must list explicit columns, not a wildcard")
+        unknown = [c for c in columns if c not in TABLE_COLUMNS[table]]
+        if unknown:
+            raise ValueError(f"Projection {name} references unknown {table} column(s): {', '.join(unknown)}")
+
+
+_validate_projections()
@@ -0,0 +1,48 @@
+"""
+Task search helpers shared by the backends.
+
+A query is split into word terms and every term must match the start of a
+word in the title, subject or description (prefix matching, so "calc"
+finds "Calculus"). Title matches rank above subject matches, which rank
+above description matches.
+"""
+
+import re
+from typing import Dict, List, Optional
+
+SEARCH_COLUMNS = ("title", "subject", "description")
+SEARCH_WEIGHTS: Dict[str, float] = {"title": 10.0, "subject": 5.0, "description": 1.0}
+MAX_TERMS = 8
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def search_terms(query: str) -> List[str]:
+    """Lower-cased word terms of a user query; punctuation and operators are dropped"""
+    terms: List[str] = []
+    for term in _WORD.findall(query.lower()):
+        if term not in terms:
+            terms.append(term)
+    return terms[:MAX_TERMS]
+
+
+def fts5_query(terms: List[str]) -> str:
+    """SQLite FTS5 MATCH expression: every term as a quoted prefix"""
+    return " AND ".join(f'"{term}"*' for term in terms)
+
+
+def tsquery(terms: List[str]) -> str:
+    """Postgres to_tsquery expression: every term as a prefix"""
+    return " & ".join(f"{term}:*" for term in terms)
+
+
+def match_score(row: dict, terms: List[str]) -> Optional[float]:
+    """Weighted score of a row, or None when some term does not match (in-memory backend)"""
+    words = {column: _WORD.findall((row.get(column) or "").lower()) for column in SEARCH_COLUMNS}
+    score = 0.0
+    for term in terms:
+        hits = [SEARCH_WEIGHTS[c] * sum(1 for w in words[c] if w.startswith(term)) for c in SEARCH_COLUMNS]
+        if not any(hits):
+            return None
+        score += sum(hits)
+    return score
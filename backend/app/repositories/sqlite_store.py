@@ -0,0 +1,760 @@
+"""
+Embedded SQLite implementation of the repositories.
+
+Used for small single-node deployments and as the fallback when Supabase
+is not configured, so data written in fallback mode is kept. All access
+goes through one connection guarded by a lock and is run in a worker
+thread, so the event loop never waits on disk I/O.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+from typing import Any, Callable, List, Optional, Sequence
+
+from .base import (
+    AssistanceRepository,
+    Columns,
+    DuplicateKeyError,
+    Repositories,
+    SubscriptionRepository,
+    TaskAnalyticsRepository,
+    TaskRepository,
+    UserRepository,
+)
+from . import projections
+from .paging import Cursor, Page, TaskFilters, build_offset_page, build_page, page_columns, utc_timestamp
+from .search import SEARCH_COLUMNS, SEARCH_WEIGHTS, fts5_query
+from ._rows import (
+    ANALYTICS_DIMENSIONS,
+    ANALYTICS_TOTAL,
+    ROLLUP_COUNTERS,
+    column_list,
+    prepare_insert,
+    prepare_update,
+    project,
+    utcnow_iso,
+)
+
+logger = logging.getLogger(__name__)
+
+# UPDATE/DELETE ... RETURNING needs SQLite 3.35; older libraries re-select inside the transaction
+_HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+# SQLITE_MAX_VARIABLE_NUMBER before 3.32 (32766 since)
+_MAX_VARIABLES = 999
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id TEXT PRIMARY KEY,
+    email TEXT NOT NULL UNIQUE,
+    username TEXT,
+    password_hash TEXT,
+    full_name TEXT,
+    student_id TEXT,
+    major TEXT,
+    year_level INTEGER,
+    plan_type TEXT DEFAULT 'student',
+    bio TEXT,
+    profile_picture TEXT,
+    created_at TEXT,
+    updated_at TEXT,
+    deleted_at TEXT,
+    plan_version INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS tasks (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    title TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    description TEXT,
+    due_date TEXT,
+    assignment_type TEXT NOT NULL,
+    priority TEXT NOT NULL DEFAULT 'Medium',
+    status TEXT NOT NULL DEFAULT 'pending',
+    estimated_hours INTEGER,
+    grade REAL,
+    created_at TEXT,
+    updated_at TEXT,
+    completed_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_user_id ON tasks(user_id);
+-- keyset pagination: (due_date, id) within a user, optionally narrowed by status
+CREATE INDEX IF NOT EXISTS idx_tasks_user_due ON tasks(user_id, due_date, id);
+CREATE INDEX IF NOT EXISTS idx_tasks_user_status_due ON tasks(user_id, status, due_date, id);
+
+-- Full-text index over tasks (external content: the text lives in tasks and
+-- the triggers below keep the index in step with every write)
+CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5(
+    title, subject, description,
+    content='tasks', content_rowid='rowid', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS tasks_fts_insert AFTER INSERT ON tasks BEGIN
+    INSERT INTO tasks_fts(rowid, title, subject, description)
+    VALUES (new.rowid, new.title, new.subject, new.description);
+END;
+CREATE TRIGGER IF NOT EXISTS tasks_fts_delete AFTER DELETE ON tasks BEGIN
+    INSERT INTO tasks_fts(tasks_fts, rowid, title, subject, description)
+    VALUES ('delete', old.rowid, old.title, old.subject, old.description);
+END;
+CREATE TRIGGER IF NOT EXISTS tasks_fts_update AFTER UPDATE OF title, subject, description ON tasks BEGIN
+    INSERT INTO tasks_fts(tasks_fts, rowid, title, subject, description)
+    VALUES ('delete', old.rowid, old.title, old.subject, old.description);
+    INSERT INTO tasks_fts(rowid, title, subject, description)
+    VALUES (new.rowid, new.title, new.subject, new.description);
+END;
+
+CREATE TABLE IF NOT EXISTS user_subscriptions (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    plan_type TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'active',
+    current_period_start TEXT,
+    current_period_end TEXT,
+    trial_end TEXT,
+    created_at TEXT,
+    updated_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_user_subscriptions_user_id ON user_subscriptions(user_id);
+
+CREATE TABLE IF NOT EXISTS task_analytics (
+    user_id TEXT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    dimension TEXT NOT NULL,
+    value TEXT NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    updated_at TEXT,
+    PRIMARY KEY (user_id, dimension, value)
+);
+
+-- Per-user counters (total, status, assignment_type, priority) moved by every
+-- task write inside the writing transaction; decrements never create rows
+CREATE TRIGGER IF NOT EXISTS tasks_analytics_insert AFTER INSERT ON tasks BEGIN
+    INSERT INTO task_analytics (user_id, dimension, value, count, updated_at)
+    VALUES (new.user_id, 'total', 'all', 1, strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+           (new.user_id, 'status', new.status, 1, strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+           (new.user_id, 'assignment_type', new.assignment_type, 1, strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+           (new.user_id, 'priority', new.priority, 1, strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+    ON CONFLICT (user_id, dimension, value) DO UPDATE SET count = count + 1, updated_at = excluded.updated_at;
+END;
+CREATE TRIGGER IF NOT EXISTS tasks_analytics_delete AFTER DELETE ON tasks BEGIN
+    UPDATE task_analytics SET count = count - 1, updated_at = strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')
+    WHERE user_id = old.user_id AND (
+        (dimension = 'total' AND value = 'all') OR (dimension = 'status' AND value = old.status)
+        OR (dimension = 'assignment_type' AND value = old.assignment_type)
+        OR (dimension = 'priority' AND value = old.priority)
+    );
+END;
+CREATE TRIGGER IF NOT EXISTS tasks_analytics_update AFTER UPDATE OF user_id, status, assignment_type, priority ON tasks
+WHEN old.user_id IS NOT new.user_id OR old.status IS NOT new.status
+    OR old.assignment_type IS NOT new.assignment_type OR old.priority IS NOT new.priority
+BEGIN
+    UPDATE task_analytics SET count = count - 1, updated_at = strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')
+    WHERE user_id = old.user_id AND (
+        (dimension = 'total' AND value = 'all') OR (dimension = 'status' AND value = old.status)
+        OR (dimension = 'assignment_type' AND value = old.assignment_type)
+        OR (dimension = 'priority' AND value = old.priority)
+    );
+    INSERT INTO task_analytics (user_id, dimension, value, count, updated_at)
+    VALUES (new.user_id, 'total', 'all', 1, strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+           (new.user_id, 'status', new.status, 1, strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+           (new.user_id, 'assignment_type', new.assignment_type, 1, strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')),
+           (new.user_id, 'priority', new.priority, 1, strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+    ON CONFLICT (user_id, dimension, value) DO UPDATE SET count = count + 1, updated_at = excluded.updated_at;
+END;
+
+-- Generated academic assistance by content key (see app/services/assistance_cache.py)
+CREATE TABLE IF NOT EXISTS ai_assistance (
+    key TEXT PRIMARY KEY,
+    subject TEXT NOT NULL,
+    assignment_type TEXT NOT NULL,
+    template_version TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    expires_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_ai_assistance_expires ON ai_assistance(expires_at);
+
+CREATE TABLE IF NOT EXISTS ai_assistance_tasks (
+    user_id TEXT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    task_id TEXT NOT NULL,
+    key TEXT NOT NULL REFERENCES ai_assistance(key) ON DELETE CASCADE,
+    PRIMARY KEY (user_id, task_id)
+);
+CREATE INDEX IF NOT EXISTS idx_ai_assistance_tasks_key ON ai_assistance_tasks(key);
+"""
+
+
+# Columns added after the first release: (table, column, declaration) for databases created earlier
+COLUMN_MIGRATIONS = [
+    ("users", "deleted_at", "TEXT"),
+    ("users", "plan_version", "INTEGER NOT NULL DEFAULT 0"),
+    ("tasks", "completed_at", "TEXT"),
+]
+
+_NOW = "strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now')"
+# bucket start of a timestamp: the UTC date, or the Monday of its week
+_ROLLUP_BUCKETS = {"day": "date({})", "week": "date({}, 'weekday 0', '-6 days')"}
+
+
+def _rollup_sources(row: str) -> List[tuple]:
+    """(timestamp, condition, counter expressions) of a task row - the SQL form of _rows.rollup_deltas"""
+    return [
+        (f"{row}.created_at", None, {"created": "1"}),
+        (f"{row}.completed_at", f"{row}.status = 'completed'", {"completed": "1"}),
+        (f"{row}.due_date", None, {
+            "due": "1",
+            "due_open": f"{row}.status IS NOT 'completed'",
+            "grade_sum": f"coalesce({row}.grade, 0)",
+            "grade_count": f"{row}.grade IS NOT NULL",
+        }),
+    ]
+
+
+def _rollup_selects(row: str) -> List[str]:
+    """One SELECT (user_id, granularity, bucket, counters...) per granularity and source, for rows named row"""
+    selects = []
+    for granularity, bucket in _ROLLUP_BUCKETS.items():
+        for timestamp, condition, counters in _rollup_sources(row):
+            counts = ", ".join(f"{counters.get(counter, '0')} AS {counter}" for counter in ROLLUP_COUNTERS)
+            selects.append(
+                f"SELECT {row}.user_id AS user_id, '{granularity}' AS granularity, {bucket.format(timestamp)} AS bucket, "
+                f"{counts} WHERE {bucket.format(timestamp)} IS NOT NULL{f' AND {condition}' if condition else ''}"
+            )
+    return selects
+
+
+def _rollup_add(row: str) -> str:
+    return "\n".join(
+        f"    INSERT INTO task_rollups (user_id, granularity, bucket, {', '.join(ROLLUP_COUNTERS)}, updated_at)\n"
+        f"    {select.replace(' WHERE ', f', {_NOW} WHERE ', 1)}\n"
+        f"    ON CONFLICT (user_id, granularity, bucket) DO UPDATE SET "
+        + ", ".join(f"{counter} = {counter} + excluded.{counter}" for counter in ROLLUP_COUNTERS)
+        + ", updated_at = excluded.updated_at;"
+        for select in _rollup_selects(row)
+    )
+
+
+def _rollup_remove(row: str) -> str:
+    return "\n".join(
+        f"    UPDATE task_rollups SET "
+        + ", ".join(f"{counter} = {counter} - ({value})" for counter, value in counters.items())
+        + f", updated_at = {_NOW}\n"
+        f"    WHERE user_id = {row}.user_id AND granularity = '{granularity}' AND bucket = {bucket.format(timestamp)}"
+        f"{f' AND {condition}' if condition else ''};"
+        for granularity, bucket in _ROLLUP_BUCKETS.items()
+        for timestamp, condition, counters in _rollup_sources(row)
+    )
+
+
+# Day and week rollups per user, moved by every task write inside the writing transaction like the
+# task_analytics counters (decrements never create rows); created after COLUMN_MIGRATIONS, since the
+# triggers read tasks.completed_at
+ROLLUP_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS task_rollups (
+    user_id TEXT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    granularity TEXT NOT NULL,
+    bucket TEXT NOT NULL,
+    created INTEGER NOT NULL DEFAULT 0,
+    completed INTEGER NOT NULL DEFAULT 0,
+    due INTEGER NOT NULL DEFAULT 0,
+    due_open INTEGER NOT NULL DEFAULT 0,
+    grade_sum REAL NOT NULL DEFAULT 0,
+    grade_count INTEGER NOT NULL DEFAULT 0,
+    updated_at TEXT,
+    PRIMARY KEY (user_id, granularity, bucket)
+);
+CREATE TRIGGER IF NOT EXISTS tasks_rollups_insert AFTER INSERT ON tasks BEGIN
+{_rollup_add("new")}
+END;
+CREATE TRIGGER IF NOT EXISTS tasks_rollups_delete AFTER DELETE ON tasks BEGIN
+{_rollup_remove("old")}
+END;
+CREATE TRIGGER IF NOT EXISTS tasks_rollups_update AFTER UPDATE OF user_id, status, created_at, completed_at, due_date, grade ON tasks
+WHEN old.user_id IS NOT new.user_id OR old.status IS NOT new.status OR old.created_at IS NOT new.created_at
+    OR old.completed_at IS NOT new.completed_at OR old.due_date IS NOT new.due_date OR old.grade IS NOT new.grade
+BEGIN
+{_rollup_remove("old")}
+{_rollup_add("new")}
+END;
+"""
+
+# Rollups recomputed from tasks, in the task_rollups layout
+_ACTUAL_ROLLUPS = (
+    "SELECT user_id, granularity, bucket, "
+    + ", ".join(f"sum({counter}) AS {counter}" for counter in ROLLUP_COUNTERS)
+    + " FROM (" + " UNION ALL ".join(select.replace(" WHERE ", " FROM tasks WHERE ", 1) for select in _rollup_selects("tasks"))
+    + ") GROUP BY user_id, granularity, bucket"
+)
+
+
+def _rebuild_rollups(conn: sqlite3.Connection):
+    """Recount every rollup from the tasks (completed tasks without completed_at count as completed when last updated)"""
+    conn.execute("UPDATE tasks SET completed_at = updated_at WHERE status = 'completed' AND completed_at IS NULL")
+    conn.execute("DELETE FROM task_rollups")
+    conn.execute(
+        f"INSERT INTO task_rollups (user_id, granularity, bucket, {', '.join(ROLLUP_COUNTERS)}, updated_at) "
+        f"SELECT user_id, granularity, bucket, {', '.join(ROLLUP_COUNTERS)}, ? FROM ({_ACTUAL_ROLLUPS})",
+        (utcnow_iso(),),
+    )
+
+
+def _normalize_due_dates(conn: sqlite3.Connection):
+    """Rewrite due dates stored with another offset (before they were normalized on write) in UTC"""
+    updates = []
+    for row in conn.execute("SELECT id, due_date FROM tasks WHERE due_date NOT LIKE '%+00:00'").fetchall():
+        normalized = utc_timestamp(row["due_date"])
+        if normalized != row["due_date"]:
+            updates.append((normalized, row["id"]))
+    conn.executemany("UPDATE tasks SET due_date = ? WHERE id = ?", updates)
+
+
+class SQLiteDatabase:
+    """Single shared connection plus helpers that run statements off the event loop"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        # isolation_level=None: autocommit, explicit BEGIN in transaction()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA foreign_keys = ON")
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode = WAL")
+            self._conn.execute("PRAGMA synchronous = NORMAL")
+        has_fts = self._conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'tasks_fts'").fetchone()
+        has_counters = self._conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'tasks_analytics_insert'").fetchone()
+        has_rollups = self._conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'tasks_rollups_insert'").fetchone()
+        self._conn.executescript(SCHEMA)
+        for table, column, declaration in COLUMN_MIGRATIONS:
+            existing = {row["name"] for row in self._conn.execute(f"PRAGMA table_info({table})")}
+            if column not in existing:
+                self._conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {declaration}")
+        self._conn.executescript(ROLLUP_SCHEMA)
+        if not has_fts:
+            # index tasks written before the full-text table existed
+            self._conn.execute("INSERT INTO tasks_fts(tasks_fts) VALUES ('rebuild')")
+        if not has_counters:
+            # count tasks written before the analytics triggers existed
+            self._transaction(lambda conn: _reconcile_analytics(conn, None))
+        if not has_rollups:
+            # bucket tasks written before the rollup triggers existed
+            self._transaction(_rebuild_rollups)
+        self._transaction(_normalize_due_dates)
+
+    def _call(self, fn: Callable[[sqlite3.Connection], Any]) -> Any:
+        with self._lock:
+            return fn(self._conn)
+
+    def _transaction(self, fn: Callable[[sqlite3.Connection], Any]) -> Any:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(self._conn)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return result
+
+    async def run(self, fn: Callable[[sqlite3.Connection], Any]) -> Any:
+        """Run fn(connection) in a worker thread"""
+        return await asyncio.to_thread(self._call, fn)
+
+    async def transaction(self, fn: Callable[[sqlite3.Connection], Any]) -> Any:
+        """Run fn(connection) atomically in a worker thread"""
+        return await asyncio.to_thread(self._transaction, fn)
+
+    async def fetch_all(self, sql: str, params: Sequence[Any] = ()) -> List[dict]:
+        return await self.run(lambda conn: [dict(row) for row in conn.execute(sql, params).fetchall()])
+
+    async def fetch_one(self, sql: str, params: Sequence[Any] = ()) -> Optional[dict]:
+        def query(conn):
+            row = conn.execute(sql, params).fetchone()
+            return dict(row) if row else None
+        return await self.run(query)
+
+    async def close(self):
+        await self.run(lambda conn: conn.close())
+
+
+def _select(table: str, columns: Columns) -> str:
+    return ", ".join(column_list(table, columns))
+
+
+def _first(rows: List[dict]) -> Optional[dict]:
+    return rows[0] if rows else None
+
+
+def _insert(conn: sqlite3.Connection, table: str, values: dict) -> dict:
+    row = prepare_insert(table, values)
+    names = list(row.keys())
+    try:
+        conn.execute(
+            f"INSERT INTO {table} ({', '.join(names)}) VALUES ({', '.join('?' for _ in names)})",
+            [row[n] for n in names],
+        )
+    except sqlite3.IntegrityError as e:
+        if "UNIQUE" in str(e):
+            raise DuplicateKeyError(str(e)) from e
+        raise
+    return row
+
+
+def _insert_many(conn: sqlite3.Connection, table: str, rows: Sequence[dict]) -> List[dict]:
+    """Multi-row INSERTs, in chunks that stay under the host-parameter limit of older SQLite builds"""
+    prepared = [prepare_insert(table, values) for values in rows]
+    if not prepared:
+        return []
+    names = list(prepared[0].keys())
+    placeholders = "(" + ", ".join("?" for _ in names) + ")"
+    chunk = max(1, _MAX_VARIABLES // len(names))
+    for start in range(0, len(prepared), chunk):
+        batch = prepared[start:start + chunk]
+        conn.execute(
+            f"INSERT INTO {table} ({', '.join(names)}) VALUES {', '.join(placeholders for _ in batch)}",
+            [row.get(n) for row in batch for n in names],
+        )
+    return prepared
+
+
+def _in(count: int) -> str:
+    return "(" + ", ".join("?" for _ in range(count)) + ")"
+
+
+def _update_where(
+    conn: sqlite3.Connection, table: str, values: dict, where: str, params: Sequence[Any], columns: Columns
+) -> List[dict]:
+    """Update the rows matching where and return their columns as written"""
+    selected = _select(table, columns)
+    changes = prepare_update(table, values)
+    if not changes:
+        return [dict(row) for row in conn.execute(f"SELECT {selected} FROM {table} WHERE {where}", params).fetchall()]
+    assignments = ", ".join(f"{name} = ?" for name in changes)
+    values = list(changes.values())
+    if table == "tasks" and "status" in changes and "completed_at" not in changes:
+        # _rows.stamp_completion, against the stored row
+        assignments += (
+            ", completed_at = CASE WHEN ? <> 'completed' THEN NULL "
+            "WHEN status = 'completed' AND completed_at IS NOT NULL THEN completed_at ELSE ? END"
+        )
+        values += [changes["status"], changes["updated_at"]]
+    sql = f"UPDATE {table} SET {assignments} WHERE {where}"
+    if _HAS_RETURNING:
+        return [dict(row) for row in conn.execute(f"{sql} RETURNING {selected}", [*values, *params]).fetchall()]
+    conn.execute(sql, [*values, *params])
+    return [dict(row) for row in conn.execute(f"SELECT {selected} FROM {table} WHERE {where}", params).fetchall()]
+
+
+def _delete_where(conn: sqlite3.Connection, table: str, where: str, params: Sequence[Any], columns: Columns) -> List[dict]:
+    """Delete the rows matching where, returning their columns"""
+    selected = _select(table, columns)
+    if _HAS_RETURNING:
+        return [dict(row) for row in conn.execute(f"DELETE FROM {table} WHERE {where} RETURNING {selected}", params).fetchall()]
+    rows = [dict(row) for row in conn.execute(f"SELECT {selected} FROM {table} WHERE {where}", params).fetchall()]
+    if rows:
+        conn.execute(f"DELETE FROM {table} WHERE {where}", params)
+    return rows
+
+
+class SQLiteUserRepository(UserRepository):
+    def __init__(self, db: SQLiteDatabase):
+        self.db = db
+
+    async def get_by_id(self, user_id: str, columns: Columns) -> Optional[dict]:
+        return await self.db.fetch_one(f"SELECT {_select('users', columns)} FROM users WHERE id = ?", (user_id,))
+
+    async def get_by_email(self, email: str, columns: Columns) -> Optional[dict]:
+        return await self.db.fetch_one(f"SELECT {_select('users', columns)} FROM users WHERE email = ?", (email,))
+
+    async def create(self, values: dict, columns: Columns) -> dict:
+        row = await self.db.transaction(lambda conn: _insert(conn, "users", values))
+        return project(row, column_list("users", columns))
+
+    async def update(self, user_id: str, values: dict, columns: Columns) -> Optional[dict]:
+        rows = await self.db.transaction(lambda conn: _update_where(conn, "users", values, "id = ?", (user_id,), columns))
+        return _first(rows)
+
+    async def delete(self, user_id: str, columns: Columns) -> Optional[dict]:
+        rows = await self.db.transaction(lambda conn: _delete_where(conn, "users", "id = ?", (user_id,), columns))
+        return _first(rows)
+
+    async def delete_account(self, user_id: str) -> bool:
+        # tasks, subscriptions and analytics go with the user via ON DELETE CASCADE
+        deleted = await self.db.transaction(
+            lambda conn: conn.execute("DELETE FROM users WHERE id = ?", (user_id,)).rowcount
+        )
+        return deleted > 0
+
+    async def mark_deleted(self, user_id: str, columns: Columns) -> Optional[dict]:
+        return await self.update(user_id, {"deleted_at": utcnow_iso()}, columns)
+
+
+class SQLiteTaskRepository(TaskRepository):
+    def __init__(self, db: SQLiteDatabase):
+        self.db = db
+
+    async def list_for_user(self, user_id: str, columns: Columns) -> List[dict]:
+        return await self.db.fetch_all(f"SELECT {_select('tasks', columns)} FROM tasks WHERE user_id = ?", (user_id,))
+
+    async def get(self, task_id: str, user_id: str, columns: Columns) -> Optional[dict]:
+        return await self.db.fetch_one(
+            f"SELECT {_select('tasks', columns)} FROM tasks WHERE id = ? AND user_id = ?", (task_id, user_id)
+        )
+
+    async def list_page(
+        self,
+        user_id: str,
+        columns: Columns,
+        filters: Optional[TaskFilters] = None,
+        after: Optional[Cursor] = None,
+        limit: int = 50,
+    ) -> Page:
+        filters = filters or TaskFilters()
+        where, params = ["user_id = ?"], [user_id]
+        for name, value in filters.equalities():
+            where.append(f"{name} = ?")
+            params.append(value)
+        if filters.due_from is not None:
+            where.append("due_date >= ?")
+            params.append(filters.due_from)
+        if filters.due_to is not None:
+            where.append("due_date < ?")
+            params.append(filters.due_to)
+        if after is not None:
+            due_date, row_id = after
+            if due_date is None:
+                where.append("((due_date IS NULL AND id > ?) OR due_date IS NOT NULL)")
+                params.append(row_id)
+            else:
+                # row-value comparison so SQLite turns it into an index range
+                where.append("(due_date, id) > (?, ?)")
+                params.extend([due_date, row_id])
+        rows = await self.db.fetch_all(
+            f"SELECT {', '.join(page_columns(column_list('tasks', columns)))} FROM tasks WHERE {' AND '.join(where)} "
+            "ORDER BY due_date, id LIMIT ?",
+            [*params, limit + 1],
+        )
+        return build_page(rows, limit)
+
+    async def search(
+        self,
+        user_id: str,
+        terms: Sequence[str],
+        columns: Columns,
+        status: Optional[str] = None,
+        offset: int = 0,
+        limit: int = 20,
+    ) -> Page:
+        selected = ", ".join(f"tasks.{name}" for name in column_list("tasks", columns))
+        weights = ", ".join(str(SEARCH_WEIGHTS[c]) for c in SEARCH_COLUMNS)
+        where, params = ["tasks_fts MATCH ?", "tasks.user_id = ?"], [fts5_query(list(terms)), user_id]
+        if status is not None:
+            where.append("tasks.status = ?")
+            params.append(status)
+        rows = await self.db.fetch_all(
+            f"SELECT {selected} FROM tasks_fts JOIN tasks ON tasks.rowid = tasks_fts.rowid "
+            f"WHERE {' AND '.join(where)} ORDER BY bm25(tasks_fts, {weights}), tasks.id LIMIT ? OFFSET ?",
+            [*params, limit + 1, offset],
+        )
+        return build_offset_page(rows, offset, limit)
+
+    async def create(self, values: dict, columns: Columns) -> dict:
+        row = await self.db.transaction(lambda conn: _insert(conn, "tasks", values))
+        return project(row, column_list("tasks", columns))
+
+    async def update(self, task_id: str, user_id: str, values: dict, columns: Columns) -> Optional[dict]:
+        rows = await self.db.transaction(
+            lambda conn: _update_where(conn, "tasks", values, "id = ? AND user_id = ?", (task_id, user_id), columns)
+        )
+        return _first(rows)
+
+    async def delete(self, task_id: str, user_id: str, columns: Columns) -> Optional[dict]:
+        rows = await self.db.transaction(
+            lambda conn: _delete_where(conn, "tasks", "id = ? AND user_id = ?", (task_id, user_id), columns)
+        )
+        return _first(rows)
+
+    async def create_many(self, rows: Sequence[dict], columns: Columns) -> List[dict]:
+        names = column_list("tasks", columns)
+        created = await self.db.transaction(lambda conn: _insert_many(conn, "tasks", rows))
+        return [project(row, names) for row in created]
+
+    async def update_many(self, task_ids: Sequence[str], user_id: str, values: dict, columns: Columns) -> List[dict]:
+        ids = list(dict.fromkeys(task_ids))
+        if not ids:
+            return []
+        return await self.db.transaction(
+            lambda conn: _update_where(conn, "tasks", values, f"user_id = ? AND id IN {_in(len(ids))}", [user_id, *ids], columns)
+        )
+
+    async def delete_many(self, task_ids: Sequence[str], user_id: str, columns: Columns) -> List[dict]:
+        ids = list(dict.fromkeys(task_ids))
+        if not ids:
+            return []
+        return await self.db.transaction(
+            lambda conn: _delete_where(conn, "tasks", f"user_id = ? AND id IN {_in(len(ids))}", [user_id, *ids], columns)
+        )
+
+    async def delete_for_user(self, user_id: str) -> int:
+        return await self.db.transaction(
+            lambda conn: conn.execute("DELETE FROM tasks WHERE user_id = ?", (user_id,)).rowcount
+        )
+
+    async def count_for_user(self, user_id: str) -> int:
+        row = await self.db.fetch_one("SELECT COUNT(*) AS n FROM tasks WHERE user_id = ?", (user_id,))
+        return row["n"]
+
+    async def count_groups(self, user_id: str) -> List[dict]:
+        groups = ", ".join(projections.TASK_ANALYTICS)
+        return await self.db.fetch_all(
+            f"SELECT {groups}, COUNT(*) AS count FROM tasks WHERE user_id = ? GROUP BY {groups}", (user_id,)
+        )
+
+    async def purge_batch(self, user_id: str, batch_size: int) -> int:
+        return await self.db.transaction(
+            lambda conn: conn.execute(
+                "DELETE FROM tasks WHERE rowid IN (SELECT rowid FROM tasks WHERE user_id = ? LIMIT ?)",
+                (user_id, batch_size),
+            ).rowcount
+        )
+
+
+class SQLiteSubscriptionRepository(SubscriptionRepository):
+    def __init__(self, db: SQLiteDatabase):
+        self.db = db
+
+    async def get_active(self, user_id: str, columns: Columns) -> Optional[dict]:
+        return await self.db.fetch_one(
+            f"SELECT {_select('user_subscriptions', columns)} FROM user_subscriptions "
+            "WHERE user_id = ? AND status = 'active' LIMIT 1",
+            (user_id,),
+        )
+
+    async def delete_for_user(self, user_id: str) -> int:
+        return await self.db.transaction(
+            lambda conn: conn.execute("DELETE FROM user_subscriptions WHERE user_id = ?", (user_id,)).rowcount
+        )
+
+
+# Counters recomputed from tasks, in the task_analytics layout (the triggers' dimensions)
+_ACTUAL_ANALYTICS = " UNION ALL ".join(
+    f"SELECT user_id, '{dimension}' AS dimension, {repr(ANALYTICS_TOTAL) if column is None else column} AS value, "
+    f"COUNT(*) AS count FROM tasks WHERE ?1 IS NULL OR user_id = ?1 GROUP BY user_id{'' if column is None else ', ' + column}"
+    for dimension, column in ANALYTICS_DIMENSIONS
+)
+_ANALYTICS_ROW = "SELECT user_id, dimension, value, count"
+
+
+def _reconcile_analytics(conn: sqlite3.Connection, user_id: Optional[str]) -> List[str]:
+    """Repair the counters of every user (or user_id) whose stored counts differ from the tasks; inside a transaction"""
+    stored = "SELECT user_id, dimension, value, count FROM task_analytics WHERE (?1 IS NULL OR user_id = ?1) AND count <> 0"
+    drifted = [row[0] for row in conn.execute(
+        f"SELECT DISTINCT user_id FROM ({_ANALYTICS_ROW} FROM ({_ACTUAL_ANALYTICS}) EXCEPT {stored} "
+        f"UNION ALL {_ANALYTICS_ROW} FROM ({stored} EXCEPT {_ANALYTICS_ROW} FROM ({_ACTUAL_ANALYTICS})))",
+        (user_id,),
+    ).fetchall()]
+    now = utcnow_iso()
+    for drifted_user in drifted:
+        conn.execute("DELETE FROM task_analytics WHERE user_id = ?", (drifted_user,))
+        conn.execute(
+            f"INSERT INTO task_analytics (user_id, dimension, value, count, updated_at) "
+            f"SELECT user_id, dimension, value, count, ?2 FROM ({_ACTUAL_ANALYTICS})",
+            (drifted_user, now),
+        )
+    return drifted
+
+
+class SQLiteTaskAnalyticsRepository(TaskAnalyticsRepository):
+    def __init__(self, db: SQLiteDatabase):
+        self.db = db
+
+    async def list_for_user(self, user_id: str) -> List[dict]:
+        return await self.db.fetch_all(
+            f"SELECT {_select('task_analytics', projections.ANALYTICS_COUNTERS)} FROM task_analytics WHERE user_id = ?", (user_id,)
+        )
+
+    async def reconcile(self, user_id: Optional[str] = None) -> List[str]:
+        # BEGIN IMMEDIATE holds off task writes, so counting and repairing see the same tasks
+        return await self.db.transaction(lambda conn: _reconcile_analytics(conn, user_id))
+
+    async def rollups(self, user_id: str, granularity: str, start: str, end: str) -> List[dict]:
+        # a range scan of the primary key: only the buckets asked for are read
+        return await self.db.fetch_all(
+            f"SELECT {_select('task_rollups', projections.ROLLUP_BUCKETS)} FROM task_rollups "
+            "WHERE user_id = ? AND granularity = ? AND bucket BETWEEN ? AND ? ORDER BY bucket",
+            (user_id, granularity, start, end),
+        )
+
+    async def delete_for_user(self, user_id: str) -> int:
+        return await self.db.transaction(
+            lambda conn: conn.execute("DELETE FROM task_analytics WHERE user_id = ?", (user_id,)).rowcount
+            + conn.execute("DELETE FROM task_rollups WHERE user_id = ?", (user_id,)).rowcount
+        )
+
+
+def _assistance_entry(row: Optional[dict]) -> Optional[dict]:
+    if row is None:
+        return None
+    return {**row, "payload": json.loads(row["payload"])}
+
+
+class SQLiteAssistanceRepository(AssistanceRepository):
+    def __init__(self, db: SQLiteDatabase):
+        self.db = db
+
+    async def get(self, key: str, now: str) -> Optional[dict]:
+        return _assistance_entry(await self.db.fetch_one(
+            f"SELECT {_select('ai_assistance', projections.ASSISTANCE_ENTRY)} FROM ai_assistance WHERE key = ? AND expires_at > ?",
+            (key, now),
+        ))
+
+    async def put(self, entry: dict) -> None:
+        row = {**entry, "payload": json.dumps(entry["payload"])}
+        names = list(row.keys())
+        await self.db.transaction(lambda conn: conn.execute(
+            f"INSERT OR REPLACE INTO ai_assistance ({', '.join(names)}) VALUES ({', '.join('?' for _ in names)})",
+            [row[n] for n in names],
+        ))
+
+    async def link_task(self, user_id: str, task_id: str, key: str) -> None:
+        await self.db.transaction(lambda conn: conn.execute(
+            "INSERT OR REPLACE INTO ai_assistance_tasks (user_id, task_id, key) VALUES (?, ?, ?)",
+            (user_id, task_id, key),
+        ))
+
+    async def get_for_task(self, user_id: str, task_id: str, now: str) -> Optional[dict]:
+        return _assistance_entry(await self.db.fetch_one(
+            f"SELECT {', '.join('a.' + name for name in projections.ASSISTANCE_ENTRY)} "
+            "FROM ai_assistance_tasks t JOIN ai_assistance a ON a.key = t.key "
+            "WHERE t.user_id = ? AND t.task_id = ? AND a.expires_at > ?",
+            (user_id, task_id, now),
+        ))
+
+    async def evict(self, now: str, max_entries: int) -> int:
+        def evict(conn):
+            removed = conn.execute("DELETE FROM ai_assistance WHERE expires_at <= ?", (now,)).rowcount
+            removed += conn.execute(
+                "DELETE FROM ai_assistance WHERE key IN ("
+                "SELECT key FROM ai_assistance ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+                (max_entries,),
+            ).rowcount
+            return removed
+        return await self.db.transaction(evict)
+
+
+def create_sqlite_repositories(path: Optional[str] = None) -> Repositories:
+    path = path or os.getenv("SQLITE_PATH", "taskmanager.db")
+    db = SQLiteDatabase(path)
+    logger.info(f"SQLite storage ready at {path}")
+    return Repositories(
+        backend="sqlite",
+        users=SQLiteUserRepository(db),
+        tasks=SQLiteTaskRepository(db),
+        subscriptions=SQLiteSubscriptionRepository(db),
+        task_analytics=SQLiteTaskAnalyticsRepository(db),
+        assistance=SQLiteAssistanceRepository(db),
+        closer=db.close,
+    )
@@ -0,0 +1,252 @@
+"""Supabase (PostgREST) implementation of the repositories"""
+
+from typing import List, Optional, Sequence
+
+from app.db import PostgrestClient, PostgrestError
+from app.db.postgrest import quote
+from .base import (
+    AssistanceRepository,
+    Columns,
+    DuplicateKeyError,
+    Repositories,
+    SubscriptionRepository,
+    TaskAnalyticsRepository,
+    TaskRepository,
+    UserRepository,
+)
+from . import projections
+from .paging import Cursor, Page, TaskFilters, build_offset_page, build_page, page_columns
+from .search import tsquery
+from ._rows import column_list, project, utcnow_iso
+
+
+UNIQUE_VIOLATION = '23505'
+
+
+def _first(rows: List[dict]) -> Optional[dict]:
+    return rows[0] if rows else None
+
+
+class SupabaseUserRepository(UserRepository):
+    def __init__(self, client: PostgrestClient):
+        self.client = client
+
+    async def get_by_id(self, user_id: str, columns: Columns) -> Optional[dict]:
+        result = await self.client.atable('users').select(columns).eq('id', user_id).limit(1).execute()
+        return _first(result.data)
+
+    async def get_by_email(self, email: str, columns: Columns) -> Optional[dict]:
+        result = await self.client.atable('users').select(columns).eq('email', email).limit(1).execute()
+        return _first(result.data)
+
+    async def create(self, values: dict, columns: Columns) -> dict:
+        try:
+            result = await self.client.atable('users').insert(values).select(columns).execute()
+        except PostgrestError as e:
+            if e.code == UNIQUE_VIOLATION:
+                raise DuplicateKeyError(e.message) from e
+            raise
+        return _first(result.data)
+
+    async def update(self, user_id: str, values: dict, columns: Columns) -> Optional[dict]:
+        result = await self.client.atable('users').update(values).eq('id', user_id).select(columns).execute()
+        return _first(result.data)
+
+    async def delete(self, user_id: str, columns: Columns) -> Optional[dict]:
+        result = await self.client.atable('users').delete().eq('id', user_id).select(columns).execute()
+        return _first(result.data)
+
+    async def delete_account(self, user_id: str) -> bool:
+        # one transaction inside the database (migrations/004_account_deletion.sql)
+        result = await self.client.arpc('delete_user_account', {'p_user_id': user_id}).execute()
+        return bool(result.data and result.data[0])
+
+    async def mark_deleted(self, user_id: str, columns: Columns) -> Optional[dict]:
+        return await self.update(user_id, {'deleted_at': utcnow_iso()}, columns)
+
+
+class SupabaseTaskRepository(TaskRepository):
+    def __init__(self, client: PostgrestClient):
+        self.client = client
+
+    async def list_for_user(self, user_id: str, columns: Columns) -> List[dict]:
+        result = await self.client.atable('tasks').select(columns).eq('user_id', user_id).execute()
+        return result.data
+
+    async def get(self, task_id: str, user_id: str, columns: Columns) -> Optional[dict]:
+        result = await self.client.atable('tasks').select(columns).eq('id', task_id).eq('user_id', user_id).execute()
+        return _first(result.data)
+
+    async def list_page(
+        self,
+        user_id: str,
+        columns: Columns,
+        filters: Optional[TaskFilters] = None,
+        after: Optional[Cursor] = None,
+        limit: int = 50,
+    ) -> Page:
+        filters = filters or TaskFilters()
+        query = self.client.atable('tasks').select(page_columns(column_list('tasks', columns))).eq('user_id', user_id)
+        for name, value in filters.equalities():
+            query = query.eq(name, value)
+        if filters.due_from is not None:
+            query = query.gte('due_date', filters.due_from)
+        if filters.due_to is not None:
+            query = query.lt('due_date', filters.due_to)
+        if after is not None:
+            due_date, row_id = after
+            if due_date is None:
+                query = query.or_(f"and(due_date.is.null,id.gt.{quote(row_id)}),due_date.not.is.null")
+            else:
+                due, rid = quote(due_date), quote(row_id)
+                query = query.or_(f"due_date.gt.{due},and(due_date.eq.{due},id.gt.{rid})")
+        result = await query.order('due_date', nullsfirst=True).order('id').limit(limit + 1).execute()
+        return build_page(result.data, limit)
+
+    async def search(
+        self,
+        user_id: str,
+        terms: Sequence[str],
+        columns: Columns,
+        status: Optional[str] = None,
+        offset: int = 0,
+        limit: int = 20,
+    ) -> Page:
+        # ranked by ts_rank over the GIN-indexed tasks.search column (migrations/002_tasks_search.sql)
+        result = await self.client.arpc('search_tasks', {
+            'p_user_id': user_id,
+            'p_query': tsquery(list(terms)),
+            'p_status': status,
+            'p_limit': limit + 1,
+            'p_offset': offset,
+        }).execute()
+        names = column_list('tasks', columns)
+        return build_offset_page([project(row, names) for row in result.data], offset, limit)
+
+    async def create(self, values: dict, columns: Columns) -> dict:
+        result = await self.client.atable('tasks').insert(values).select(columns).execute()
+        return _first(result.data)
+
+    async def update(self, task_id: str, user_id: str, values: dict, columns: Columns) -> Optional[dict]:
+        result = await self.client.atable('tasks').update(values).eq('id', task_id).eq('user_id', user_id).select(columns).execute()
+        return _first(result.data)
+
+    async def delete(self, task_id: str, user_id: str, columns: Columns) -> Optional[dict]:
+        result = await self.client.atable('tasks').delete().eq('id', task_id).eq('user_id', user_id).select(columns).execute()
+        return _first(result.data)
+
+    async def create_many(self, rows: Sequence[dict], columns: Columns) -> List[dict]:
+        if not rows:
+            return []
+        result = await self.client.atable('tasks').insert(list(rows)).select(columns).execute()
+        return result.data
+
+    async def update_many(self, task_ids: Sequence[str], user_id: str, values: dict, columns: Columns) -> List[dict]:
+        if not task_ids:
+            return []
+        result = await self.client.atable('tasks').update(values).eq('user_id', user_id).in_('id', task_ids).select(columns).execute()
+        return result.data
+
+    async def delete_many(self, task_ids: Sequence[str], user_id: str, columns: Columns) -> List[dict]:
+        if not task_ids:
+            return []
+        result = await self.client.atable('tasks').delete().eq('user_id', user_id).in_('id', task_ids).select(columns).execute()
+        return result.data
+
+    async def delete_for_user(self, user_id: str) -> int:
+        result = await self.client.atable('tasks').delete().eq('user_id', user_id).select('id').execute()
+        return len(result.data)
+
+    async def count_for_user(self, user_id: str) -> int:
+        result = await self.client.atable('tasks').select('id', count='exact').eq('user_id', user_id).limit(1).execute()
+        return result.count or 0
+
+    async def count_groups(self, user_id: str) -> List[dict]:
+        # GROUP BY view (migrations/008_task_groups_view.sql): only the aggregate crosses the wire
+        result = await self.client.atable('task_groups').select((*projections.TASK_ANALYTICS, 'count')) \
+            .eq('user_id', user_id).execute()
+        return result.data
+
+    async def purge_batch(self, user_id: str, batch_size: int) -> int:
+        result = await self.client.arpc('purge_user_tasks', {'p_user_id': user_id, 'p_batch_size': batch_size}).execute()
+        return int(result.data[0]) if result.data else 0
+
+
+class SupabaseSubscriptionRepository(SubscriptionRepository):
+    def __init__(self, client: PostgrestClient):
+        self.client = client
+
+    async def get_active(self, user_id: str, columns: Columns) -> Optional[dict]:
+        result = await self.client.atable('user_subscriptions').select(columns).eq('user_id', user_id).eq('status', 'active').limit(1).execute()
+        return _first(result.data)
+
+    async def delete_for_user(self, user_id: str) -> int:
+        result = await self.client.atable('user_subscriptions').delete().eq('user_id', user_id).select('user_id').execute()
+        return len(result.data)
+
+
+class SupabaseTaskAnalyticsRepository(TaskAnalyticsRepository):
+    def __init__(self, client: PostgrestClient):
+        self.client = client
+
+    async def list_for_user(self, user_id: str) -> List[dict]:
+        result = await self.client.atable('task_analytics').select(projections.ANALYTICS_COUNTERS).eq('user_id', user_id).execute()
+        return result.data
+
+    async def reconcile(self, user_id: Optional[str] = None) -> List[str]:
+        # counting and repair run in the database (migrations/007_task_analytics_counters.sql)
+        result = await self.client.arpc('reconcile_task_analytics', {'p_user_id': user_id}).execute()
+        return [str(row) for row in result.data or []]
+
+    async def rollups(self, user_id: str, granularity: str, start: str, end: str) -> List[dict]:
+        # kept by the triggers of migrations/009_task_rollups.sql; the range is a primary key scan
+        query = self.client.atable('task_rollups').select(projections.ROLLUP_BUCKETS).eq('user_id', user_id).eq('granularity', granularity)
+        result = await query.gte('bucket', start).lte('bucket', end).order('bucket').execute()
+        return result.data
+
+    async def delete_for_user(self, user_id: str) -> int:
+        removed = 0
+        for table in ('task_analytics', 'task_rollups'):
+            result = await self.client.atable(table).delete().eq('user_id', user_id).select('user_id').execute()
+            removed += len(result.data)
+        return removed
+
+
+class SupabaseAssistanceRepository(AssistanceRepository):
+    def __init__(self, client: PostgrestClient):
+        self.client = client
+
+    async def get(self, key: str, now: str) -> Optional[dict]:
+        result = await self.client.atable('ai_assistance').select(projections.ASSISTANCE_ENTRY).eq('key', key).gt('expires_at', now).limit(1).execute()
+        return _first(result.data)
+
+    async def put(self, entry: dict) -> None:
+        await self.client.atable('ai_assistance').upsert(entry, on_conflict='key', returning='minimal').execute()
+
+    async def link_task(self, user_id: str, task_id: str, key: str) -> None:
+        await self.client.atable('ai_assistance_tasks').upsert(
+            {'user_id': user_id, 'task_id': task_id, 'key': key}, on_conflict='user_id,task_id', returning='minimal'
+        ).execute()
+
+    async def get_for_task(self, user_id: str, task_id: str, now: str) -> Optional[dict]:
+        # embedded resource over the ai_assistance_tasks.key foreign key (migrations/006_ai_assistance_cache.sql)
+        result = await self.client.atable('ai_assistance_tasks').select(f"ai_assistance!inner({','.join(projections.ASSISTANCE_ENTRY)})") \
+            .eq('user_id', user_id).eq('task_id', task_id).gt('ai_assistance.expires_at', now).limit(1).execute()
+        row = _first(result.data)
+        return row['ai_assistance'] if row else None
+
+    async def evict(self, now: str, max_entries: int) -> int:
+        result = await self.client.arpc('evict_ai_assistance', {'p_now': now, 'p_max_entries': max_entries}).execute()
+        return int(result.data[0]) if result.data else 0
+
+
+def create_supabase_repositories(client: PostgrestClient) -> Repositories:
+    return Repositories(
+        backend="supabase",
+        users=SupabaseUserRepository(client),
+        tasks=SupabaseTaskRepository(client),
+        subscriptions=SupabaseSubscriptionRepository(client),
+        task_analytics=SupabaseTaskAnalyticsRepository(client),
+        assistance=SupabaseAssistanceRepository(client),
+        closer=client.aclose,
+    )
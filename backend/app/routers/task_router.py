@@ -24,13 +24,13 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
         raise HTTPException(status_code=401, detail="Invalid token")
 
 @router.post("/", response_model=TaskResponse)
-def create_task(
+async def create_task(
     task: TaskCreate,
     current_user: dict = Depends(get_current_user)
 ):
     """Create a new task"""
     try:
-        return task_service.create_task(task, current_user["id"])
+        return await task_service.create_task(task, current_user["id"])
     except Exception as e:
         raise HTTPException(
             status_code=http_status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -38,10 +38,10 @@ def create_task(
         )
 
 @router.get("/", response_model=List[TaskResponse])
-def get_tasks(current_user: dict = Depends(get_current_user)):
+async def get_tasks(current_user: dict = Depends(get_current_user)):
     """Get all tasks for the current user"""
     try:
-        return task_service.get_user_tasks(current_user["id"])
+        return await task_service.get_user_tasks(current_user["id"])
     except Exception as e:
         raise HTTPException(
             status_code=http_status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -49,10 +49,10 @@ def get_tasks(current_user: dict = Depends(get_current_user)):
         )
 
 @router.get("/analytics")
-def get_analytics(current_user: dict = Depends(get_current_user)):
+async def get_analytics(current_user: dict = Depends(get_current_user)):
     """Get task analytics for the current user"""
     try:
-        return task_service.get_task_analytics(current_user["id"])
+        return await task_service.get_task_analytics(current_user["id"])
     except Exception as e:
         raise HTTPException(
             status_code=http_status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -60,13 +60,13 @@ def get_analytics(current_user: dict = Depends(get_current_user)):
         )
 
 @router.get("/{task_id}", response_model=TaskResponse)
-def get_task(
+async def get_task(
     task_id: int,
     current_user: dict = Depends(get_current_user)
 ):
     """Get a specific task"""
     try:
-        task = task_service.get_task_by_id(task_id, current_user["id"])
+        task = await task_service.get_task_by_id(task_id, current_user["id"])
         if not task:
             raise HTTPException(
                     status_code=http_status.HTTP_404_NOT_FOUND,
@@ -82,14 +82,14 @@ def get_task(
         )
 
 @router.put("/{task_id}", response_model=TaskResponse)
-def update_task(
+async def update_task(
     task_id: int,
     task_update: TaskUpdate,
     current_user: dict = Depends(get_current_user)
 ):
     """Update a specific task"""
     try:
-        task = task_service.update_task(task_id, task_update, current_user["id"])
+        task = await task_service.update_task(task_id, task_update, current_user["id"])
         if not task:
             raise HTTPException(
                     status_code=http_status.HTTP_404_NOT_FOUND,
@@ -105,13 +105,13 @@ def update_task(
         )
 
 @router.delete("/{task_id}")
-def delete_task(
+async def delete_task(
     task_id: int,
     current_user: dict = Depends(get_current_user)
 ):
     """Delete a specific task"""
     try:
-        success = task_service.delete_task(task_id, current_user["id"])
+        success = await task_service.delete_task(task_id, current_user["id"])
         if not success:
             raise HTTPException(
                     status_code=http_status.HTTP_404_NOT_FOUND,
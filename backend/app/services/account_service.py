@@ -0,0 +1,82 @@
+"""
+Account deletion.
+
+Accounts with up to ACCOUNT_PURGE_THRESHOLD tasks are removed in a single
+transaction. Larger accounts are marked deleted (login and writes are
+refused from then on, see main.get_active_user) and their tasks are
+purged in background batches of ACCOUNT_PURGE_BATCH_SIZE before the
+final delete; the client polls ``status`` until the account is gone.
+"""
+
+import asyncio
+import logging
+import os
+from typing import Dict, Optional
+
+from ..repositories import Repositories, projections
+
+logger = logging.getLogger(__name__)
+
+
+class AccountDeletionService:
+    def __init__(self, repositories: Repositories, threshold: Optional[int] = None, batch_size: Optional[int] = None):
+        self.repositories = repositories
+        self.threshold = threshold or int(os.getenv("ACCOUNT_PURGE_THRESHOLD", "2000"))
+        self.batch_size = batch_size or int(os.getenv("ACCOUNT_PURGE_BATCH_SIZE", "500"))
+        self._purges: Dict[str, asyncio.Task] = {}
+
+    async def delete(self, user_id: str) -> dict:
+        """Delete the account now, or mark it and start a background purge"""
+        task_count = await self.repositories.tasks.count_for_user(user_id)
+        if task_count <= self.threshold:
+            if not await self.repositories.users.delete_account(user_id):
+                return {"status": "not_found"}
+            return {"status": "deleted", "tasks_remaining": 0}
+
+        if not await self.repositories.users.mark_deleted(user_id, projections.USER_DELETION):
+            return {"status": "not_found"}
+        logger.info(f"🗑️ Account {user_id} has {task_count} tasks - purging in background")
+        self._start_purge(user_id)
+        return {"status": "purging", "tasks_remaining": task_count}
+
+    async def status(self, user_id: str) -> dict:
+        """Where a deletion stands: active, purging or deleted"""
+        user = await self.repositories.users.get_by_id(user_id, projections.USER_DELETION)
+        if user is None:
+            return {"status": "deleted", "tasks_remaining": 0}
+        if not user.get("deleted_at"):
+            return {"status": "active"}
+        # picks up purges interrupted by a restart
+        self._start_purge(user_id)
+        return {"status": "purging", "tasks_remaining": await self.repositories.tasks.count_for_user(user_id)}
+
+    def _start_purge(self, user_id: str):
+        running = self._purges.get(user_id)
+        if running is None or running.done():
+            self._purges[user_id] = asyncio.create_task(self._purge(user_id))
+
+    async def _purge(self, user_id: str):
+        try:
+            purged = 0
+            while True:
+                removed = await self.repositories.tasks.purge_batch(user_id, self.batch_size)
+                if not removed:
+                    break
+                purged += removed
+                # give waiting requests a turn between batches
+                await asyncio.sleep(0)
+            await self.repositories.users.delete_account(user_id)
+            logger.info(f"✅ Account {user_id} purged ({purged} tasks)")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"❌ Account purge failed for {user_id}: {e}")
+        finally:
+            self._purges.pop(user_id, None)
+
+    async def close(self):
+        """Stop running purges (they resume on the next status poll)"""
+        running = list(self._purges.values())
+        for task in running:
+            task.cancel()
+        await asyncio.gather(*running, return_exceptions=True)
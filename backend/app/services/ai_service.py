@@ -1,3 +1,4 @@
+import copy
 import os
 import logging
 from datetime import datetime, date
@@ -6,10 +7,16 @@ from fastapi import HTTPException
 import requests
 from dotenv import load_dotenv
 
+from ..cache import SimilarityIndex
+
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+# breakdowns Claude produced, reused for near-duplicate tasks of the same subject and type that are due the
+# same number of days ahead with the same estimated hours (the schedule is planned from both)
+breakdown_index = SimilarityIndex("task_breakdown")
+
 class AIService:
     def __init__(self):
         self.claude_api_key = os.getenv("CLAUDE_API_KEY")
@@ -49,14 +56,22 @@ class AIService:
             # Return a basic breakdown as fallback
             return self._get_basic_breakdown()
     
+    def _days_until_due(self, due_date_str: str) -> Optional[int]:
+        """Days from today to the due date (negative when overdue); None without a valid date"""
+        try:
+            return (datetime.strptime(due_date_str, '%Y-%m-%d').date() - date.today()).days
+        except (TypeError, ValueError):
+            return None
+    
     def _calculate_urgency_level(self, due_date_str: str) -> str:
         """Calculate urgency level based on due date"""
         if not due_date_str:
             return "LOW"
             
         try:
-            due_date = datetime.strptime(due_date_str, '%Y-%m-%d').date()
-            days_until_due = (due_date - date.today()).days
+            days_until_due = self._days_until_due(due_date_str)
+            if days_until_due is None:
+                return "LOW"
             
             if days_until_due < 0:
                 return "OVERDUE"
@@ -75,6 +90,15 @@ class AIService:
                                    assignment_type: str, due_date_str: str, 
                                    estimated_hours: float, urgency_level: str) -> Dict:
         """Get intelligent breakdown from Claude API"""
+        similarity_bucket = SimilarityIndex.bucket(
+            subject, assignment_type, urgency_level, self._days_until_due(due_date_str), estimated_hours or 0
+        )
+        similarity_text = f"{title} {description}"
+        similar = breakdown_index.find(similarity_bucket, similarity_text)
+        if similar:
+            logger.info(f"⚡ Reusing breakdown of a similar task ({similar.similarity:.2f})")
+            return copy.deepcopy(similar.value)
+        
         try:
             # Create prompt for Claude
             prompt = self._create_claude_prompt(
@@ -106,7 +130,11 @@ class AIService:
                 content = result['content'][0]['text']
                 
                 # Parse Claude's response into structured format
-                return self._parse_claude_response(content, urgency_level)
+                breakdown = self._parse_claude_json(content, urgency_level)
+                if breakdown is None:
+                    return self._get_rule_based_breakdown("", "", "", "", "", 0, urgency_level)
+                breakdown_index.add(similarity_bucket, similarity_text, copy.deepcopy(breakdown))
+                return breakdown
             else:
                 logger.warning(f"Claude API error: {response.status_code}")
                 return self._get_rule_based_breakdown(
@@ -185,8 +213,8 @@ Provide practical, actionable advice that a student can follow immediately.
 """
         return prompt
     
-    def _parse_claude_response(self, content: str, urgency_level: str) -> Dict:
-        """Parse Claude's response into structured format"""
+    def _parse_claude_json(self, content: str, urgency_level: str) -> Optional[Dict]:
+        """Structured breakdown from Claude's JSON, or None when there is none"""
         try:
             # Try to extract JSON from Claude's response
             import json
@@ -205,9 +233,7 @@ Provide practical, actionable advice that a student can follow immediately.
                 }
         except:
             pass
-        
-        # Fallback if parsing fails
-        return self._get_rule_based_breakdown("", "", "", "", "", 0, urgency_level)
+        return None
     
     def _get_rule_based_breakdown(self, title: str, description: str, subject: str,
                                  assignment_type: str, due_date_str: str,
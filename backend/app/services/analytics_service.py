@@ -0,0 +1,185 @@
+"""
+Task analytics from the per-user counters.
+
+Every backend keeps task_analytics in step with task writes in the same
+transaction (triggers for Supabase and SQLite, the store lock in memory),
+so a summary is built from a handful of counter rows instead of the whole
+task set. Users without counters (a database the counter migration has
+not reached yet) get the same summary from ``count_groups``, a GROUP BY
+the backend runs, folded in one pass.
+
+``AnalyticsReconciler`` recounts everything from the tasks every
+ANALYTICS_RECONCILE_INTERVAL_SECONDS and repairs users whose counters
+drifted (writes made with the triggers disabled, manual SQL, restored
+backups); 0 disables it.
+
+``dashboard_summary`` builds the same summary, plus the next and newest
+open tasks, from a task set already in memory (GET /dashboard), in one
+pass over the rows.
+
+Time series come from task_rollups, day and week buckets moved by the same
+writes: ``user_timeseries`` reads only the buckets of the requested range
+and fills the gaps with zeros.
+"""
+
+import asyncio
+import heapq
+import logging
+import os
+from dataclasses import asdict, dataclass
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from ..repositories import ANALYTICS_DIMENSIONS, ANALYTICS_TOTAL, Repositories, rollup_bucket
+
+logger = logging.getLogger(__name__)
+
+
+def analytics_summary(counters: Iterable[dict]) -> dict:
+    """The /tasks/analytics response for a user's task_analytics rows"""
+    by_dimension: Dict[str, Dict[str, int]] = {}
+    for row in counters:
+        if row["count"] > 0:
+            by_dimension.setdefault(row["dimension"], {})[row["value"]] = row["count"]
+    total_tasks = by_dimension.get("total", {}).get(ANALYTICS_TOTAL, 0)
+    statuses = by_dimension.get("status", {})
+    completed_tasks = statuses.get("completed", 0)
+    return {
+        "total_tasks": total_tasks,
+        "completed_tasks": completed_tasks,
+        "pending_tasks": statuses.get("pending", 0),
+        "in_progress_tasks": statuses.get("in_progress", 0),
+        "completion_rate": round(completed_tasks / total_tasks * 100, 1) if total_tasks else 0,
+        "assignment_types": by_dimension.get("assignment_type", {}),
+        "priorities": by_dimension.get("priority", {}),
+    }
+
+
+def counters_from_groups(groups: Iterable[dict]) -> List[dict]:
+    """task_analytics-shaped rows from count_groups rows"""
+    counts: Dict[tuple, int] = {}
+    for group in groups:
+        for dimension, column in ANALYTICS_DIMENSIONS:
+            key = (dimension, ANALYTICS_TOTAL if column is None else str(group[column]))
+            counts[key] = counts.get(key, 0) + group["count"]
+    return [{"dimension": dimension, "value": value, "count": count} for (dimension, value), count in counts.items()]
+
+
+def dashboard_summary(tasks: Iterable[dict], limit: int) -> dict:
+    """The analytics summary of a task set plus its open tasks due first ("upcoming") and created last ("recent")"""
+    columns = [column for _, column in ANALYTICS_DIMENSIONS if column is not None]
+    groups: Dict[tuple, int] = {}
+    open_tasks = []
+    for task in tasks:
+        key = tuple(task[column] for column in columns)
+        groups[key] = groups.get(key, 0) + 1
+        if task["status"] != "completed":
+            open_tasks.append(task)
+    counters = counters_from_groups({**dict(zip(columns, key)), "count": count} for key, count in groups.items())
+    return {
+        **analytics_summary(counters),
+        "upcoming": heapq.nsmallest(limit, open_tasks, key=lambda t: (t["due_date"] or "", t["id"])),
+        "recent": heapq.nlargest(limit, open_tasks, key=lambda t: (t["created_at"] or "", t["id"])),
+    }
+
+
+async def user_analytics(repositories: Repositories, user_id: str) -> dict:
+    """The analytics summary of a user, from the counters or, without them, the database-side grouping"""
+    counters = await repositories.task_analytics.list_for_user(user_id)
+    if not any(row["dimension"] == "total" for row in counters):
+        counters = counters_from_groups(await repositories.tasks.count_groups(user_id))
+    return analytics_summary(counters)
+
+
+def bucket_step(granularity: str) -> timedelta:
+    return timedelta(days=7 if granularity == "week" else 1)
+
+
+async def user_timeseries(repositories: Repositories, user_id: str, granularity: str, start: date, end: date, today: date) -> dict:
+    """Per-bucket counts of a user's tasks from the bucket holding start to the one holding end"""
+    first = date.fromisoformat(rollup_bucket(start, granularity))
+    last = date.fromisoformat(rollup_bucket(end, granularity))
+    step = bucket_step(granularity)
+    rows = {
+        row["bucket"]: row
+        for row in await repositories.task_analytics.rollups(user_id, granularity, first.isoformat(), last.isoformat())
+    }
+    # open tasks count as overdue once their due day has passed; in the current week only its past days do
+    this_week = today - timedelta(days=today.weekday())
+    overdue_this_week = 0
+    if granularity == "week" and first <= this_week <= last and this_week < today:
+        days = await repositories.task_analytics.rollups(
+            user_id, "day", this_week.isoformat(), (today - timedelta(days=1)).isoformat()
+        )
+        overdue_this_week = sum(row["due_open"] for row in days)
+
+    buckets = []
+    bucket = first
+    while bucket <= last:
+        row = rows.get(bucket.isoformat(), {})
+        if bucket + step <= today:
+            overdue = row.get("due_open", 0)
+        else:
+            overdue = overdue_this_week if bucket == this_week and granularity == "week" else 0
+        graded = row.get("grade_count", 0)
+        buckets.append({
+            "start": bucket.isoformat(),
+            "created": row.get("created", 0),
+            "completed": row.get("completed", 0),
+            "due": row.get("due", 0),
+            "overdue": overdue,
+            "graded": graded,
+            "average_grade": round(row["grade_sum"] / graded, 2) if graded else None,
+        })
+        bucket += step
+    return {"granularity": granularity, "from": first.isoformat(), "to": last.isoformat(), "buckets": buckets}
+
+
+@dataclass
+class ReconcileStats:
+    runs: int = 0
+    repaired_users: int = 0
+    errors: int = 0
+
+
+class AnalyticsReconciler:
+    def __init__(self, repositories: Repositories, interval: Optional[float] = None):
+        self.repositories = repositories
+        self.interval = interval if interval is not None else float(os.getenv("ANALYTICS_RECONCILE_INTERVAL_SECONDS", "3600"))
+        self.stats = ReconcileStats()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def run(self, user_id: Optional[str] = None) -> List[str]:
+        """One reconciliation pass; returns the users whose counters were repaired"""
+        self.stats.runs += 1
+        try:
+            repaired = await self.repositories.task_analytics.reconcile(user_id)
+        except Exception as e:
+            self.stats.errors += 1
+            logger.error(f"❌ Task analytics reconciliation failed: {e}")
+            return []
+        self.stats.repaired_users += len(repaired)
+        if repaired:
+            logger.warning(f"🔧 Repaired drifted task analytics of {len(repaired)} user(s)")
+        return repaired
+
+    def metrics(self) -> Dict[str, Any]:
+        return {"interval_seconds": self.interval, **asdict(self.stats)}
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.run()
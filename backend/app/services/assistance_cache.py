@@ -0,0 +1,142 @@
+"""
+Persistent cache for generated academic assistance.
+
+A response depends only on what goes into the prompt, so it is stored
+under a content key: the SHA-256 of subject, assignment type, normalized
+description, difficulty and the prompt template version. Identical
+requests - the same task viewed again, or another student with the same
+assignment - are served from storage instead of a new model call.
+Changing a prompt means bumping its template version, which retires the
+old entries.
+
+Entries expire after AI_CACHE_TTL_SECONDS; every AI_CACHE_EVICT_EVERY
+stores, expired entries are deleted and the store is trimmed to
+AI_CACHE_MAX_ENTRIES (soonest-expiring first). Cache failures are logged
+and treated as misses - they never fail a request.
+"""
+
+import hashlib
+import json
+import logging
+import os
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+from ..repositories import Repositories
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class AssistanceCacheStats:
+    hits: int = 0
+    misses: int = 0
+    stores: int = 0
+    evicted: int = 0
+    errors: int = 0
+
+
+def normalize_text(text: Optional[str]) -> str:
+    """Case- and whitespace-insensitive form of a prompt input"""
+    return " ".join((text or "").casefold().split())
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class AssistanceCache:
+    def __init__(
+        self,
+        repositories: Repositories,
+        ttl_seconds: Optional[float] = None,
+        max_entries: Optional[int] = None,
+        evict_every: Optional[int] = None,
+    ):
+        self.repositories = repositories
+        self.ttl = timedelta(seconds=ttl_seconds or float(os.getenv("AI_CACHE_TTL_SECONDS", str(30 * 24 * 3600))))
+        self.max_entries = max_entries or int(os.getenv("AI_CACHE_MAX_ENTRIES", "10000"))
+        self.evict_every = evict_every or int(os.getenv("AI_CACHE_EVICT_EVERY", "50"))
+        self.stats = AssistanceCacheStats()
+
+    @staticmethod
+    def key_for(subject: str, assignment_type: str, description: str, difficulty: str, template_version: str) -> str:
+        parts = [
+            normalize_text(subject),
+            normalize_text(assignment_type),
+            normalize_text(description),
+            normalize_text(difficulty),
+            template_version,
+        ]
+        return hashlib.sha256(json.dumps(parts, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+    async def lookup(self, key: str) -> Optional[dict]:
+        """The stored entry (payload, created_at, ...) for key, or None"""
+        try:
+            entry = await self.repositories.assistance.get(key, _now().isoformat())
+        except Exception as e:
+            self.stats.errors += 1
+            logger.warning(f"⚠️ Assistance cache lookup failed: {e}")
+            return None
+        if entry is None:
+            self.stats.misses += 1
+        else:
+            self.stats.hits += 1
+        return entry
+
+    async def store(self, key: str, subject: str, assignment_type: str, template_version: str, payload: dict) -> Optional[dict]:
+        """Save a generated response; returns the stored entry"""
+        now = _now()
+        entry = {
+            "key": key,
+            "subject": normalize_text(subject),
+            "assignment_type": normalize_text(assignment_type),
+            "template_version": template_version,
+            "payload": payload,
+            "created_at": now.isoformat(),
+            "expires_at": (now + self.ttl).isoformat(),
+        }
+        try:
+            await self.repositories.assistance.put(entry)
+        except Exception as e:
+            self.stats.errors += 1
+            logger.warning(f"⚠️ Assistance cache store failed: {e}")
+            return None
+        self.stats.stores += 1
+        if self.stats.stores % self.evict_every == 0:
+            await self.evict()
+        return entry
+
+    async def link(self, user_id: str, task_id: str, key: str):
+        """Remember which entry answered a user's task"""
+        try:
+            await self.repositories.assistance.link_task(user_id, task_id, key)
+        except Exception as e:
+            self.stats.errors += 1
+            logger.warning(f"⚠️ Assistance cache link failed: {e}")
+
+    async def for_task(self, user_id: str, task_id: str) -> Optional[dict]:
+        """The entry last served for a user's task, if it has not expired"""
+        return await self.repositories.assistance.get_for_task(user_id, task_id, _now().isoformat())
+
+    async def evict(self) -> int:
+        try:
+            removed = await self.repositories.assistance.evict(_now().isoformat(), self.max_entries)
+        except Exception as e:
+            self.stats.errors += 1
+            logger.warning(f"⚠️ Assistance cache eviction failed: {e}")
+            return 0
+        self.stats.evicted += removed
+        if removed:
+            logger.info(f"🧹 Evicted {removed} cached assistance entries")
+        return removed
+
+    def metrics(self) -> Dict[str, Any]:
+        lookups = self.stats.hits + self.stats.misses
+        return {
+            "ttl_seconds": self.ttl.total_seconds(),
+            "max_entries": self.max_entries,
+            "hit_ratio": round(self.stats.hits / lookups, 4) if lookups else 0.0,
+            **asdict(self.stats),
+        }
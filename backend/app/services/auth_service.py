@@ -1,4 +1,5 @@
 import bcrypt
+from app.services.password_hasher import default_rounds
 from datetime import datetime, timedelta
 from fastapi import HTTPException
 from supabase.client import Client
@@ -8,13 +9,16 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# What login reads from this service's (camelCase) users table - never the whole row
+LOGIN_COLUMNS = "id, email, username, passwordHash, fullName, studentID, major, yearLevel"
+
 class AuthService:
     def __init__(self, supabase_client: Client):
         self.supabase = supabase_client
 
     def hash_password(self, password: str) -> str:
         """Hash a password using bcrypt"""
-        salt = bcrypt.gensalt()
+        salt = bcrypt.gensalt(default_rounds())
         return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
 
     def verify_password(self, password: str, hashed: str) -> bool:
@@ -119,7 +123,7 @@ class AuthService:
                 )
 
             # Find user by email
-            result = self.supabase.table('users').select('*').eq('email', user_data.email).execute()
+            result = self.supabase.table('users').select(LOGIN_COLUMNS).eq('email', user_data.email).execute()
             
             if not result.data:
                 raise HTTPException(
@@ -0,0 +1,167 @@
+"""
+Login throttling, checked before any database or bcrypt work.
+
+Every login attempt for an existing email costs a full bcrypt check, so
+credential stuffing is a CPU attack as much as a password attack. Each
+attempt is counted against two sliding windows of LOGIN_WINDOW_SECONDS:
+the client IP (LOGIN_IP_LIMIT, many accounts from one source) and the
+email address (LOGIN_EMAIL_LIMIT, one account from many sources). Over
+either limit the attempt is refused with the number of seconds until it
+would be allowed again. A successful login clears the email's window.
+
+Windows are sliding-window counters: the current and previous fixed
+window, the previous one weighted by how much of it still overlaps, so
+each key costs two integers. Counters live in process (bounded by
+LOGIN_THROTTLE_MAX_KEYS) or, when the shared cache bus is connected, in
+Redis so every worker sees the same counts; on a Redis error the
+in-process counters are used for that attempt.
+"""
+
+import hashlib
+import logging
+import math
+import os
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from ..cache import CacheBus
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ThrottleStats:
+    allowed: int = 0
+    rejected_ip: int = 0
+    rejected_email: int = 0
+    redis_errors: int = 0
+
+
+class LoginThrottle:
+    def __init__(
+        self,
+        bus: Optional[CacheBus] = None,
+        window: Optional[float] = None,
+        ip_limit: Optional[int] = None,
+        email_limit: Optional[int] = None,
+        max_keys: Optional[int] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.bus = bus
+        self.window = window or float(os.getenv("LOGIN_WINDOW_SECONDS", "300"))
+        self.limits = {
+            "ip": ip_limit if ip_limit is not None else int(os.getenv("LOGIN_IP_LIMIT", "30")),
+            "email": email_limit if email_limit is not None else int(os.getenv("LOGIN_EMAIL_LIMIT", "10")),
+        }
+        self.max_keys = max_keys or int(os.getenv("LOGIN_THROTTLE_MAX_KEYS", "100000"))
+        self.clock = clock
+        self.stats = ThrottleStats()
+        # (scope, key) -> [window index, count in that window, count in the window before]
+        self._counters: "OrderedDict[Tuple[str, str], List[int]]" = OrderedDict()
+
+    @staticmethod
+    def email_key(email: str) -> str:
+        return hashlib.sha256(" ".join((email or "").casefold().split()).encode("utf-8")).hexdigest()
+
+    async def check(self, ip: str, email: str) -> Optional[int]:
+        """Count an attempt; None when it may go ahead, else seconds until it would be allowed"""
+        keys = [("ip", ip or "unknown"), ("email", self.email_key(email))]
+        now = self.clock()
+        index, elapsed = divmod(now, self.window)
+        counts = await self._counts(keys, int(index))
+        for (scope, _), (current, previous) in zip(keys, counts):
+            retry_after = self._retry_after(self.limits[scope], current, previous, elapsed)
+            if retry_after is not None:
+                if scope == "ip":
+                    self.stats.rejected_ip += 1
+                else:
+                    self.stats.rejected_email += 1
+                return retry_after
+        await self._record(keys, int(index))
+        self.stats.allowed += 1
+        return None
+
+    async def succeeded(self, email: str):
+        """A correct password: stop counting earlier failures against the account"""
+        key = ("email", self.email_key(email))
+        self._counters.pop(key, None)
+        if self.bus is not None and self.bus.client is not None:
+            index = int(self.clock() // self.window)
+            try:
+                await self.bus.client.delete(self._redis_key(key, index), self._redis_key(key, index - 1))
+            except Exception as e:
+                self._redis_error(e)
+
+    @property
+    def rejected(self) -> int:
+        return self.stats.rejected_ip + self.stats.rejected_email
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "window_seconds": self.window,
+            "limits": self.limits,
+            "shared": self.bus is not None and self.bus.connected,
+            "tracked_keys": len(self._counters),
+            **asdict(self.stats),
+        }
+
+    def _retry_after(self, limit: int, current: int, previous: int, elapsed: float) -> Optional[int]:
+        weight = 1 - elapsed / self.window
+        if previous * weight + current < limit:
+            return None
+        if current < limit:
+            # allowed once the previous window has slid far enough out
+            wait = self.window * (1 - (limit - current) / previous) - elapsed
+        else:
+            # not before the next window, and then only once this one has partly slid out
+            wait = (self.window - elapsed) + self.window * (1 - limit / current) if current else self.window - elapsed
+        return max(1, math.ceil(wait))
+
+    async def _counts(self, keys: List[Tuple[str, str]], index: int) -> List[Tuple[int, int]]:
+        if self.bus is not None and self.bus.client is not None:
+            try:
+                values = await self.bus.client.mget(
+                    [self._redis_key(key, i) for key in keys for i in (index, index - 1)]
+                )
+                values = [int(v or 0) for v in values]
+                return [(values[2 * n], values[2 * n + 1]) for n in range(len(keys))]
+            except Exception as e:
+                self._redis_error(e)
+        return [self._local_counts(key, index) for key in keys]
+
+    async def _record(self, keys: List[Tuple[str, str]], index: int):
+        if self.bus is not None and self.bus.client is not None:
+            try:
+                pipe = self.bus.client.pipeline()
+                for key in keys:
+                    pipe.incr(self._redis_key(key, index))
+                    pipe.expire(self._redis_key(key, index), math.ceil(self.window * 2))
+                await pipe.execute()
+                return
+            except Exception as e:
+                self._redis_error(e)
+        for key in keys:
+            self._local_counts(key, index)
+            self._counters[key][1] += 1
+
+    def _local_counts(self, key: Tuple[str, str], index: int) -> Tuple[int, int]:
+        counter = self._counters.get(key)
+        if counter is None:
+            counter = self._counters[key] = [index, 0, 0]
+            while len(self._counters) > self.max_keys:
+                self._counters.popitem(last=False)
+        elif counter[0] != index:
+            # roll the window forward; anything older than the previous window no longer counts
+            counter[2] = counter[1] if counter[0] == index - 1 else 0
+            counter[0], counter[1] = index, 0
+        self._counters.move_to_end(key)
+        return counter[1], counter[2]
+
+    def _redis_key(self, key: Tuple[str, str], index: int) -> str:
+        return self.bus.key("login-throttle", f"{key[0]}:{key[1]}:{index}")
+
+    def _redis_error(self, error: Exception):
+        self.stats.redis_errors += 1
+        logger.warning(f"⚠️ Login throttle Redis call failed, counting in process: {error}")
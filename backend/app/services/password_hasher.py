@@ -0,0 +1,149 @@
+"""
+Password hashing off the event loop.
+
+A bcrypt hash or check costs ~100-250 ms of CPU. Run inline in an async
+endpoint it stalls every other request on the worker, so they run in a
+dedicated thread pool of PASSWORD_HASH_WORKERS threads (bcrypt releases
+the GIL while hashing). At most PASSWORD_HASH_QUEUE_MAX calls may wait
+for a free thread; beyond that ``hash`` / ``verify`` raise
+``PasswordHasherBusy`` at once, and the endpoint answers 503, instead of
+queueing without bound during a login storm.
+
+New hashes use BCRYPT_ROUNDS (the cost factor, each step doubles the
+work). ``calibrate`` times one hash per cost around it at startup (on a
+separate thread, never the login pool) and logs the table, so the setting can be tuned against the login latency
+budget (BCRYPT_TARGET_MS) as hardware changes; ``needs_rehash`` tells
+login that a stored hash was made at another cost and should be
+replaced.
+"""
+
+import asyncio
+import logging
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+import bcrypt
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+MIN_ROUNDS = 4
+MAX_ROUNDS = 31
+_BCRYPT_COST = re.compile(r"^\$2[abxy]?\$(\d{2})\$")
+
+
+def default_rounds() -> int:
+    """BCRYPT_ROUNDS, clamped to what bcrypt accepts"""
+    return min(max(int(os.getenv("BCRYPT_ROUNDS", "12")), MIN_ROUNDS), MAX_ROUNDS)
+
+
+def cost_of(password_hash: str) -> Optional[int]:
+    """The cost factor a bcrypt hash was made with; None for anything else"""
+    match = _BCRYPT_COST.match(password_hash or "")
+    return int(match.group(1)) if match else None
+
+
+class PasswordHasherBusy(Exception):
+    """Every hashing thread is busy and the wait queue is full"""
+
+
+@dataclass
+class HasherStats:
+    completed: int = 0
+    rejected: int = 0  # calls refused because the queue was full
+    max_queue_depth: int = 0
+    total_ms: float = 0.0  # queue wait + hashing
+
+
+class PasswordHasher:
+    def __init__(self, workers: Optional[int] = None, queue_max: Optional[int] = None, rounds: Optional[int] = None):
+        self.rounds = rounds or default_rounds()
+        self.target_ms = float(os.getenv("BCRYPT_TARGET_MS", "250"))
+        self.calibration: Dict[int, float] = {}
+        self.workers = workers or int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+        self.queue_max = queue_max if queue_max is not None else int(os.getenv("PASSWORD_HASH_QUEUE_MAX", str(self.workers * 16)))
+        self.stats = HasherStats()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        self._in_flight = 0
+
+    @property
+    def queue_depth(self) -> int:
+        """Calls waiting for a free thread"""
+        return max(self._in_flight - self.workers, 0)
+
+    async def hash(self, password: str) -> str:
+        rounds = self.rounds
+        return await self._run(lambda: bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds)).decode("utf-8"))
+
+    async def verify(self, password: str, password_hash: str) -> bool:
+        if not password_hash:
+            return False
+        return await self._run(lambda: bcrypt.checkpw(password.encode("utf-8"), password_hash.encode("utf-8")))
+
+    def needs_rehash(self, password_hash: str) -> bool:
+        """True for a bcrypt hash made at a cost other than the configured one"""
+        cost = cost_of(password_hash)
+        return cost is not None and cost != self.rounds
+
+    async def calibrate(self, spread: int = 2) -> Dict[int, float]:
+        """Time one hash per cost from rounds-spread to rounds+1 and log the results; runs on a thread of its own,
+        so logins arriving during a cold start never wait behind (or get refused because of) the calibration"""
+        loop = asyncio.get_running_loop()
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="hash-calibration")
+        try:
+            # warm-up, so the first timing does not include thread start-up
+            await loop.run_in_executor(executor, lambda: bcrypt.hashpw(b"", bcrypt.gensalt(MIN_ROUNDS)))
+            for rounds in range(max(self.rounds - spread, MIN_ROUNDS), min(self.rounds + 1, MAX_ROUNDS) + 1):
+                started = time.perf_counter()
+                await loop.run_in_executor(executor, lambda: bcrypt.hashpw(b"calibration", bcrypt.gensalt(rounds)))
+                self.calibration[rounds] = round((time.perf_counter() - started) * 1000, 1)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+        fitting = [r for r, ms in self.calibration.items() if ms <= self.target_ms]
+        table = ", ".join(f"{r}: {ms} ms" for r, ms in self.calibration.items())
+        logger.info(f"🔐 bcrypt cost calibration ({table}); BCRYPT_ROUNDS={self.rounds}, target {self.target_ms:.0f} ms")
+        if self.calibration.get(self.rounds, 0) > self.target_ms:
+            hint = f" - cost {max(fitting)} fits" if fitting else ""
+            logger.warning(f"⚠️ bcrypt cost {self.rounds} is over the {self.target_ms:.0f} ms target{hint}")
+        elif fitting and max(fitting) > self.rounds:
+            logger.info(f"💡 bcrypt cost {max(fitting)} would still meet the {self.target_ms:.0f} ms target")
+        return self.calibration
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "rounds": self.rounds,
+            "target_ms": self.target_ms,
+            "calibration_ms": self.calibration,
+            "workers": self.workers,
+            "queue_max": self.queue_max,
+            "in_flight": self._in_flight,
+            "queue_depth": self.queue_depth,
+            "avg_ms": round(self.stats.total_ms / self.stats.completed, 1) if self.stats.completed else 0.0,
+            **asdict(self.stats),
+        }
+
+    async def _run(self, fn: Callable[[], T]) -> T:
+        if self._in_flight >= self.workers + self.queue_max:
+            self.stats.rejected += 1
+            raise PasswordHasherBusy()
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        future = self._executor.submit(fn)
+        self._in_flight += 1
+        self.stats.max_queue_depth = max(self.stats.max_queue_depth, self.queue_depth)
+        # counted until the thread is really done, even if the awaiting request goes away
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(self._finished, started))
+        return await asyncio.wrap_future(future)
+
+    def _finished(self, started: float):
+        self._in_flight -= 1
+        self.stats.completed += 1
+        self.stats.total_ms += (time.perf_counter() - started) * 1000
@@ -1,23 +1,41 @@
-from supabase import create_client, Client
-import os
 from ..models.task_models import TaskCreate, TaskUpdate, TaskResponse, TaskStatus
+from ..repositories import Repositories, create_repositories, projections
 from typing import List, Optional
+from .analytics_service import user_analytics
 from datetime import datetime
 
-# Initialize Supabase client
-url = os.environ.get("SUPABASE_URL")
-key = os.environ.get("SUPABASE_ANON_KEY")
+def _timestamp(value: str) -> datetime:
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
 
-if not url or not key:
-    raise ValueError("SUPABASE_URL and SUPABASE_ANON_KEY environment variables must be set")
-
-supabase: Client = create_client(url, key)
+def task_response(task: dict) -> TaskResponse:
+    """Map a tasks row to the API model"""
+    return TaskResponse(
+        id=task["id"],
+        subject=task["subject"],
+        description=task["description"],
+        due_date=_timestamp(task["due_date"]),
+        assignment_type=task["assignment_type"],
+        priority=task["priority"],
+        status=task["status"],
+        user_id=task["user_id"],
+        estimated_hours=task.get("estimated_hours"),
+        grade=task.get("grade"),
+        created_at=_timestamp(task["created_at"]),
+        updated_at=_timestamp(task["updated_at"])
+    )
 
 class TaskService:
-    def __init__(self):
-        self.supabase = supabase
+    def __init__(self, repositories: Optional[Repositories] = None):
+        self._repositories = repositories
+
+    @property
+    def repositories(self) -> Repositories:
+        """Storage backend, resolved from STORAGE_BACKEND on first use"""
+        if self._repositories is None:
+            self._repositories = create_repositories()
+        return self._repositories
 
-    def create_task(self, task_data: TaskCreate, user_id: int) -> TaskResponse:
+    async def create_task(self, task_data: TaskCreate, user_id: int) -> TaskResponse:
         """Create a new task"""
         try:
             # Convert to snake_case for database
@@ -35,24 +53,10 @@ class TaskService:
                 "updated_at": datetime.now().isoformat()
             }
 
-            result = self.supabase.table("tasks").insert(task_dict).execute()
+            task_record = await self.repositories.tasks.create(task_dict, projections.TASK_FIELDS)
             
-            if result.data:
-                task_record = result.data[0]
-                return TaskResponse(
-                    id=task_record["id"],
-                    subject=task_record["subject"],
-                    description=task_record["description"],
-                    due_date=datetime.fromisoformat(task_record["due_date"].replace('Z', '+00:00')),
-                    assignment_type=task_record["assignment_type"],
-                    priority=task_record["priority"],
-                    status=task_record["status"],
-                    user_id=task_record["user_id"],
-                    estimated_hours=task_record.get("estimated_hours"),
-                    grade=task_record.get("grade"),  # Include grade in response
-                    created_at=datetime.fromisoformat(task_record["created_at"].replace('Z', '+00:00')),
-                    updated_at=datetime.fromisoformat(task_record["updated_at"].replace('Z', '+00:00'))
-                )
+            if task_record:
+                return task_response(task_record)
             else:
                 raise Exception("Failed to create task")
                 
@@ -60,62 +64,31 @@ class TaskService:
             print(f"Error creating task: {e}")
             raise Exception(f"Failed to create task: {str(e)}")
 
-    def get_user_tasks(self, user_id: int) -> List[TaskResponse]:
+    async def get_user_tasks(self, user_id: int) -> List[TaskResponse]:
         """Get all tasks for a user"""
         try:
-            result = self.supabase.table("tasks").select("*").eq("user_id", user_id).execute()
-            
-            tasks = []
-            for task_data in result.data:
-                task = TaskResponse(
-                    id=task_data["id"],
-                    subject=task_data["subject"],
-                    description=task_data["description"],
-                    due_date=datetime.fromisoformat(task_data["due_date"].replace('Z', '+00:00')),
-                    assignment_type=task_data["assignment_type"],
-                    priority=task_data["priority"],
-                    status=task_data["status"],
-                    user_id=task_data["user_id"],
-                    estimated_hours=task_data.get("estimated_hours"),
-                    grade=task_data.get("grade"),  # Include grade in response
-                    created_at=datetime.fromisoformat(task_data["created_at"].replace('Z', '+00:00')),
-                    updated_at=datetime.fromisoformat(task_data["updated_at"].replace('Z', '+00:00'))
-                )
-                tasks.append(task)
+            rows = await self.repositories.tasks.list_for_user(user_id, projections.TASK_FIELDS)
             
-            return tasks
+            return [task_response(task_data) for task_data in rows]
             
         except Exception as e:
             print(f"Error getting user tasks: {e}")
             raise Exception(f"Failed to get tasks: {str(e)}")
 
-    def get_task_by_id(self, task_id: int, user_id: int) -> Optional[TaskResponse]:
+    async def get_task_by_id(self, task_id: int, user_id: int) -> Optional[TaskResponse]:
         """Get a specific task by ID"""
         try:
-            result = self.supabase.table("tasks").select("*").eq("id", task_id).eq("user_id", user_id).execute()
+            task_data = await self.repositories.tasks.get(task_id, user_id, projections.TASK_FIELDS)
             
-            if result.data:
-                task_data = result.data[0]
-                return TaskResponse(
-                    id=task_data["id"],
-                    subject=task_data["subject"],
-                    description=task_data["description"],
-                    due_date=datetime.fromisoformat(task_data["due_date"].replace('Z', '+00:00')),
-                    assignment_type=task_data["assignment_type"],
-                    priority=task_data["priority"],
-                    status=task_data["status"],
-                    user_id=task_data["user_id"],
-                    estimated_hours=task_data.get("estimated_hours"),
-                    created_at=datetime.fromisoformat(task_data["created_at"].replace('Z', '+00:00')),
-                    updated_at=datetime.fromisoformat(task_data["updated_at"].replace('Z', '+00:00'))
-                )
+            if task_data:
+                return task_response(task_data)
             return None
             
         except Exception as e:
             print(f"Error getting task: {e}")
             raise Exception(f"Failed to get task: {str(e)}")
 
-    def update_task(self, task_id: int, task_data: TaskUpdate, user_id: int) -> Optional[TaskResponse]:
+    async def update_task(self, task_id: int, task_data: TaskUpdate, user_id: int) -> Optional[TaskResponse]:
         """Update a task"""
         try:
             # Build update dictionary with only provided fields
@@ -137,75 +110,31 @@ class TaskService:
             
             update_dict["updated_at"] = datetime.now().isoformat()
             
-            result = self.supabase.table("tasks").update(update_dict).eq("id", task_id).eq("user_id", user_id).execute()
+            task_data = await self.repositories.tasks.update(task_id, user_id, update_dict, projections.TASK_FIELDS)
             
-            if result.data:
-                task_data = result.data[0]
-                return TaskResponse(
-                    id=task_data["id"],
-                    subject=task_data["subject"],
-                    description=task_data["description"],
-                    due_date=datetime.fromisoformat(task_data["due_date"].replace('Z', '+00:00')),
-                    assignment_type=task_data["assignment_type"],
-                    priority=task_data["priority"],
-                    status=task_data["status"],
-                    user_id=task_data["user_id"],
-                    estimated_hours=task_data.get("estimated_hours"),
-                    grade=task_data.get("grade"),  # Include grade in response
-                    created_at=datetime.fromisoformat(task_data["created_at"].replace('Z', '+00:00')),
-                    updated_at=datetime.fromisoformat(task_data["updated_at"].replace('Z', '+00:00'))
-                )
+            if task_data:
+                return task_response(task_data)
             return None
             
         except Exception as e:
             print(f"Error updating task: {e}")
             raise Exception(f"Failed to update task: {str(e)}")
 
-    def delete_task(self, task_id: int, user_id: int) -> bool:
+    async def delete_task(self, task_id: int, user_id: int) -> bool:
         """Delete a task"""
         try:
-            result = self.supabase.table("tasks").delete().eq("id", task_id).eq("user_id", user_id).execute()
-            return len(result.data) > 0
+            deleted = await self.repositories.tasks.delete(task_id, user_id, projections.TASK_ID)
+            return deleted is not None
             
         except Exception as e:
             print(f"Error deleting task: {e}")
             raise Exception(f"Failed to delete task: {str(e)}")
 
-    def get_task_analytics(self, user_id: int) -> dict:
+    async def get_task_analytics(self, user_id: int) -> dict:
         """Get task analytics for a user"""
         try:
-            result = self.supabase.table("tasks").select("*").eq("user_id", user_id).execute()
-            
-            tasks = result.data
-            total_tasks = len(tasks)
-            completed_tasks = len([t for t in tasks if t["status"] == "completed"])
-            pending_tasks = len([t for t in tasks if t["status"] == "pending"])
-            in_progress_tasks = len([t for t in tasks if t["status"] == "in_progress"])
-            
-            # Calculate completion rate
-            completion_rate = (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
-            
-            # Count by assignment type
-            assignment_types = {}
-            for task in tasks:
-                assignment_type = task.get("assignment_type", "Other")
-                assignment_types[assignment_type] = assignment_types.get(assignment_type, 0) + 1
-            
-            # Count by priority
-            priorities = {}
-            for task in tasks:
-                priority = task.get("priority", "Medium")
-                priorities[priority] = priorities.get(priority, 0) + 1
-            
-            return {
-                "total_tasks": total_tasks,
-                "completed_tasks": completed_tasks,
-                "pending_tasks": pending_tasks,
-                "in_progress_tasks": in_progress_tasks,
-                "completion_rate": round(completion_rate, 1),
-                "assignment_types": assignment_types,
-                "priorities": priorities
-            }
+            # counters maintained with every task write - no task rows are read
+            return await user_analytics(self.repositories, user_id)
             
         except Exception as e:
             print(f"Error getting analytics: {e}")
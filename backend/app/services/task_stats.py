@@ -0,0 +1,206 @@
+"""
+Grade and workload statistics for advanced_analytics plans, computed with NumPy.
+
+A user's task rows are turned into column arrays once (grade, due date,
+creation and completion time, completion flag, subject code) and every
+statistic is an array operation over them - grouping by subject is a sort
+plus ``bincount`` rather than a Python loop per subject:
+
+- grades overall and per subject: mean, median, 25th/75th/90th percentile
+- on-time completion rate (completed_at <= due_date), overall and per subject
+- lead time (days from creation to completion): percentiles and a histogram
+- Pearson correlation between grade and lead time
+
+Results are cached per task-set version: each user's entry remembers the
+task cache tag it was computed from, which changes with every write, so a
+cached result is never stale and the arrays are only rebuilt after the
+tasks changed.
+"""
+
+import os
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..cache import TTLCache
+
+PERCENTILES = (0.25, 0.5, 0.75, 0.9)
+LEAD_TIME_PERCENTILES = (0.1, 0.25, 0.5, 0.75, 0.9)
+# lead time histogram bins, in days
+LEAD_TIME_EDGES = (1.0, 3.0, 7.0, 14.0)
+LEAD_TIME_BINS = ("0-1d", "1-3d", "3-7d", "7-14d", "14d+")
+# fewer graded tasks with a lead time than this and the correlation is not reported
+MIN_CORRELATION_SAMPLES = 3
+
+
+def _epoch(value) -> float:
+    """Seconds since the epoch of a timestamp (ISO string or datetime); NaN without one"""
+    if not value:
+        return np.nan
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return np.nan
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+@dataclass
+class TaskArrays:
+    """A user's tasks as columns; NaN marks a missing grade or timestamp"""
+    grade: np.ndarray
+    due: np.ndarray
+    created: np.ndarray
+    completed_at: np.ndarray
+    completed: np.ndarray  # bool
+    subject: np.ndarray  # index into subjects
+    subjects: List[str]
+
+    @classmethod
+    def from_rows(cls, rows: List[dict]) -> "TaskArrays":
+        subjects, codes = np.unique(np.array([str(r.get("subject") or "") for r in rows], dtype=object), return_inverse=True)
+        return cls(
+            grade=np.array([np.nan if r.get("grade") is None else r["grade"] for r in rows], dtype=float),
+            due=np.array([_epoch(r.get("due_date")) for r in rows], dtype=float),
+            created=np.array([_epoch(r.get("created_at")) for r in rows], dtype=float),
+            completed_at=np.array([_epoch(r.get("completed_at")) for r in rows], dtype=float),
+            completed=np.array([r.get("status") == "completed" for r in rows], dtype=bool),
+            subject=codes.astype(np.intp).reshape(-1),
+            subjects=[str(s) for s in subjects],
+        )
+
+
+def _number(value) -> Optional[float]:
+    return None if value is None or not np.isfinite(value) else round(float(value), 2)
+
+
+def _ratio(part: np.ndarray, whole: np.ndarray) -> List[Optional[float]]:
+    return [round(float(p) / float(w), 4) if w else None for p, w in zip(part, whole)]
+
+
+def _group_quantiles(values: np.ndarray, groups: np.ndarray, n_groups: int, quantiles) -> tuple:
+    """(counts, sums, quantile matrix) of values per group; quantiles interpolate linearly like np.percentile"""
+    order = np.lexsort((values, groups))
+    ordered, counts = values[order], np.bincount(groups, minlength=n_groups)
+    sums = np.bincount(groups, weights=values, minlength=n_groups)
+    starts = np.cumsum(counts) - counts
+    position = starts[:, None] + np.asarray(quantiles)[None, :] * np.maximum(counts - 1, 0)[:, None]
+    below = np.floor(position).astype(np.intp)
+    above = np.minimum(below + 1, starts[:, None] + np.maximum(counts - 1, 0)[:, None])
+    if len(ordered):
+        below, above = np.clip(below, 0, len(ordered) - 1), np.clip(above, 0, len(ordered) - 1)
+        matrix = ordered[below] + (ordered[above] - ordered[below]) * (position - below)
+    else:
+        matrix = np.full(position.shape, np.nan)
+    matrix[counts == 0] = np.nan
+    return counts, sums, matrix
+
+
+def _summary(count: int, total: float, quantiles: np.ndarray, names) -> Optional[Dict[str, Any]]:
+    if not count:
+        return None
+    return {"count": int(count), "mean": _number(total / count), **{name: _number(q) for name, q in zip(names, quantiles)}}
+
+
+def task_statistics(arrays: TaskArrays) -> Dict[str, Any]:
+    """Every advanced statistic of one task set"""
+    n_subjects = len(arrays.subjects)
+    graded = ~np.isnan(arrays.grade)
+    timed = arrays.completed & ~np.isnan(arrays.completed_at) & ~np.isnan(arrays.due)
+    on_time = timed & (arrays.completed_at <= arrays.due)
+    finished = arrays.completed & ~np.isnan(arrays.completed_at) & ~np.isnan(arrays.created)
+    lead_days = (arrays.completed_at - arrays.created) / 86400.0
+
+    grade_names = ("p25", "median", "p75", "p90")
+    counts, sums, quantiles = _group_quantiles(arrays.grade[graded], arrays.subject[graded], n_subjects, PERCENTILES)
+    tasks_per_subject = np.bincount(arrays.subject, minlength=n_subjects)
+    timed_per_subject = np.bincount(arrays.subject[timed], minlength=n_subjects)
+    on_time_per_subject = np.bincount(arrays.subject[on_time], minlength=n_subjects)
+    completed_per_subject = np.bincount(arrays.subject[arrays.completed], minlength=n_subjects)
+    on_time_rates = _ratio(on_time_per_subject, timed_per_subject)
+
+    # everything at once is the same computation with a single group
+    _, overall_sum, overall = _group_quantiles(arrays.grade[graded], np.zeros(int(graded.sum()), dtype=np.intp), 1, PERCENTILES)
+
+    leads = lead_days[finished]
+    _, lead_sum, lead_quantiles = _group_quantiles(leads, np.zeros(len(leads), dtype=np.intp), 1, LEAD_TIME_PERCENTILES)
+    histogram = np.bincount(np.searchsorted(LEAD_TIME_EDGES, leads, side="right"), minlength=len(LEAD_TIME_BINS))
+
+    paired = finished & graded
+    correlation = None
+    if paired.sum() >= MIN_CORRELATION_SAMPLES:
+        x, y = lead_days[paired], arrays.grade[paired]
+        if x.std() > 0 and y.std() > 0:
+            correlation = _number(np.corrcoef(x, y)[0, 1])
+
+    return {
+        "tasks": int(len(arrays.grade)),
+        "graded": int(graded.sum()),
+        "grades": _summary(int(graded.sum()), overall_sum[0], overall[0], grade_names),
+        "subjects": [
+            {
+                "subject": subject,
+                "tasks": int(tasks_per_subject[i]),
+                "completed": int(completed_per_subject[i]),
+                "on_time_rate": on_time_rates[i],
+                "grades": _summary(int(counts[i]), sums[i], quantiles[i], grade_names),
+            }
+            for i, subject in enumerate(arrays.subjects)
+        ],
+        "on_time_rate": _ratio([on_time.sum()], [timed.sum()])[0],
+        "lead_time_days": {
+            **(_summary(len(leads), lead_sum[0], lead_quantiles[0], ("p10", "p25", "median", "p75", "p90"))
+               or {"count": 0}),
+            "histogram": dict(zip(LEAD_TIME_BINS, (int(c) for c in histogram))),
+        },
+        "grade_lead_time_correlation": correlation,
+    }
+
+
+@dataclass
+class StatsEngineStats:
+    computations: int = 0
+    outdated: int = 0  # cached results found for an older version of the task set
+    uncached: int = 0  # task sets without a version (not in the task cache), computed every time
+    compute_ms: float = 0.0
+
+
+class TaskStatsEngine:
+    def __init__(self, max_users: Optional[int] = None, ttl: Optional[float] = None):
+        # user id -> (task set version, statistics)
+        self.results: TTLCache[Tuple[str, Dict[str, Any]]] = TTLCache(
+            max_users if max_users is not None else int(os.getenv("TASK_STATS_CACHE_MAX_USERS", "1000")),
+            ttl if ttl is not None else float(os.getenv("TASK_STATS_CACHE_TTL_SECONDS", "3600")),
+        )
+        self.stats = StatsEngineStats()
+
+    async def statistics(self, user_id: str, version: Optional[str], load_rows: Callable[[], Awaitable[List[dict]]]) -> Dict[str, Any]:
+        """The statistics of the task set named version (e.g. TaskCache.tag), computed from load_rows() on a miss"""
+        if version is not None:
+            cached = self.results.get(user_id)
+            if cached is not None and cached[0] == version:
+                return cached[1]
+            if cached is not None:
+                self.stats.outdated += 1
+        else:
+            self.stats.uncached += 1
+        rows = await load_rows()
+        started = time.perf_counter()
+        result = task_statistics(TaskArrays.from_rows(rows))
+        self.stats.computations += 1
+        self.stats.compute_ms += (time.perf_counter() - started) * 1000
+        if version is not None:
+            self.results.set(user_id, (version, result))
+        return result
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            **self.results.metrics(),
+            "avg_compute_ms": round(self.stats.compute_ms / self.stats.computations, 2) if self.stats.computations else 0.0,
+            **asdict(self.stats),
+        }
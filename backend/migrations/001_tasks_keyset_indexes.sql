@@ -0,0 +1,12 @@
+-- Keyset pagination for GET /tasks/
+-- Pages are ordered by (due_date NULLS FIRST, id) within a user, so these
+-- indexes turn every page - first or five-hundredth - into a range scan.
+-- Run in the Supabase SQL editor (CONCURRENTLY avoids locking tasks; run
+-- each statement on its own, outside a transaction).
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_tasks_user_due
+    ON tasks (user_id, due_date NULLS FIRST, id);
+
+-- Filtered lists (e.g. completed tasks for the history page)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_tasks_user_status_due
+    ON tasks (user_id, status, due_date NULLS FIRST, id);
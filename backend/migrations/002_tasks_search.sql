@@ -0,0 +1,34 @@
+-- Full-text search for GET /tasks/search
+-- A generated tsvector over title (weight A), subject (B) and description (C)
+-- with a GIN index, and a function that returns one ranked page of a
+-- user's matches. The API sends prefix queries such as 'calc:* & exam:*';
+-- the 'simple' configuration keeps words unstemmed so prefixes behave the
+-- same way as the SQLite FTS5 backend.
+
+ALTER TABLE tasks ADD COLUMN IF NOT EXISTS search tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(subject, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(description, '')), 'C')
+    ) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_tasks_search ON tasks USING GIN (search);
+
+CREATE OR REPLACE FUNCTION search_tasks(
+    p_user_id uuid,
+    p_query text,
+    p_status text DEFAULT NULL,
+    p_limit integer DEFAULT 20,
+    p_offset integer DEFAULT 0
+)
+RETURNS SETOF tasks
+LANGUAGE sql STABLE
+AS $$
+    SELECT t.*
+    FROM tasks t, to_tsquery('simple', p_query) AS q
+    WHERE t.search @@ q
+      AND t.user_id = p_user_id
+      AND (p_status IS NULL OR t.status = p_status)
+    ORDER BY ts_rank(t.search, q) DESC, t.id
+    LIMIT p_limit OFFSET p_offset;
+$$;
@@ -0,0 +1,19 @@
+-- Registration inserts directly and relies on a unique email to reject
+-- duplicates (no lookup first), so make sure the constraint exists.
+-- A no-op when users.email is already UNIQUE, as in SUPABASE_SETUP.md.
+
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1
+        FROM pg_index i
+        JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY (i.indkey)
+        WHERE i.indrelid = 'public.users'::regclass
+          AND i.indisunique
+          AND i.indnatts = 1
+          AND a.attname = 'email'
+    ) THEN
+        ALTER TABLE users ADD CONSTRAINT users_email_key UNIQUE (email);
+    END IF;
+END
+$$;
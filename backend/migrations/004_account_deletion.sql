@@ -0,0 +1,32 @@
+-- Atomic account deletion for DELETE /auth/delete-account
+-- delete_user_account removes a user and everything they own in the one
+-- transaction the RPC call runs in. Accounts with long histories are
+-- first marked with deleted_at and emptied with purge_user_tasks in short
+-- batches, so no single transaction has to hold locks on years of tasks.
+
+ALTER TABLE users ADD COLUMN IF NOT EXISTS deleted_at TIMESTAMP WITH TIME ZONE;
+
+CREATE OR REPLACE FUNCTION delete_user_account(p_user_id uuid)
+RETURNS boolean
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    DELETE FROM tasks WHERE user_id = p_user_id;
+    DELETE FROM task_analytics WHERE user_id = p_user_id;
+    DELETE FROM user_subscriptions WHERE user_id = p_user_id;
+    DELETE FROM users WHERE id = p_user_id;
+    RETURN FOUND;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION purge_user_tasks(p_user_id uuid, p_batch_size integer DEFAULT 500)
+RETURNS integer
+LANGUAGE sql
+AS $$
+    WITH doomed AS (
+        SELECT id FROM tasks WHERE user_id = p_user_id LIMIT p_batch_size
+    ), gone AS (
+        DELETE FROM tasks t USING doomed WHERE t.id = doomed.id RETURNING 1
+    )
+    SELECT count(*)::integer FROM gone;
+$$;
@@ -0,0 +1,6 @@
+-- Plan version for the plan claim in access tokens
+-- Tokens carry plan_type and plan_version; update_user_plan sets a new
+-- plan_version, and gated endpoints reject tokens whose plan_version no
+-- longer matches (the client then refreshes its token).
+
+ALTER TABLE users ADD COLUMN IF NOT EXISTS plan_version BIGINT NOT NULL DEFAULT 0;
@@ -0,0 +1,42 @@
+-- Persistent cache for POST /ai/generate-academic-assistance
+-- ai_assistance holds each generated response under a content key (hash of
+-- subject, assignment type, normalized description, difficulty and prompt
+-- template version); ai_assistance_tasks remembers which entry a user's
+-- task was answered with, for GET /ai/academic-assistance/{task_id}.
+
+CREATE TABLE IF NOT EXISTS ai_assistance (
+    key TEXT PRIMARY KEY,
+    subject TEXT NOT NULL,
+    assignment_type TEXT NOT NULL,
+    template_version TEXT NOT NULL,
+    payload JSONB NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+    expires_at TIMESTAMP WITH TIME ZONE NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_ai_assistance_expires ON ai_assistance (expires_at);
+
+CREATE TABLE IF NOT EXISTS ai_assistance_tasks (
+    user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    task_id TEXT NOT NULL,
+    key TEXT NOT NULL REFERENCES ai_assistance(key) ON DELETE CASCADE,
+    PRIMARY KEY (user_id, task_id)
+);
+CREATE INDEX IF NOT EXISTS idx_ai_assistance_tasks_key ON ai_assistance_tasks (key);
+
+-- Drop expired entries, then the soonest-expiring ones beyond p_max_entries
+CREATE OR REPLACE FUNCTION evict_ai_assistance(p_now timestamptz, p_max_entries integer)
+RETURNS integer
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    removed integer;
+    overflow integer;
+BEGIN
+    DELETE FROM ai_assistance WHERE expires_at <= p_now;
+    GET DIAGNOSTICS removed = ROW_COUNT;
+    DELETE FROM ai_assistance
+    WHERE key IN (SELECT key FROM ai_assistance ORDER BY expires_at DESC OFFSET p_max_entries);
+    GET DIAGNOSTICS overflow = ROW_COUNT;
+    RETURN removed + overflow;
+END;
+$$;
@@ -0,0 +1,118 @@
+-- Per-user task counters for GET /tasks/analytics
+-- task_analytics holds one row per (user, dimension, value): the total
+-- ('total', 'all') and the counts by status, assignment_type and priority.
+-- Triggers move the counters inside the transaction of every task insert,
+-- update and delete, so reading them is a single indexed lookup.
+-- reconcile_task_analytics recounts from tasks and repairs any drift; the
+-- backend calls it periodically (ANALYTICS_RECONCILE_INTERVAL_SECONDS).
+
+CREATE TABLE IF NOT EXISTS task_analytics (
+    user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    dimension TEXT NOT NULL,
+    value TEXT NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT now()
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_task_analytics_key ON task_analytics (user_id, dimension, value);
+
+CREATE OR REPLACE FUNCTION task_analytics_move(p_user_id uuid, p_status text, p_type text, p_priority text, p_delta integer)
+RETURNS void
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF p_delta < 0 THEN
+        -- never creates rows: the user may be going away in the same transaction
+        UPDATE task_analytics SET count = count + p_delta, updated_at = now()
+        WHERE user_id = p_user_id AND (
+            (dimension = 'total' AND value = 'all') OR (dimension = 'status' AND value = p_status)
+            OR (dimension = 'assignment_type' AND value = p_type) OR (dimension = 'priority' AND value = p_priority)
+        );
+    ELSE
+        INSERT INTO task_analytics (user_id, dimension, value, count, updated_at)
+        VALUES (p_user_id, 'total', 'all', p_delta, now()),
+               (p_user_id, 'status', p_status, p_delta, now()),
+               (p_user_id, 'assignment_type', p_type, p_delta, now()),
+               (p_user_id, 'priority', p_priority, p_delta, now())
+        ON CONFLICT (user_id, dimension, value)
+        DO UPDATE SET count = task_analytics.count + EXCLUDED.count, updated_at = now();
+    END IF;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION tasks_analytics_trigger()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM task_analytics_move(OLD.user_id, OLD.status, OLD.assignment_type, OLD.priority, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM task_analytics_move(NEW.user_id, NEW.status, NEW.assignment_type, NEW.priority, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS tasks_analytics_insert_delete ON tasks;
+CREATE TRIGGER tasks_analytics_insert_delete
+    AFTER INSERT OR DELETE ON tasks
+    FOR EACH ROW EXECUTE FUNCTION tasks_analytics_trigger();
+
+DROP TRIGGER IF EXISTS tasks_analytics_update ON tasks;
+CREATE TRIGGER tasks_analytics_update
+    AFTER UPDATE OF user_id, status, assignment_type, priority ON tasks
+    FOR EACH ROW
+    WHEN (OLD.user_id IS DISTINCT FROM NEW.user_id OR OLD.status IS DISTINCT FROM NEW.status
+          OR OLD.assignment_type IS DISTINCT FROM NEW.assignment_type OR OLD.priority IS DISTINCT FROM NEW.priority)
+    EXECUTE FUNCTION tasks_analytics_trigger();
+
+-- Recount from tasks (one user, or everyone when p_user_id is null) and
+-- rewrite the counters of users whose stored counts differ; returns them
+CREATE OR REPLACE FUNCTION reconcile_task_analytics(p_user_id uuid DEFAULT NULL)
+RETURNS SETOF uuid
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    drifted uuid;
+BEGIN
+    CREATE TEMP TABLE actual_task_analytics ON COMMIT DROP AS
+        SELECT user_id, 'total'::text AS dimension, 'all'::text AS value, count(*)::integer AS count
+        FROM tasks WHERE p_user_id IS NULL OR user_id = p_user_id GROUP BY user_id
+        UNION ALL
+        SELECT user_id, 'status', status, count(*)::integer
+        FROM tasks WHERE p_user_id IS NULL OR user_id = p_user_id GROUP BY user_id, status
+        UNION ALL
+        SELECT user_id, 'assignment_type', assignment_type, count(*)::integer
+        FROM tasks WHERE p_user_id IS NULL OR user_id = p_user_id GROUP BY user_id, assignment_type
+        UNION ALL
+        SELECT user_id, 'priority', priority, count(*)::integer
+        FROM tasks WHERE p_user_id IS NULL OR user_id = p_user_id GROUP BY user_id, priority;
+
+    FOR drifted IN
+        SELECT DISTINCT d.user_id FROM (
+            (SELECT user_id, dimension, value, count FROM actual_task_analytics
+             EXCEPT
+             SELECT user_id, dimension, value, count FROM task_analytics
+             WHERE (p_user_id IS NULL OR user_id = p_user_id) AND count <> 0)
+            UNION ALL
+            (SELECT user_id, dimension, value, count FROM task_analytics
+             WHERE (p_user_id IS NULL OR user_id = p_user_id) AND count <> 0
+             EXCEPT
+             SELECT user_id, dimension, value, count FROM actual_task_analytics)
+        ) d
+    LOOP
+        DELETE FROM task_analytics WHERE user_id = drifted;
+        INSERT INTO task_analytics (user_id, dimension, value, count, updated_at)
+        SELECT user_id, dimension, value, count, now() FROM actual_task_analytics WHERE user_id = drifted
+        ON CONFLICT (user_id, dimension, value) DO UPDATE SET count = EXCLUDED.count, updated_at = now();
+        RETURN NEXT drifted;
+    END LOOP;
+
+    DROP TABLE actual_task_analytics;
+    RETURN;
+END;
+$$;
+
+-- Count the tasks that existed before the triggers
+SELECT reconcile_task_analytics();
@@ -0,0 +1,12 @@
+-- Task counts per (user, status, assignment_type, priority) for analytics
+-- Read when a user has no task_analytics counters yet (e.g. before
+-- 007_task_analytics_counters.sql is applied). Filtered on user_id,
+-- PostgREST returns a few dozen aggregate rows instead of every task; the
+-- grouping runs over idx_tasks_user_id.
+
+CREATE INDEX IF NOT EXISTS idx_tasks_user_id ON tasks (user_id);
+
+CREATE OR REPLACE VIEW task_groups AS
+    SELECT user_id, status, assignment_type, priority, count(*)::integer AS count
+    FROM tasks
+    GROUP BY user_id, status, assignment_type, priority;
@@ -0,0 +1,153 @@
+-- Day and week rollups for GET /tasks/analytics/timeseries
+-- task_rollups holds one row per (user, granularity, bucket): the UTC day,
+-- or the week starting on Monday. created counts tasks by created_at,
+-- completed by completed_at (stamped here when a task becomes completed),
+-- and by due_date: due, due_open (not completed yet - overdue once the
+-- bucket is past), grade_sum and grade_count. Triggers move the rows inside
+-- the transaction of every task write, so a time series reads only the
+-- buckets in range, by primary key.
+
+ALTER TABLE tasks ADD COLUMN IF NOT EXISTS completed_at TIMESTAMP WITH TIME ZONE;
+
+CREATE TABLE IF NOT EXISTS task_rollups (
+    user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    granularity TEXT NOT NULL CHECK (granularity IN ('day', 'week')),
+    bucket DATE NOT NULL,
+    created INTEGER NOT NULL DEFAULT 0,
+    completed INTEGER NOT NULL DEFAULT 0,
+    due INTEGER NOT NULL DEFAULT 0,
+    due_open INTEGER NOT NULL DEFAULT 0,
+    grade_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+    grade_count INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
+    PRIMARY KEY (user_id, granularity, bucket)
+);
+
+-- completed_at: kept while a task stays completed, set when it becomes completed, cleared otherwise
+CREATE OR REPLACE FUNCTION tasks_completed_at_trigger()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF NEW.status IS DISTINCT FROM 'completed' THEN
+        NEW.completed_at := NULL;
+    ELSIF TG_OP = 'INSERT' OR OLD.status IS DISTINCT FROM 'completed' OR NEW.completed_at IS NULL THEN
+        NEW.completed_at := coalesce(CASE WHEN TG_OP = 'INSERT' THEN NEW.completed_at END, now());
+    END IF;
+    RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS tasks_completed_at ON tasks;
+CREATE TRIGGER tasks_completed_at
+    BEFORE INSERT OR UPDATE OF status ON tasks
+    FOR EACH ROW EXECUTE FUNCTION tasks_completed_at_trigger();
+
+CREATE OR REPLACE FUNCTION task_rollup_move(
+    p_user_id uuid, p_granularity text, p_at timestamptz,
+    p_created integer, p_completed integer, p_due integer, p_due_open integer,
+    p_grade_sum double precision, p_grade_count integer, p_sign integer
+)
+RETURNS void
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    b date;
+BEGIN
+    IF p_at IS NULL THEN
+        RETURN;
+    END IF;
+    b := CASE p_granularity
+        WHEN 'week' THEN date_trunc('week', p_at AT TIME ZONE 'UTC')::date
+        ELSE (p_at AT TIME ZONE 'UTC')::date
+    END;
+    IF p_sign < 0 THEN
+        -- never creates rows: the user may be going away in the same transaction
+        UPDATE task_rollups SET
+            created = created - p_created, completed = completed - p_completed, due = due - p_due,
+            due_open = due_open - p_due_open, grade_sum = grade_sum - p_grade_sum,
+            grade_count = grade_count - p_grade_count, updated_at = now()
+        WHERE user_id = p_user_id AND granularity = p_granularity AND bucket = b;
+    ELSE
+        INSERT INTO task_rollups (user_id, granularity, bucket, created, completed, due, due_open, grade_sum, grade_count, updated_at)
+        VALUES (p_user_id, p_granularity, b, p_created, p_completed, p_due, p_due_open, p_grade_sum, p_grade_count, now())
+        ON CONFLICT (user_id, granularity, bucket) DO UPDATE SET
+            created = task_rollups.created + EXCLUDED.created,
+            completed = task_rollups.completed + EXCLUDED.completed,
+            due = task_rollups.due + EXCLUDED.due,
+            due_open = task_rollups.due_open + EXCLUDED.due_open,
+            grade_sum = task_rollups.grade_sum + EXCLUDED.grade_sum,
+            grade_count = task_rollups.grade_count + EXCLUDED.grade_count,
+            updated_at = now();
+    END IF;
+END;
+$$;
+
+-- Move every bucket a task row counts in (both granularities) by p_sign
+CREATE OR REPLACE FUNCTION task_rollups_apply(t tasks, p_sign integer)
+RETURNS void
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    g text;
+BEGIN
+    FOREACH g IN ARRAY ARRAY['day', 'week'] LOOP
+        PERFORM task_rollup_move(t.user_id, g, t.created_at, 1, 0, 0, 0, 0, 0, p_sign);
+        IF t.status = 'completed' THEN
+            PERFORM task_rollup_move(t.user_id, g, t.completed_at, 0, 1, 0, 0, 0, 0, p_sign);
+        END IF;
+        PERFORM task_rollup_move(
+            t.user_id, g, t.due_date, 0, 0, 1, CASE WHEN t.status = 'completed' THEN 0 ELSE 1 END,
+            coalesce(t.grade, 0), CASE WHEN t.grade IS NULL THEN 0 ELSE 1 END, p_sign
+        );
+    END LOOP;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION tasks_rollups_trigger()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM task_rollups_apply(OLD, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM task_rollups_apply(NEW, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS tasks_rollups_insert_delete ON tasks;
+CREATE TRIGGER tasks_rollups_insert_delete
+    AFTER INSERT OR DELETE ON tasks
+    FOR EACH ROW EXECUTE FUNCTION tasks_rollups_trigger();
+
+DROP TRIGGER IF EXISTS tasks_rollups_update ON tasks;
+CREATE TRIGGER tasks_rollups_update
+    AFTER UPDATE OF user_id, status, created_at, completed_at, due_date, grade ON tasks
+    FOR EACH ROW
+    WHEN (OLD.user_id IS DISTINCT FROM NEW.user_id OR OLD.status IS DISTINCT FROM NEW.status
+          OR OLD.created_at IS DISTINCT FROM NEW.created_at OR OLD.completed_at IS DISTINCT FROM NEW.completed_at
+          OR OLD.due_date IS DISTINCT FROM NEW.due_date OR OLD.grade IS DISTINCT FROM NEW.grade)
+    EXECUTE FUNCTION tasks_rollups_trigger();
+
+CREATE OR REPLACE FUNCTION delete_user_account(p_user_id uuid)
+RETURNS boolean
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    DELETE FROM tasks WHERE user_id = p_user_id;
+    DELETE FROM task_analytics WHERE user_id = p_user_id;
+    DELETE FROM task_rollups WHERE user_id = p_user_id;
+    DELETE FROM user_subscriptions WHERE user_id = p_user_id;
+    DELETE FROM users WHERE id = p_user_id;
+    RETURN FOUND;
+END;
+$$;
+
+-- Bucket the tasks that existed before the triggers (completed ones as completed when last updated)
+UPDATE tasks SET completed_at = updated_at WHERE status = 'completed' AND completed_at IS NULL;
+DELETE FROM task_rollups;
+SELECT task_rollups_apply(t, 1) FROM tasks t;
@@ -0,0 +1,61 @@
+import asyncio
+import os
+import uuid
+
+import pytest
+
+# the app module picks its storage at import: keep API tests in memory, without the bcrypt calibration
+os.environ.setdefault("STORAGE_BACKEND", "memory")
+os.environ.setdefault("BCRYPT_CALIBRATE", "false")
+
+from app.repositories import projections
+from app.repositories.memory_store import create_memory_repositories
+from app.repositories.sqlite_store import create_sqlite_repositories
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def repositories(request, tmp_path):
+    if request.param == "memory":
+        repos = create_memory_repositories()
+    else:
+        repos = create_sqlite_repositories(str(tmp_path / "tasks.db"))
+    yield repos
+    run(repos.close())
+
+
+@pytest.fixture
+def user_id(repositories):
+    return run(repositories.users.create({"email": "student@example.com", "username": "student"}, projections.USER_ID))["id"]
+
+
+def task_values(user_id: str, **values) -> dict:
+    return {
+        "user_id": user_id, "title": "Essay", "subject": "History", "description": "", "assignment_type": "Homework",
+        "priority": "Medium", "status": "pending", "due_date": "2030-01-10T12:00:00+00:00", **values,
+    }
+
+
+@pytest.fixture(scope="session")
+def client():
+    """The API, started once: its shutdown closes the password hasher"""
+    from fastapi.testclient import TestClient
+
+    from app import main
+
+    with TestClient(main.app) as client:
+        yield client
+
+
+def register(client, email: str = "") -> dict:
+    """Auth headers of a newly registered user"""
+    email = email or f"{uuid.uuid4().hex[:12]}@example.com"
+    response = client.post("/auth/register", data={
+        "email": email, "username": email.split("@")[0], "password": "correct horse", "full_name": "Student",
+        "student_id": "S1", "major": "History", "year_level": 2,
+    })
+    assert response.status_code == 200
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
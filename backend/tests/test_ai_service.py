@@ -0,0 +1,60 @@
+"""Breakdowns are reused only for tasks planned over the same horizon, and never share state with the index"""
+
+import json
+from datetime import date, timedelta
+
+import pytest
+
+from app.services import ai_service
+from app.services.ai_service import AIService
+
+from .conftest import run
+
+BREAKDOWN = {"subtasks": [{"title": "Outline"}], "resources": [], "tips": ["Start early"]}
+
+
+class Reply:
+    status_code = 200
+
+    def json(self):
+        return {"content": [{"text": json.dumps(BREAKDOWN)}]}
+
+
+@pytest.fixture
+def service(monkeypatch):
+    calls = []
+    monkeypatch.setattr(ai_service.requests, "post", lambda *args, **kwargs: calls.append(kwargs) or Reply())
+    monkeypatch.setattr(ai_service, "breakdown_index", ai_service.SimilarityIndex("task_breakdown_test"))
+    service = AIService()
+    service.claude_api_key = "test-key"
+    service.model_calls = calls
+    return service
+
+
+def task(days_ahead: int, hours: float = 4) -> dict:
+    return {
+        "title": "Essay on the causes of the First World War", "description": "Five pages with sources",
+        "subject": "History", "assignmentType": "Essay", "estimatedHours": hours,
+        "dueDate": (date.today() + timedelta(days=days_ahead)).isoformat(),
+    }
+
+
+def test_reused_for_the_same_horizon_only(service):
+    run(service.generate_task_breakdown(task(20)))
+    run(service.generate_task_breakdown(task(20)))
+    assert len(service.model_calls) == 1
+    # same urgency level, but planned over a different number of days or hours
+    run(service.generate_task_breakdown(task(30)))
+    run(service.generate_task_breakdown(task(20, hours=10)))
+    assert len(service.model_calls) == 3
+
+
+def test_reused_breakdowns_are_copies(service):
+    first = run(service.generate_task_breakdown(task(20)))
+    first["subtasks"].append({"title": "Edited by the caller"})
+    first["tips"].clear()
+    second = run(service.generate_task_breakdown(task(20)))
+    second["subtasks"][0]["title"] = "Edited again"
+    third = run(service.generate_task_breakdown(task(20)))
+    assert third["subtasks"] == BREAKDOWN["subtasks"] and third["tips"] == BREAKDOWN["tips"]
+    assert len(service.model_calls) == 1
@@ -0,0 +1,66 @@
+"""Due-date filters and keyset order compare instants, whatever offset a due date was sent with"""
+
+import sqlite3
+
+from app.repositories import projections
+from app.repositories.paging import TaskFilters
+from app.repositories.sqlite_store import create_sqlite_repositories
+
+from .conftest import run, task_values
+
+# 04:00Z on the 11th
+EVENING_IN_NEW_YORK = "2030-01-10T23:00:00-05:00"
+
+
+def _ids(repositories, user_id, **filters):
+    page = run(repositories.tasks.list_page(user_id, projections.TASK_ID, TaskFilters(**filters)))
+    return [row["id"] for row in page.items]
+
+
+def test_due_date_is_stored_in_utc(repositories, user_id):
+    task = run(repositories.tasks.create(task_values(user_id, due_date=EVENING_IN_NEW_YORK), projections.TASK_FIELDS))
+    assert task["due_date"] == "2030-01-11T04:00:00+00:00"
+    updated = run(repositories.tasks.update(task["id"], user_id, {"due_date": "2030-01-12T09:30:00+09:00"}, projections.TASK_FIELDS))
+    assert updated["due_date"] == "2030-01-12T00:30:00+00:00"
+
+
+def test_range_filters_compare_instants(repositories, user_id):
+    task = run(repositories.tasks.create(task_values(user_id, due_date=EVENING_IN_NEW_YORK), projections.TASK_ID))
+    assert _ids(repositories, user_id, due_from="2030-01-11T00:00:00+00:00") == [task["id"]]
+    assert _ids(repositories, user_id, due_to="2030-01-11T00:00:00+00:00") == []
+    # the bounds may carry an offset too
+    assert _ids(repositories, user_id, due_from="2030-01-10T23:00:00-05:00") == [task["id"]]
+    assert _ids(repositories, user_id, due_to="2030-01-10T23:00:00-05:00") == []
+
+
+def test_keyset_order_with_mixed_offsets(repositories, user_id):
+    due_dates = ["2030-01-11T03:00:00+00:00", EVENING_IN_NEW_YORK, "2030-01-11T06:00:00+01:00", "2030-01-11T02:00:00Z"]
+    ids = {run(repositories.tasks.create(task_values(user_id, due_date=due), projections.TASK_ID))["id"]: due for due in due_dates}
+    seen, cursor = [], None
+    while True:
+        page = run(repositories.tasks.list_page(user_id, projections.TASK_FIELDS, None, cursor, 1))
+        seen += [row["id"] for row in page.items]
+        if not page.next_cursor:
+            break
+        cursor = (page.items[-1]["due_date"], page.items[-1]["id"])
+    assert [ids[i] for i in seen] == ["2030-01-11T02:00:00Z", "2030-01-11T03:00:00+00:00", EVENING_IN_NEW_YORK, "2030-01-11T06:00:00+01:00"]
+
+
+def test_sqlite_normalizes_due_dates_written_before(tmp_path):
+    path = str(tmp_path / "tasks.db")
+    repositories = create_sqlite_repositories(path)
+    user_id = run(repositories.users.create({"email": "a@example.com"}, projections.USER_ID))["id"]
+    task = run(repositories.tasks.create(task_values(user_id), projections.TASK_ID))
+    run(repositories.close())
+    conn = sqlite3.connect(path)
+    conn.execute("UPDATE tasks SET due_date = ? WHERE id = ?", (EVENING_IN_NEW_YORK, task["id"]))
+    conn.commit()
+    conn.close()
+
+    repositories = create_sqlite_repositories(path)
+    try:
+        assert _ids(repositories, user_id, due_from="2030-01-11T00:00:00+00:00") == [task["id"]]
+        stored = run(repositories.tasks.get(task["id"], user_id, projections.TASK_FIELDS))
+        assert stored["due_date"] == "2030-01-11T04:00:00+00:00"
+    finally:
+        run(repositories.close())
@@ -0,0 +1,89 @@
+"""Account state and plan entitlements come from plan_cache: a warm request never reads the users table"""
+
+from collections import Counter
+
+import pytest
+
+from app import main
+
+from .conftest import register
+
+TASK = {
+    "title": "Essay", "subject": "History", "description": "Causes of the war",
+    "due_date": "2030-01-10T12:00:00+00:00", "assignment_type": "Homework", "priority": "Medium",
+}
+
+
+@pytest.fixture
+def repository_calls(monkeypatch):
+    """Counts every repository method call, as "repository.method" """
+    calls = Counter()
+    for name in ("users", "tasks", "subscriptions", "task_analytics", "assistance"):
+        repository = getattr(main.repos, name)
+        for attribute in dir(type(repository)):
+            method = getattr(repository, attribute)
+            if attribute.startswith("_") or not callable(method):
+                continue
+
+            def counted(*args, _method=method, _key=f"{name}.{attribute}", **kwargs):
+                calls[_key] += 1
+                return _method(*args, **kwargs)
+
+            monkeypatch.setattr(repository, attribute, counted)
+    return calls
+
+
+def test_writes_check_the_account_without_reading_it(client, repository_calls):
+    headers = register(client)
+    repository_calls.clear()
+    assert client.post("/tasks/", json=TASK, headers=headers).status_code == 200
+    assert repository_calls["users.get_by_id"] == 0
+
+
+def test_writes_are_refused_once_the_account_is_deleted(client, monkeypatch):
+    headers = register(client)
+    # large enough to be purged in the background
+    monkeypatch.setattr(main.account_deletion, "threshold", 0)
+    assert client.post("/tasks/", json=TASK, headers=headers).status_code == 200
+    assert client.delete("/auth/delete-account", headers=headers).status_code == 202
+
+    assert client.post("/tasks/", json=TASK, headers=headers).status_code == 403
+    assert client.post("/tasks/batch", json={"tasks": [TASK]}, headers=headers).status_code == 403
+    # the client still polls the deletion
+    assert client.get("/auth/delete-account/status", headers=headers).status_code == 200
+
+
+def upgrade(client, headers, plan_type="student_pro") -> dict:
+    response = client.put("/user/update-plan", json={"plan_type": plan_type}, headers=headers)
+    assert response.status_code == 200
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+ASSISTANCE_REQUEST = {"task_id": "t1", "subject": "History", "description": "Causes of the war", "assignment_type": "Essay"}
+
+
+def test_gated_request_with_a_current_claim_makes_no_repository_calls(client, repository_calls, monkeypatch):
+    headers = upgrade(client, register(client))
+    # the stored-response lookup is the first step after the entitlement checks
+    before_lookup = Counter()
+
+    async def lookup(key):
+        before_lookup.update(repository_calls)
+        return None
+
+    monkeypatch.setattr(main.assistance_cache, "lookup", lookup)
+    monkeypatch.setattr(main, "anthropic_api_key", None)
+    repository_calls.clear()
+
+    response = client.post("/ai/generate-academic-assistance", json=ASSISTANCE_REQUEST, headers=headers)
+    assert response.status_code == 503  # reached the model call, which has no key here
+    assert before_lookup == Counter()
+
+
+def test_gated_request_is_refused_once_the_account_is_deleted(client, monkeypatch):
+    headers = upgrade(client, register(client))
+    monkeypatch.setattr(main.account_deletion, "threshold", 0)
+    assert client.post("/tasks/", json=TASK, headers=headers).status_code == 200
+    assert client.delete("/auth/delete-account", headers=headers).status_code == 202
+    response = client.post("/ai/generate-academic-assistance", json=ASSISTANCE_REQUEST, headers=headers)
+    assert response.status_code == 403
@@ -0,0 +1,104 @@
+"""Login throttle: sliding windows per IP and per email, Retry-After, and counts shared through Redis"""
+
+import asyncio
+
+import pytest
+
+from app.services.login_throttle import LoginThrottle
+
+from .conftest import register, run
+
+WINDOW = 60
+
+
+class Clock:
+    def __init__(self, now: float = 0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def throttle(clock, ip_limit=100, email_limit=100, bus=None) -> LoginThrottle:
+    return LoginThrottle(bus, window=WINDOW, ip_limit=ip_limit, email_limit=email_limit, clock=clock)
+
+
+def test_window_boundary():
+    clock = Clock(WINDOW * 10)
+    limiter = throttle(clock, email_limit=3)
+    for _ in range(3):
+        assert run(limiter.check("10.0.0.1", "a@example.com")) is None
+    clock.now += 30
+    # over the limit until the next window, which starts with this one fully weighted
+    assert run(limiter.check("10.0.0.1", "a@example.com")) == 30
+    clock.now += 30
+    assert run(limiter.check("10.0.0.1", "a@example.com")) == 1
+    clock.now += 1
+    assert run(limiter.check("10.0.0.1", "a@example.com")) is None
+    # two windows later nothing carries over
+    clock.now += 2 * WINDOW
+    for _ in range(3):
+        assert run(limiter.check("10.0.0.1", "a@example.com")) is None
+    assert limiter.stats.rejected_email == 2
+
+
+def test_ip_limit_spans_emails():
+    limiter = throttle(Clock(), ip_limit=5)
+    for n in range(5):
+        assert run(limiter.check("10.0.0.1", f"user{n}@example.com")) is None
+    assert run(limiter.check("10.0.0.1", "another@example.com")) is not None
+    assert run(limiter.check("10.0.0.2", "another@example.com")) is None
+    assert (limiter.stats.rejected_ip, limiter.stats.rejected_email) == (1, 0)
+
+
+def test_email_limit_spans_ips():
+    limiter = throttle(Clock(), email_limit=3)
+    for n in range(3):
+        assert run(limiter.check(f"10.0.0.{n}", "Student@Example.com")) is None
+    # the same address, however it is typed
+    assert run(limiter.check("10.0.0.9", "  student@example.COM ")) is not None
+    assert run(limiter.check("10.0.0.9", "other@example.com")) is None
+    assert (limiter.stats.rejected_ip, limiter.stats.rejected_email) == (0, 1)
+
+
+def test_success_clears_the_email_window():
+    limiter = throttle(Clock(), email_limit=2)
+    run(limiter.check("10.0.0.1", "a@example.com"))
+    run(limiter.check("10.0.0.1", "a@example.com"))
+    assert run(limiter.check("10.0.0.1", "a@example.com")) is not None
+    run(limiter.succeeded("a@example.com"))
+    assert run(limiter.check("10.0.0.1", "a@example.com")) is None
+
+
+def test_workers_share_counts_through_redis():
+    fakeredis = pytest.importorskip("fakeredis")
+    from app.cache import CacheBus
+
+    async def scenario():
+        server = fakeredis.FakeServer()
+        clock = Clock(WINDOW * 10)
+        workers = [
+            throttle(clock, email_limit=3, bus=CacheBus(namespace="test", client=fakeredis.aioredis.FakeRedis(server=server)))
+            for _ in range(2)
+        ]
+        for n in range(3):
+            assert await workers[n % 2].check("10.0.0.1", "a@example.com") is None
+        assert await workers[1].check("10.0.0.1", "a@example.com") is not None
+        await workers[0].succeeded("a@example.com")
+        assert await workers[1].check("10.0.0.1", "a@example.com") is None
+        assert workers[0].metrics()["shared"] and workers[0].stats.redis_errors == 0
+
+    asyncio.run(scenario())
+
+
+def test_login_answers_429_with_retry_after(client, monkeypatch):
+    from app import main
+
+    email = "throttled@example.com"
+    register(client, email)
+    monkeypatch.setattr(main, "login_throttle", throttle(Clock(WINDOW * 10 + 15), email_limit=2))
+    for _ in range(2):
+        assert client.post("/auth/login", data={"email": email, "password": "wrong"}).status_code == 401
+    response = client.post("/auth/login", data={"email": email, "password": "correct horse"})
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "45"
@@ -0,0 +1,38 @@
+"""Startup calibration never takes a hashing thread from logins"""
+
+import asyncio
+import threading
+
+from app.services import password_hasher
+from app.services.password_hasher import PasswordHasher
+
+
+def test_logins_are_served_while_calibrating(monkeypatch):
+    hashpw = password_hasher.bcrypt.hashpw
+    release = threading.Event()
+    calibration_threads = set()
+
+    def slow_calibration(password, salt):
+        if password in (b"", b"calibration"):
+            calibration_threads.add(threading.current_thread().name)
+            release.wait(5)
+        return hashpw(password, salt)
+
+    monkeypatch.setattr(password_hasher.bcrypt, "hashpw", slow_calibration)
+
+    async def scenario():
+        # one hashing thread and no queue: any calibration work on the pool would refuse the login
+        hasher = PasswordHasher(workers=1, queue_max=0, rounds=4)
+        calibration = asyncio.create_task(hasher.calibrate(spread=0))
+        await asyncio.sleep(0.05)
+        password_hash = await hasher.hash("correct horse")
+        assert await hasher.verify("correct horse", password_hash)
+        release.set()
+        await calibration
+        hasher.close()
+        return hasher
+
+    hasher = asyncio.run(scenario())
+    assert hasher.stats.rejected == 0
+    assert set(hasher.calibration) == {4, 5}
+    assert calibration_threads and all(name.startswith("hash-calibration") for name in calibration_threads)
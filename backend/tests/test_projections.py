@@ -0,0 +1,122 @@
+"""
+Fails when a hot path goes back to reading whole rows: a ``select('*')``,
+a ``*`` in SQL text (f-string pieces included, and in the statements SQLite
+actually runs), a ``"*"`` projection passed to a repository, or a repository
+method that defaults its projection to a wildcard.
+"""
+
+import ast
+import asyncio
+import re
+from pathlib import Path
+
+import pytest
+
+from app.repositories import projections
+from app.repositories._rows import column_list
+from app.repositories.memory_store import create_memory_repositories
+from app.repositories.sqlite_store import create_sqlite_repositories
+
+from .conftest import run, task_values
+
+APP = Path(__file__).resolve().parents[1] / "app"
+HOT_PATHS = [APP / "main.py", *sorted((APP / "repositories").glob("*.py")), *sorted((APP / "services").glob("*.py"))]
+# repository methods whose projection argument shapes the rows they return
+REPOSITORY_METHODS = {
+    "get_by_id", "get_by_email", "create", "update", "delete", "mark_deleted", "list_for_user", "list_page",
+    "search", "get", "create_many", "update_many", "delete_many", "get_active",
+}
+SQL_TEXT = re.compile(r"\b(SELECT|RETURNING|INSERT|UPDATE|DELETE)\b")
+# any * but COUNT(*)
+WILDCARD_SQL = re.compile(r"(?<!\()\*(?!\))")
+
+
+def _trees():
+    for path in HOT_PATHS:
+        yield path, ast.parse(path.read_text(encoding="utf-8"), filename=str(path))
+
+
+def _is_wildcard(node) -> bool:
+    return isinstance(node, ast.Constant) and isinstance(node.value, str) and node.value.strip() == "*"
+
+
+def test_hot_paths_name_their_columns():
+    found = []
+    for path, tree in _trees():
+        for node in ast.walk(tree):
+            if not isinstance(node, ast.Call) or not isinstance(node.func, ast.Attribute):
+                continue
+            name = node.func.attr
+            args = [*node.args, *(k.value for k in node.keywords)]
+            if name == "select" and any(_is_wildcard(a) for a in args):
+                found.append(f"{path.name}:{node.lineno} select('*')")
+            elif name in REPOSITORY_METHODS and any(_is_wildcard(a) for a in args):
+                found.append(f"{path.name}:{node.lineno} {name}(..., '*')")
+    assert not found, "wildcard projections: " + ", ".join(found)
+
+
+def _sql_wildcards(sql: str) -> bool:
+    return bool(SQL_TEXT.search(sql) and WILDCARD_SQL.search(sql))
+
+
+def test_no_wildcards_in_sql():
+    found = []
+    for path, tree in _trees():
+        for node in ast.walk(tree):
+            # the literal pieces of f-strings are Constants too
+            if isinstance(node, ast.Constant) and isinstance(node.value, str) and _sql_wildcards(node.value):
+                found.append(f"{path.name}:{node.lineno}")
+            if isinstance(node, ast.Constant) and isinstance(node.value, str) and "!inner(*)" in node.value:
+                found.append(f"{path.name}:{node.lineno} embedded (*)")
+    assert not found, "* in SQL: " + ", ".join(found)
+
+
+def test_sqlite_statements_name_their_columns(tmp_path):
+    """The assembled SQL of every repository write and read, as SQLite runs it"""
+    repositories = create_sqlite_repositories(str(tmp_path / "tasks.db"))
+    statements = []
+    run(repositories.tasks.db.run(lambda conn: conn.set_trace_callback(statements.append)))
+    try:
+        users, tasks = repositories.users, repositories.tasks
+        user_id = run(users.create({"email": "a@example.com", "username": "a"}, projections.USER_ID))["id"]
+        run(users.update(user_id, {"bio": "hi"}, projections.USER_PROFILE))
+        run(users.update(user_id, {}, projections.USER_PLAN))
+        task = run(tasks.create(task_values(user_id), projections.TASK_FIELDS))
+        run(tasks.update(task["id"], user_id, {"status": "completed"}, projections.TASK_FIELDS))
+        created = run(tasks.create_many([task_values(user_id), task_values(user_id)], projections.TASK_ID))
+        ids = [row["id"] for row in created]
+        run(tasks.update_many(ids, user_id, {"priority": "High"}, projections.TASK_FIELDS))
+        run(tasks.delete_many(ids, user_id, projections.TASK_ID))
+        run(tasks.delete(task["id"], user_id, projections.TASK_ID))
+        run(repositories.task_analytics.reconcile())
+        run(users.mark_deleted(user_id, projections.USER_DELETION))
+        run(users.delete(user_id, projections.USER_ID))
+    finally:
+        run(repositories.close())
+    assert any("RETURNING" in sql for sql in statements)
+    assert [sql for sql in statements if _sql_wildcards(sql)] == []
+
+
+def test_repository_methods_have_no_wildcard_default():
+    found = []
+    for path in sorted((APP / "repositories").glob("*.py")):
+        for node in ast.walk(ast.parse(path.read_text(encoding="utf-8"))):
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                defaults = [*node.args.defaults, *(d for d in node.args.kw_defaults if d is not None)]
+                if any(_is_wildcard(d) for d in defaults):
+                    found.append(f"{path.name}:{node.lineno} {node.name}")
+    assert not found, "wildcard defaults: " + ", ".join(found)
+
+
+def test_projections_are_explicit():
+    for name, (table, columns) in projections.PROJECTIONS.items():
+        assert column_list(table, columns) == columns, name
+
+
+@pytest.mark.parametrize("columns", ["*", ("*",), "id, *", ()])
+def test_wildcard_projection_is_rejected(columns):
+    with pytest.raises(ValueError):
+        column_list("tasks", columns)
+    repositories = create_memory_repositories()
+    with pytest.raises(ValueError):
+        asyncio.run(repositories.tasks.list_for_user("user", columns))
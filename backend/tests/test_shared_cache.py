@@ -0,0 +1,121 @@
+"""Two workers' TieredCaches over one (fake) Redis: shared reads, invalidation broadcasts, the no-Redis fallback"""
+
+import asyncio
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from app.cache.shared import CacheBus, TieredCache  # noqa: E402
+
+
+class Loader:
+    def __init__(self, value):
+        self.value = value
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        return self.value
+
+
+def worker(server, listen: bool = True):
+    """A cache bus and a plan-like cache, as one uvicorn worker has them"""
+    bus = CacheBus(namespace="test", client=fakeredis.aioredis.FakeRedis(server=server, decode_responses=True))
+    return bus, TieredCache("plan", bus, max_entries=100, ttl=300)
+
+
+async def started(*buses):
+    for bus in buses:
+        await bus.start()
+
+
+async def until(condition, timeout: float = 2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+def test_a_value_loaded_by_one_worker_is_read_by_the_other():
+    async def scenario():
+        server = fakeredis.FakeServer()
+        (bus_a, cache_a), (bus_b, cache_b) = worker(server), worker(server)
+        await started(bus_a, bus_b)
+        load_a, load_b = Loader(["student_pro", 1]), Loader(["student", 0])
+        assert await cache_a.get_or_load("u1", load_a) == ["student_pro", 1]
+        assert await cache_b.get_or_load("u1", load_b) == ["student_pro", 1]
+        assert (load_a.calls, load_b.calls) == (1, 0)
+        assert cache_b.metrics()["shared"]["hits"] == 1
+        await bus_a.close()
+        await bus_b.close()
+
+    asyncio.run(scenario())
+
+
+def test_set_and_invalidate_reach_the_other_worker():
+    async def scenario():
+        server = fakeredis.FakeServer()
+        (bus_a, cache_a), (bus_b, cache_b) = worker(server), worker(server)
+        await started(bus_a, bus_b)
+        await cache_b.get_or_load("u1", Loader(["student", 0]))
+
+        await cache_a.set("u1", ["academic_plus", 2])
+        await until(lambda: cache_b.local.get("u1") is None)
+        load_b = Loader(["student", 0])
+        assert await cache_b.get_or_load("u1", load_b) == ["academic_plus", 2]
+        assert load_b.calls == 0
+
+        await cache_a.invalidate("u1")
+        await until(lambda: cache_b.local.get("u1") is None)
+        assert await cache_b.get_or_load("u1", Loader(["student", 3])) == ["student", 3]
+        assert bus_b.stats.received == 2
+        await bus_a.close()
+        await bus_b.close()
+
+    asyncio.run(scenario())
+
+
+def test_without_redis_the_cache_is_per_process():
+    async def scenario():
+        bus = CacheBus(url="", namespace="test")
+        await bus.start()
+        cache = TieredCache("plan", bus, max_entries=100, ttl=300)
+        load = Loader(["student", 0])
+        assert await cache.get_or_load("u1", load) == await cache.get_or_load("u1", load) == ["student", 0]
+        assert load.calls == 1
+        await cache.set("u1", ["student_pro", 1])
+        assert cache.local.get("u1") == ["student_pro", 1]
+        await cache.invalidate("u1")
+        assert cache.local.get("u1") is None
+        metrics = cache.metrics()["shared"]
+        assert not metrics["enabled"] and metrics["errors"] == 0
+        await bus.close()
+
+    asyncio.run(scenario())
+
+
+def test_a_load_that_raced_an_invalidation_is_not_written_back():
+    async def scenario():
+        server = fakeredis.FakeServer()
+        # worker a has not heard the invalidation yet (no listener), so only Redis can stop its write-back
+        (bus_a, cache_a), (bus_b, cache_b) = worker(server), worker(server)
+        await started(bus_b)
+
+        async def stale_load():
+            # read the old plan, then another worker changes it before this load finishes
+            await cache_b.invalidate("u1")
+            return ["student", 0]
+
+        assert await cache_a.get_or_load("u1", stale_load) == ["student", 0]
+        assert cache_a.stats.stale_fills == 1
+        assert await bus_b.client.get(bus_b.key("plan", "u1")) is None
+        assert await cache_b.get_or_load("u1", Loader(["student_pro", 1])) == ["student_pro", 1]
+
+        # without a competing invalidation the next miss fills L2 again
+        cache_a.local.invalidate("u1")
+        assert await cache_a.get_or_load("u1", Loader(["student", 0])) == ["student_pro", 1]
+        await bus_a.close()
+        await bus_b.close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,22 @@
+"""Batch inserts stay under SQLITE_MAX_VARIABLE_NUMBER as older SQLite builds set it (999)"""
+
+import sqlite3
+
+from app.repositories import projections
+from app.repositories.sqlite_store import create_sqlite_repositories
+
+from .conftest import run, task_values
+
+
+def test_create_many_beyond_one_statement(tmp_path):
+    repositories = create_sqlite_repositories(str(tmp_path / "tasks.db"))
+    try:
+        run(repositories.tasks.db.run(lambda conn: conn.setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, 999)))
+        user_id = run(repositories.users.create({"email": "a@example.com", "username": "a"}, projections.USER_ID))["id"]
+        created = run(repositories.tasks.create_many(
+            [task_values(user_id, title=f"Task {n}") for n in range(250)], projections.TASK_ID
+        ))
+        assert len(created) == 250
+        assert run(repositories.tasks.count_for_user(user_id)) == 250
+    finally:
+        run(repositories.close())
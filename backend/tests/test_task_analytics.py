@@ -0,0 +1,158 @@
+"""Stored task counters and rollups stay equal to a recount of the tasks through every kind of task write"""
+
+import sqlite3
+from collections import Counter
+
+from app.repositories import projections
+from app.repositories._rows import ANALYTICS_DIMENSIONS, ANALYTICS_TOTAL, ROLLUP_COUNTERS, rollup_deltas
+
+from .conftest import run, task_values
+
+EVERY_BUCKET = ("0001-01-01", "9999-12-31")
+# Sunday evening in New York is Monday 2030-01-07 in UTC - a new day and a new week
+SUNDAY_NIGHT_IN_NEW_YORK = "2030-01-06T23:30:00-05:00"
+SATURDAY_NIGHT_IN_TOKYO = "2030-01-06T08:00:00+09:00"  # still Saturday 2030-01-05 in UTC
+
+
+def _stored_counters(repositories, user_id) -> Counter:
+    rows = run(repositories.task_analytics.list_for_user(user_id))
+    return Counter({(row["dimension"], row["value"]): row["count"] for row in rows if row["count"]})
+
+
+def _grouped_counters(repositories, user_id) -> Counter:
+    """The same counters from a GROUP BY over the tasks"""
+    counters = Counter()
+    for group in run(repositories.tasks.count_groups(user_id)):
+        for dimension, column in ANALYTICS_DIMENSIONS:
+            counters[(dimension, ANALYTICS_TOTAL if column is None else group[column])] += group["count"]
+    return counters
+
+
+def _stored_rollups(repositories, user_id, granularity) -> dict:
+    rows = run(repositories.task_analytics.rollups(user_id, granularity, *EVERY_BUCKET))
+    return {
+        row["bucket"]: {counter: float(row[counter]) for counter in ROLLUP_COUNTERS}
+        for row in rows if any(row[counter] for counter in ROLLUP_COUNTERS)
+    }
+
+
+def _recounted_rollups(repositories, user_id, granularity) -> dict:
+    buckets = {}
+    for task in run(repositories.tasks.list_for_user(user_id, projections.TASK_FIELDS)):
+        for task_granularity, bucket, counters in rollup_deltas(task):
+            if task_granularity == granularity:
+                totals = buckets.setdefault(bucket, {counter: 0.0 for counter in ROLLUP_COUNTERS})
+                for counter, delta in counters.items():
+                    totals[counter] += delta
+    return {bucket: totals for bucket, totals in buckets.items() if any(totals.values())}
+
+
+def _assert_in_step(repositories, user_id):
+    assert _stored_counters(repositories, user_id) == _grouped_counters(repositories, user_id)
+    for granularity in ("day", "week"):
+        assert _stored_rollups(repositories, user_id, granularity) == _recounted_rollups(repositories, user_id, granularity)
+
+
+def test_counters_follow_every_write(repositories, user_id):
+    tasks = repositories.tasks
+    first = run(tasks.create(task_values(user_id, subject="Math"), projections.TASK_ID))
+    _assert_in_step(repositories, user_id)
+
+    run(tasks.update(first["id"], user_id, {"priority": "High", "assignment_type": "Exam"}, projections.TASK_ID))
+    _assert_in_step(repositories, user_id)
+
+    run(tasks.update(first["id"], user_id, {"status": "completed", "grade": 91}, projections.TASK_ID))
+    _assert_in_step(repositories, user_id)
+
+    batch = run(tasks.create_many(
+        [task_values(user_id, priority=priority, due_date=SUNDAY_NIGHT_IN_NEW_YORK) for priority in ("Low", "High", "Low")],
+        projections.TASK_ID,
+    ))
+    _assert_in_step(repositories, user_id)
+
+    batch_ids = [row["id"] for row in batch]
+    run(tasks.update_many(batch_ids[:2], user_id, {"status": "in_progress"}, projections.TASK_ID))
+    _assert_in_step(repositories, user_id)
+
+    run(tasks.update_many(batch_ids, user_id, {"status": "completed"}, projections.TASK_ID))
+    _assert_in_step(repositories, user_id)
+
+    run(tasks.update(first["id"], user_id, {"status": "pending"}, projections.TASK_ID))
+    _assert_in_step(repositories, user_id)
+
+    run(tasks.delete_many(batch_ids[1:], user_id, projections.TASK_ID))
+    _assert_in_step(repositories, user_id)
+
+    run(tasks.delete(first["id"], user_id, projections.TASK_ID))
+    _assert_in_step(repositories, user_id)
+    assert _stored_counters(repositories, user_id) == Counter({
+        ("total", ANALYTICS_TOTAL): 1, ("status", "completed"): 1, ("assignment_type", "Homework"): 1, ("priority", "Low"): 1,
+    })
+
+
+def _drift(repositories, user_id):
+    """Corrupt the stored counters behind the repository's back"""
+    store = getattr(repositories.task_analytics, "store", None)
+    if store is not None:
+        row = next(row for key, row in store.task_analytics.items() if key[0] == user_id and key[1] == "status")
+        row["count"] += 5
+        store.task_analytics[(user_id, "status", "archived")] = {**row, "value": "archived", "count": 2}
+        return
+    conn = sqlite3.connect(repositories.task_analytics.db.path)
+    with conn:
+        conn.execute("UPDATE task_analytics SET count = count + 5 WHERE user_id = ? AND dimension = 'status'", (user_id,))
+        conn.execute("DELETE FROM task_analytics WHERE user_id = ? AND dimension = 'priority'", (user_id,))
+    conn.close()
+
+
+def test_reconcile_repairs_drifted_counters(repositories, user_id):
+    other = run(repositories.users.create({"email": "other@example.com", "username": "other"}, projections.USER_ID))["id"]
+    for owner in (user_id, other):
+        run(repositories.tasks.create_many([task_values(owner), task_values(owner, status="completed")], projections.TASK_ID))
+
+    assert run(repositories.task_analytics.reconcile()) == []
+
+    _drift(repositories, user_id)
+    assert _stored_counters(repositories, user_id) != _grouped_counters(repositories, user_id)
+
+    assert run(repositories.task_analytics.reconcile()) == [user_id]
+    _assert_in_step(repositories, user_id)
+    _assert_in_step(repositories, other)
+    assert run(repositories.task_analytics.reconcile(user_id)) == []
+
+
+def test_rollup_buckets_are_utc_days_and_weeks(repositories, user_id):
+    tasks = repositories.tasks
+    late = run(tasks.create(
+        task_values(user_id, due_date=SUNDAY_NIGHT_IN_NEW_YORK, created_at=SUNDAY_NIGHT_IN_NEW_YORK), projections.TASK_ID
+    ))
+    early = run(tasks.create(
+        task_values(user_id, due_date=SATURDAY_NIGHT_IN_TOKYO, created_at=SATURDAY_NIGHT_IN_TOKYO), projections.TASK_ID
+    ))
+
+    days = _stored_rollups(repositories, user_id, "day")
+    assert days["2030-01-07"]["created"] == days["2030-01-07"]["due"] == days["2030-01-07"]["due_open"] == 1
+    assert days["2030-01-05"]["created"] == days["2030-01-05"]["due"] == 1
+    assert "2030-01-06" not in days
+    weeks = _stored_rollups(repositories, user_id, "week")
+    assert set(weeks) == {"2029-12-31", "2030-01-07"}
+    assert weeks["2030-01-07"]["due_open"] == weeks["2029-12-31"]["due_open"] == 1
+
+    run(tasks.update(late["id"], user_id, {"status": "completed", "grade": 80}, projections.TASK_ID))
+    days = _stored_rollups(repositories, user_id, "day")
+    assert days["2030-01-07"]["due_open"] == 0
+    assert (days["2030-01-07"]["grade_sum"], days["2030-01-07"]["grade_count"]) == (80, 1)
+    _assert_in_step(repositories, user_id)
+
+    # moving the due date across the week boundary moves every due-date counter with it
+    run(tasks.update(late["id"], user_id, {"due_date": "2030-01-07T08:00:00+09:00"}, projections.TASK_ID))
+    weeks = _stored_rollups(repositories, user_id, "week")
+    assert weeks["2029-12-31"]["due"] == 2
+    assert weeks["2029-12-31"]["grade_count"] == 1
+    assert weeks["2030-01-07"]["due"] == 0 and weeks["2030-01-07"]["created"] == 1
+    _assert_in_step(repositories, user_id)
+
+    run(tasks.delete(early["id"], user_id, projections.TASK_ID))
+    run(tasks.update(late["id"], user_id, {"status": "pending"}, projections.TASK_ID))
+    _assert_in_step(repositories, user_id)
+    assert _stored_rollups(repositories, user_id, "week")["2029-12-31"]["due_open"] == 1
@@ -0,0 +1,36 @@
+"""Task cache tags name only live entries, so validators cannot outlive the rows they describe"""
+
+from app.cache.task_cache import TaskCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_tag_changes_with_writes():
+    cache = TaskCache(max_users=10, ttl=60, max_rows=100)
+    assert cache.put("u1", [{"id": 1, "status": "pending"}], cache.version("u1"))
+    before = cache.tag("u1")
+    cache.apply("u1", [{"id": 1, "status": "completed"}])
+    assert cache.tag("u1") not in (None, before)
+
+
+def test_tag_expires_with_the_entry():
+    clock = Clock()
+    cache = TaskCache(max_users=10, ttl=60, max_rows=100, clock=clock)
+    assert cache.put("u1", [{"id": 1}], cache.version("u1"))
+    assert cache.tag("u1") is not None
+    clock.now = 61
+    assert cache.tag("u1") is None
+    assert cache.peek("u1") is None
+
+
+def test_without_redis_the_app_trusts_cached_sets_briefly(client):
+    from app import main
+
+    assert not main.cache_bus.connected
+    assert main.tasks_cache.ttl == main.task_cache_local_ttl
@@ -1,4 +1,4 @@
-import React, { useState } from 'react';
+import React, { useEffect, useState } from 'react';
 import { aiAPI } from '../services/api';
 import { BookOpen, Brain, Clock, CheckCircle, AlertCircle, Target, Lightbulb, TrendingUp, Users, XCircle } from 'lucide-react';
 
@@ -50,6 +50,21 @@ const AcademicAssistant: React.FC<AcademicAssistantProps> = ({
   const [difficultyLevel, setDifficultyLevel] = useState('medium');
   const [activeTab, setActiveTab] = useState('overview');
 
+  // Show the assistance already generated for this task, if any (served from the server's cache)
+  useEffect(() => {
+    let cancelled = false;
+    aiAPI.getAcademicAssistance(taskId)
+      .then((data) => {
+        if (!cancelled) setAssistantData(data);
+      })
+      .catch(() => {
+        // 404 - nothing generated for this task yet
+      });
+    return () => {
+      cancelled = true;
+    };
+  }, [taskId]);
+
   const generateAcademicAssistance = async () => {
     setLoading(true);
     setError(null);
@@ -24,7 +24,7 @@ const Analytics: React.FC = () => {
   const loadAnalytics = async () => {
     try {
       setLoading(true);
-      const data = await taskAPI.getTaskAnalytics();
+      const data = await taskAPI.getAnalytics();
       setAnalyticsData(data);
     } catch (err: any) {
       setError(err.message || 'Failed to load analytics');
@@ -1,10 +1,10 @@
 import React, { useState, useEffect } from 'react';
 import { taskAPI } from '../services/api';
-import { Task, TaskAnalytics } from '../types';
+import { DashboardData, Task } from '../types';
 import { Calendar, Clock, TrendingUp, BookOpen, CheckCircle, AlertCircle, BarChart3 } from 'lucide-react';
 
 const Dashboard: React.FC = () => {
-  const [tasks, setTasks] = useState<Task[]>([]);
+  const [dashboard, setDashboard] = useState<DashboardData | null>(null);
   const [statistics, setStatistics] = useState<any>(null);
   const [aiSuggestions, setAiSuggestions] = useState<any[]>([]); // Changed type to any[] as AISuggestion is removed
   const [loading, setLoading] = useState(true);
@@ -24,11 +24,12 @@ const Dashboard: React.FC = () => {
   const loadDashboardData = async () => {
     try {
       setLoading(true);
-      const [fetchedTasks, fetchedSuggestions] = await Promise.all([
-        taskAPI.getTasks(),
+      // Counts and the task lists come pre-aggregated from one request
+      const [fetchedDashboard, fetchedSuggestions] = await Promise.all([
+        taskAPI.getDashboard(),
         taskAPI.getAISuggestions()
       ]);
-      setTasks(fetchedTasks);
+      setDashboard(fetchedDashboard);
       setAiSuggestions(fetchedSuggestions);
       setError(null);
     } catch (err: any) {
@@ -38,19 +39,29 @@ const Dashboard: React.FC = () => {
     }
   };
 
+  const getTotalTasks = () => dashboard?.total_tasks || 0;
+
   const getStatusCount = (status: string) => {
-    return tasks.filter(task => task.status === status).length;
+    switch (status) {
+      case 'completed': return dashboard?.completed_tasks || 0;
+      case 'in_progress': return dashboard?.in_progress_tasks || 0;
+      case 'pending': return dashboard?.pending_tasks || 0;
+      default: return 0;
+    }
   };
 
   const getPriorityCount = (priority: string) => {
-    return tasks.filter(task => task.priority === priority).length;
+    return dashboard?.priorities[priority] || 0;
+  };
+
+  // Open tasks, earliest due first
+  const getUpcomingTasks = (): Task[] => {
+    return dashboard?.upcoming || [];
   };
 
-  const getRecentTasks = () => {
-    return tasks
-      .filter(task => task.status !== 'completed')
-      .sort((a, b) => new Date(b.created_at).getTime() - new Date(a.created_at).getTime())
-      .slice(0, 5);
+  // Open tasks, newest first
+  const getRecentTasks = (): Task[] => {
+    return dashboard?.recent || [];
   };
 
   const getStatusColor = (status: string) => {
@@ -70,9 +81,9 @@ const Dashboard: React.FC = () => {
     }
   };
 
-  // Calculate statistics from local tasks data
+  // Calculate statistics from the dashboard summary
   const calculateStatistics = () => {
-    const totalTasks = tasks.length;
+    const totalTasks = getTotalTasks();
     const completedTasks = getStatusCount('completed');
     const inProgressTasks = getStatusCount('in_progress');
     const pendingTasks = getStatusCount('pending');
@@ -91,7 +102,7 @@ const Dashboard: React.FC = () => {
     const highPriority = getPriorityCount('High');
     const mediumPriority = getPriorityCount('Medium');
     const lowPriority = getPriorityCount('Low');
-    const total = tasks.length;
+    const total = getTotalTasks();
 
     return {
       high: { count: highPriority, percentage: total > 0 ? (highPriority / total) * 100 : 0 },
@@ -132,7 +143,7 @@ const Dashboard: React.FC = () => {
             </div>
             <div className="ml-4">
               <p className="text-sm font-medium text-gray-600">Total Tasks</p>
-              <p className="text-2xl font-semibold text-gray-900">{tasks.length}</p>
+              <p className="text-2xl font-semibold text-gray-900">{getTotalTasks()}</p>
             </div>
           </div>
         </div>
@@ -246,8 +257,37 @@ const Dashboard: React.FC = () => {
         </div>
       </div>
 
+      {/* Upcoming Deadlines */}
+      {getUpcomingTasks().length > 0 && (
+        <div className="bg-white p-6 rounded-lg shadow">
+          <h3 className="text-lg font-semibold mb-4">Upcoming Deadlines</h3>
+          <div className="space-y-3">
+            {getUpcomingTasks().map((task) => (
+              <div key={task.id} className="flex items-center justify-between p-3 bg-gray-50 rounded-lg">
+                <div className="flex-1">
+                  <h4 className="font-medium text-gray-900">
+                    {task.title || task.subject}
+                  </h4>
+                  <div className="flex items-center gap-2 mt-1">
+                    <span className={`px-2 py-1 rounded-full text-xs font-medium ${getPriorityColor(task.priority)}`}>
+                      {task.priority}
+                    </span>
+                    {task.subject && (
+                      <span className="text-xs text-gray-500">• {task.subject}</span>
+                    )}
+                  </div>
+                </div>
+                <div className="text-sm text-gray-500">
+                  {new Date(task.due_date).toLocaleDateString()}
+                </div>
+              </div>
+            ))}
+          </div>
+        </div>
+      )}
+
       {/* Recent Tasks */}
-      {tasks.length > 0 && (
+      {getTotalTasks() > 0 && (
         <div className="bg-white p-6 rounded-lg shadow">
           <h3 className="text-lg font-semibold mb-4">Recent Active Tasks</h3>
           {getRecentTasks().length === 0 ? (
@@ -11,16 +11,38 @@ const TaskHistory: React.FC = () => {
   const [sortBy, setSortBy] = useState<'date' | 'points' | 'subject'>('date');
   const [sortOrder, setSortOrder] = useState<'asc' | 'desc'>('desc');
   const [filterType, setFilterType] = useState<string>('all');
+  const [searchResults, setSearchResults] = useState<Task[] | null>(null);
 
   useEffect(() => {
     loadCompletedTasks();
   }, []);
 
+  // Search on the server once typing pauses instead of scanning every task per keystroke
+  useEffect(() => {
+    const query = searchTerm.trim();
+    if (!query) {
+      setSearchResults(null);
+      return;
+    }
+    let cancelled = false;
+    const timer = setTimeout(async () => {
+      try {
+        const page = await taskAPI.searchTasks(query, 'completed', undefined, 100);
+        if (!cancelled) setSearchResults(page.tasks);
+      } catch (err: any) {
+        console.error('Task search failed:', err);
+      }
+    }, 250);
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
+  }, [searchTerm]);
+
   const loadCompletedTasks = async () => {
     try {
       setLoading(true);
-      const allTasks = await taskAPI.getTasks();
-      const completed = allTasks.filter(task => task.status === 'completed');
+      const completed = await taskAPI.getTasks({ status: 'completed' });
       setCompletedTasks(completed);
       setError(null);
     } catch (err: any) {
@@ -32,13 +54,8 @@ const TaskHistory: React.FC = () => {
   };
 
   // Filter and sort tasks
-  const filteredAndSortedTasks = completedTasks
-    .filter(task => {
-      const matchesSearch = task.subject.toLowerCase().includes(searchTerm.toLowerCase()) ||
-                          task.description.toLowerCase().includes(searchTerm.toLowerCase());
-      const matchesFilter = filterType === 'all' || task.assignment_type === filterType;
-      return matchesSearch && matchesFilter;
-    })
+  const filteredAndSortedTasks = (searchResults ?? completedTasks)
+    .filter(task => filterType === 'all' || task.assignment_type === filterType)
     .sort((a, b) => {
       let comparison = 0;
       
@@ -8,6 +8,10 @@ import {
   LoginRequest, 
   AuthResponse,
   TaskAnalytics,
+  DashboardData,
+  TaskFilters,
+  TaskPage,
+  TaskBatchResult,
   PlanFeatures
 } from '../types';
 
@@ -73,11 +77,46 @@ export const taskAPI = {
     return response.data;
   },
 
-  getTasks: async (): Promise<Task[]> => {
-    const response = await api.get('/tasks/');
+  // One page of tasks ordered by due date; pass nextCursor back to continue
+  getTaskPage: async (filters: TaskFilters = {}, cursor?: string, limit?: number): Promise<TaskPage> => {
+    const response = await api.get('/tasks/', { params: { ...filters, cursor, limit } });
+    return { tasks: response.data, nextCursor: response.headers['x-next-cursor'] || null };
+  },
+
+  // Batch mutations: one request and one statement, with a result per item
+  createTasks: async (tasks: CreateTaskRequest[]): Promise<TaskBatchResult> => {
+    const response = await api.post('/tasks/batch', { tasks });
+    return response.data;
+  },
+
+  updateTasks: async (ids: string[], changes: UpdateTaskRequest): Promise<TaskBatchResult> => {
+    const response = await api.patch('/tasks/batch', { ids, changes });
+    return response.data;
+  },
+
+  deleteTasks: async (ids: string[]): Promise<TaskBatchResult> => {
+    const response = await api.delete('/tasks/batch', { data: { ids } });
     return response.data;
   },
 
+  // Ranked full-text search (word prefixes over title, subject and description)
+  searchTasks: async (q: string, status?: Task['status'], cursor?: string, limit?: number): Promise<TaskPage> => {
+    const response = await api.get('/tasks/search', { params: { q, status, cursor, limit } });
+    return { tasks: response.data, nextCursor: response.headers['x-next-cursor'] || null };
+  },
+
+  // Every task matching the filters, following the cursor page by page
+  getTasks: async (filters: TaskFilters = {}): Promise<Task[]> => {
+    const tasks: Task[] = [];
+    let cursor: string | undefined;
+    do {
+      const page = await taskAPI.getTaskPage(filters, cursor);
+      tasks.push(...page.tasks);
+      cursor = page.nextCursor || undefined;
+    } while (cursor);
+    return tasks;
+  },
+
   getTask: async (taskId: number): Promise<Task> => {
     const response = await api.get(`/tasks/${taskId.toString()}`);
     return response.data;
@@ -97,14 +136,9 @@ export const taskAPI = {
     return response.data;
   },
 
-  getTaskAnalytics: async (): Promise<TaskAnalytics> => {
-    const response = await api.get('/tasks/analytics');
-    return response.data;
-  },
-
-  // Additional methods for Dashboard
-  getTaskStatistics: async (): Promise<any> => {
-    const response = await api.get('/tasks/analytics');
+  // Counts, breakdowns and open tasks in one request (revalidated with its ETag)
+  getDashboard: async (): Promise<DashboardData> => {
+    const response = await api.get('/dashboard');
     return response.data;
   },
 
@@ -168,6 +202,10 @@ export const planAPI = {
     const response = await api.put('/user/update-plan', {
       plan_type: planType
     });
+    // The old token's plan claim is rejected from now on - switch to the re-issued one
+    if (response.data.access_token) {
+      localStorage.setItem('access_token', response.data.access_token);
+    }
     return response.data;
   },
 };
@@ -223,10 +261,23 @@ export const authAPI = {
     return response.data;
   },
 
-  deleteAccount: async (): Promise<{ message: string; user_id: string }> => {
+  deleteAccount: async (): Promise<{ message: string; user_id: string; status: string }> => {
     console.log('🗑️ Making delete account request to backend...');
     const response = await api.delete('/auth/delete-account');
     console.log('✅ Delete account response received:', response.data);
+    // Large accounts are purged in the background (202) - wait until the purge has finished
+    for (let attempt = 0; response.status === 202 && attempt < 150; attempt++) {
+      await new Promise((resolve) => setTimeout(resolve, 2000));
+      const status = await authAPI.getDeleteAccountStatus();
+      if (status.status === 'deleted') {
+        return { ...response.data, status: 'deleted' };
+      }
+    }
+    return response.data;
+  },
+
+  getDeleteAccountStatus: async (): Promise<{ status: 'active' | 'purging' | 'deleted'; tasks_remaining?: number }> => {
+    const response = await api.get('/auth/delete-account/status');
     return response.data;
   },
 
@@ -50,6 +50,35 @@ export interface Task {
   grade?: number;  // Add grade field
   created_at: string;
   updated_at: string;
+  completed_at?: string;
+}
+
+export interface TaskFilters {
+  status?: Task['status'];
+  subject?: string;
+  assignment_type?: Task['assignment_type'];
+  priority?: Task['priority'];
+  due_from?: string;
+  due_to?: string;
+}
+
+export interface TaskPage {
+  tasks: Task[];
+  nextCursor: string | null;
+}
+
+export interface TaskBatchItem {
+  index: number;
+  id?: string;
+  status: number;
+  task?: Task;
+  error?: string;
+}
+
+export interface TaskBatchResult {
+  results: TaskBatchItem[];
+  succeeded: number;
+  failed: number;
 }
 
 export interface StudySession {
@@ -138,4 +167,10 @@ export interface TaskAnalytics {
     total_graded_tasks: number;
     grade_distribution: Record<string, number>;
   };
+}
+
+// GET /dashboard: the analytics summary plus open tasks, in one response
+export interface DashboardData extends TaskAnalytics {
+  upcoming: Task[];  // earliest due first
+  recent: Task[];    // newest first
 } 
\ No newline at end of file